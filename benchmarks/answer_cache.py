@@ -0,0 +1,162 @@
+"""
+Document Q&A with and without the per-session answer cache
+(services/rag/answer_cache.py).
+
+A session holding the fixture manual (benchmarks/rag_fixture.py) asks
+``--questions`` questions drawn, with Zipf-like popularity, from groups of
+phrasings of the same question -- plus pairs that differ only in a model
+number. Runs against a scratch database and numpy vector index, with the
+fake Gemini endpoint (benchmarks/fakes.py) answering "Answer to: <the
+question>", so a served answer can be checked against the question asked.
+
+The fake embedding is a bag of content words, with figures reduced to
+their shape (NW-412 and NW-416 embed the same), standing in for an
+embedding model: rephrasings with the same content words land close,
+and so do questions that differ only in a number.
+
+Reports latency, generation and embedding requests, hit rate and wrong
+answers (a hit from a different question group) for: no cache, the cache,
+and -- with dense-only retrieval (RAG_HYBRID_ENABLED off), so every
+question is embedded and can be matched semantically -- the cache with and
+without its same-figures guard. (With hybrid retrieval, questions naming a
+model number mostly take the lexical fast path: no embedding, so only
+exact hits.) Then checks that uploading a document clears the session's
+cached answers.
+
+Usage (from the repo root):
+
+    python -m benchmarks.answer_cache
+    python -m benchmarks.answer_cache --questions 300 --threshold 0.85
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import percentile, print_table
+from benchmarks.fakes import FakeProfile, FakeUpstreams, Latency, SyntheticScenario
+from benchmarks.rag_fixture import PAGES, pdf_bytes, stage
+
+GROUPS = [
+    ["What is the default installer PIN?", "what's the default PIN for the installer",
+     "Tell me the installer's default PIN please"],
+    ["How often should the air filter be cleaned?", "how often do I clean the air filter",
+     "Air filter cleaning - how often?"],
+    ["What does fault code P3 mean?", "P3 fault code meaning", "what's the meaning of fault code P3?"],
+    ["How much clearance does the outdoor unit need?", "what clearance does the outdoor unit need",
+     "Outdoor unit clearance needed?"],
+    ["What superheat should I see during commissioning?", "commissioning superheat?",
+     "During commissioning, what superheat should I expect?"],
+    ["What torque for a 5/8 inch flare nut?", "5/8 inch flare nut torque please", "Flare nut torque, 5/8 inch?"],
+    ["What is the COP of the NW-412?", "COP of the NW-412?", "tell me the NW-412 COP"],
+    ["What is the COP of the NW-416?", "COP of the NW-416?", "tell me the NW-416 COP"],
+    ["What breaker does the NW-409 need?", "which breaker does the NW-409 need", "NW-409 breaker needed?"],
+    ["What breaker does the NW-412 need?", "which breaker does the NW-412 need", "NW-412 breaker needed?"],
+]
+GROUP_OF = {q: i for i, group in enumerate(GROUPS) for q in group}
+
+_STOPWORDS = set("a an the is are do does i should what what's which how much tell me for of to be during "
+                 "please can you see expect s".split())
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "ed", "s"):
+        if word.endswith(suffix) and len(word) > len(suffix) + 3:
+            return word[:-len(suffix)]
+    return word
+
+
+class EchoScenario(SyntheticScenario):
+    """Answers "Answer to: <question>"; bag-of-content-words embeddings."""
+
+    def gemini_chunks(self, body: dict) -> list[dict]:
+        text = " ".join(p.get("text", "") for p in body["contents"][-1].get("parts", []))
+        return self._text_chunks(f"Answer to: {text.rsplit('Question: ', 1)[-1]}")
+
+    def embedding(self, text: str, dims: int = 768) -> list[float]:
+        words = re.findall(r"[\w/'-]+", text.lower().replace("'s", ""))
+        vector = np.zeros(dims)
+        for word in words:
+            if word not in _STOPWORDS:
+                seed = int(hashlib.sha256(re.sub(r"\d", "#", _stem(word)).encode()).hexdigest()[:8], 16)
+                vector += np.random.default_rng(seed).standard_normal(dims)
+        return vector.tolist()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--questions", type=int, default=120)
+    parser.add_argument("--threshold", type=float, default=None, help="Override RAG_ANSWER_CACHE_THRESHOLD")
+    parser.add_argument("--embed-ms", type=float, default=80, help="Fake embedding request latency")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    profile = FakeProfile(embed=Latency(args.embed_ms, 0), gemini_first_token=Latency(400, 0),
+                          gemini_token=Latency(30, 0))
+    fakes = FakeUpstreams(profile, scenario=EchoScenario(profile)).start()
+    scratch = tempfile.mkdtemp(prefix="answer-cache-")
+    os.environ.update(fakes.env())
+    os.environ.update({"DB_PATH": os.path.join(scratch, "app.db"), "UPLOAD_DIR": os.path.join(scratch, "uploads"),
+                       "VECTOR_STORE_BACKEND": "numpy", "VECTOR_STORE_PATH": os.path.join(scratch, "vectors"),
+                       "LOG_LEVEL": "WARNING"})
+    os.makedirs(os.environ["UPLOAD_DIR"])
+
+    import config
+    from services import db
+    from services.rag import answer_cache, documents
+    from services.rag.rag_chat import rag_answer
+    db.init_db()
+    if args.threshold is not None:
+        answer_cache.cache.threshold = args.threshold
+    manual = pdf_bytes()
+
+    rng = random.Random(args.seed)
+    weights = [1 / (rank + 1) for rank in range(len(GROUPS))]
+    workload = [rng.choice(GROUPS[rng.choices(range(len(GROUPS)), weights)[0]]) for _ in range(args.questions)]
+
+    anchors, hybrid = answer_cache._anchors, config.RAG_HYBRID_ENABLED
+    no_guard = lambda key: frozenset()
+    modes = {"no cache": (False, anchors, hybrid), "answer cache": (True, anchors, hybrid),
+             "cache, dense retrieval": (True, anchors, False),
+             "cache, dense, no figures guard": (True, no_guard, False)}
+    rows = []
+    for name, (enabled, guard, hybrid_retrieval) in modes.items():
+        config.RAG_ANSWER_CACHE_ENABLED = enabled
+        config.RAG_HYBRID_ENABLED = hybrid_retrieval
+        answer_cache._anchors = guard
+        session = f"session-{name}"
+        documents.ingest(session, "manual.pdf", *stage(manual, config.UPLOAD_DIR))
+        before, generations, embeds = answer_cache.cache.stats(), fakes.counters["gemini_calls"], \
+            fakes.counters["embed_calls"]
+        timings, wrong = [], 0
+        for question in workload:
+            start = time.perf_counter()
+            answer = rag_answer(session, question)["answer"]
+            timings.append(time.perf_counter() - start)
+            wrong += GROUP_OF.get(answer.removeprefix("Answer to: ")) != GROUP_OF[question]
+        after = answer_cache.cache.stats()
+        hits = (after["exact_hits"] + after["semantic_hits"]) - (before["exact_hits"] + before["semantic_hits"])
+        rows.append([name, f"{percentile(timings, 50) * 1000:.0f}", f"{percentile(timings, 90) * 1000:.0f}",
+                     fakes.counters["gemini_calls"] - generations, fakes.counters["embed_calls"] - embeds,
+                     f"{hits / len(workload):.0%}", wrong])
+    answer_cache._anchors, config.RAG_HYBRID_ENABLED = anchors, hybrid
+    print_table(["mode", "p50 ms", "p90 ms", "generations", "embed requests", "hit rate", "wrong answers"], rows)
+
+    config.RAG_ANSWER_CACHE_ENABLED = True
+    session = "session-answer cache"
+    generations = fakes.counters["gemini_calls"]
+    documents.ingest(session, "appendix.pdf", *stage(pdf_bytes(PAGES[:2]), config.UPLOAD_DIR))
+    rag_answer(session, workload[0])
+    print(f"after another upload to the session, a cached question was generated again: "
+          f"{fakes.counters['gemini_calls'] - generations == 1}")
+    print(f"stats: {answer_cache.cache.stats()}")
+    fakes.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+The sentence-packing chunker (services/rag/chunker.py) vs the fixed
+character splitter (pdf_processor.chunk_pages): how many chunks and
+embedding calls a document costs, and how well the chunks retrieve.
+
+Runs on the fixture manual (benchmarks/rag_fixture.py), or on a real PDF's
+pages with ``--pdf`` (retrieval columns then need questions, so they are
+left blank). Per splitter:
+
+- chunks, and the embedding requests an upload makes -- one per chunk for
+  the fixed splitter as add_chunks used to embed, ``ceil(chunks /
+  RAG_EMBED_BATCH_SIZE)`` now;
+- embedded tokens (utils/tokens.py estimate): overlap, repeated headers
+  and footers are all paid for here;
+- answer@1: questions whose best chunk alone holds every answer phrase;
+- covered@k: questions whose top-k chunks hold every answer phrase, and
+  the context tokens those k chunks cost.
+
+Retrieval is the local TF-IDF stand-in from benchmarks/rag_context.py.
+
+Usage (from the repo root):
+
+    python -m benchmarks.chunking
+    python -m benchmarks.chunking --target-tokens 150 --min-tokens 40 --top-k 3
+    python -m benchmarks.chunking --pdf handbook.pdf
+"""
+import argparse
+import math
+
+import config
+from benchmarks.common import print_table
+from benchmarks.rag_context import TfIdfRanker, _normalize
+from benchmarks.rag_fixture import PAGES, QUESTIONS
+from services.rag.chunker import pack
+from services.rag.pdf_processor import chunk_pages, extract_pages
+from utils.tokens import estimate_tokens
+
+
+def retrieval(chunks: list[dict], top_k: int) -> dict:
+    ranker = TfIdfRanker(chunks)
+    at_one = covered = 0
+    tokens = []
+    for question, phrases in QUESTIONS:
+        hits = ranker.rank(question, top_k)
+        best = _normalize(hits[0]["text"])
+        context = _normalize("\n\n".join(h["text"] for h in hits))
+        at_one += all(_normalize(p) in best for p in phrases)
+        covered += all(_normalize(p) in context for p in phrases)
+        tokens.append(estimate_tokens(context))
+    return {"at_one": at_one, "covered": covered, "tokens": sum(tokens) / len(tokens)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pdf", help="Chunk this PDF instead of the fixture manual")
+    parser.add_argument("--chunk-size", type=int, default=config.RAG_CHUNK_SIZE)
+    parser.add_argument("--overlap", type=int, default=config.RAG_CHUNK_OVERLAP)
+    parser.add_argument("--target-tokens", type=int, default=config.RAG_CHUNK_TOKENS)
+    parser.add_argument("--min-tokens", type=int, default=config.RAG_CHUNK_MIN_TOKENS)
+    parser.add_argument("--batch-size", type=int, default=config.RAG_EMBED_BATCH_SIZE)
+    parser.add_argument("--top-k", type=int, default=config.RAG_TOP_K)
+    args = parser.parse_args(argv)
+
+    pages = extract_pages(args.pdf) if args.pdf else PAGES
+    splitters = {
+        "fixed": (chunk_pages(pages, args.chunk_size, args.overlap), lambda n: n),
+        "sentences": (pack(pages, args.target_tokens, args.min_tokens),
+                      lambda n: math.ceil(n / args.batch_size)),
+    }
+
+    rows = []
+    for name, (chunks, calls) in splitters.items():
+        row = [name, len(chunks), calls(len(chunks)), sum(estimate_tokens(c["text"]) for c in chunks),
+               sum(c.get("page_end", c["page"]) != c["page"] for c in chunks)]
+        if args.pdf:
+            row += ["-", "-", "-"]
+        else:
+            r = retrieval(chunks, args.top_k)
+            row += [f"{r['at_one']}/{len(QUESTIONS)}", f"{r['covered']}/{len(QUESTIONS)}", f"{r['tokens']:.0f}"]
+        rows.append(row)
+    print_table(["splitter", "chunks", "embed calls", "embedded tokens", "cross-page", "answer@1",
+                 f"covered@{args.top_k}", f"top-{args.top_k} tokens"], rows)
+    print(f"{len(pages)} pages; fixed {args.chunk_size} chars / {args.overlap} overlap; "
+          f"sentences ~{args.target_tokens} tokens, carry-over under {args.min_tokens}")
+
+
+if __name__ == "__main__":
+    main()
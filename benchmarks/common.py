@@ -0,0 +1,60 @@
+"""
+Small helpers shared by the benchmark scripts: percentiles, an event-loop
+lag probe, and a plain-text table printer.
+"""
+import asyncio
+import math
+import time
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile; returns NaN for an empty list."""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def ms(seconds: float) -> str:
+    return "-" if math.isnan(seconds) else f"{seconds * 1000:.0f}"
+
+
+class LoopLagProbe:
+    """Measures how late a periodic ``asyncio.sleep`` wakes up on a loop.
+
+    Any lateness is time the loop spent running something that didn't yield
+    (sync I/O, CPU work), so this is a direct measure of how responsive the
+    loop is to every other connection it is serving.
+    """
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    def reset(self) -> list[float]:
+        samples, self.samples = self.samples, []
+        return samples
+
+
+def print_table(headers: list[str], rows: list[list]):
+    widths = [max([len(str(h))] + [len(str(r[i])) for r in rows]) for i, h in enumerate(headers)]
+    line = "  ".join(str(h).rjust(w) for h, w in zip(headers, widths))
+    print(line)
+    print("-" * len(line))
+    for row in rows:
+        print("  ".join(str(c).rjust(w) for c, w in zip(row, widths)))
@@ -0,0 +1,306 @@
+"""
+Offline end-to-end latency benchmark for the real-time voice path.
+
+Boots ``main.app`` under uvicorn against the local stand-ins in
+``benchmarks/fakes.py`` (no API keys, no network), then drives N concurrent
+synthetic voice sessions through ``/ws/{session_id}`` exactly like the
+browser does: 16 kHz PCM frames paced in real time, speech followed by
+silence, one spoken turn after another.
+
+For every concurrency level it reports, measured from the client side from
+the moment the synthetic speaker stops talking:
+
+- time to transcript (endpointing + STT)
+- time to first audio (TTFA) of the answer, and to first sound including
+  the filler clip played during tool calls
+- full turn latency (until ``final_audio``)
+- completed turns per second
+- event-loop lag of the app's loop (how long it was blocked)
+
+plus the upstream call counts and the tool prefetch hit/waste totals
+(services/prefetch.py; set TOOL_PREFETCH_ENABLED=false to compare without).
+
+The fakes, the app and the load generator each run on their own thread and
+event loop, so a blocked app loop shows up as lag and latency instead of
+silently stalling the load generator or the upstreams.
+
+Usage (from the repo root):
+
+    python -m benchmarks.e2e_latency --concurrency 1,4,16 --turns 3
+    python -m benchmarks.e2e_latency --gemini-first-token 800:200 --json out.json
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, asdict
+
+import uvicorn
+import websockets
+
+from benchmarks.common import LoopLagProbe, ms, percentile, print_table
+from benchmarks.fakes import (
+    SAMPLE_RATE, UTTERANCES, FakeProfile, FakeUpstreams, Latency, silence_frame, speech_frame,
+)
+
+
+@dataclass
+class TurnResult:
+    ok: bool = False
+    stt: float = math.nan
+    ttfa: float = math.nan
+    first_sound: float = math.nan    # answer audio or filler clip, whichever came first
+    total: float = math.nan
+
+
+class AppServer:
+    """Serves an ASGI app with uvicorn on a dedicated thread and event loop."""
+
+    def __init__(self, app, host: str = "127.0.0.1"):
+        self.server = uvicorn.Server(uvicorn.Config(
+            app, host=host, port=0, log_level="warning", lifespan="on", loop="asyncio",
+        ))
+        self.host = host
+        self.loop = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="app-server", daemon=True)
+        self._thread.start()
+        deadline = time.time() + 15
+        while not self.server.started:
+            if time.time() > deadline or not self._thread.is_alive():
+                raise RuntimeError("App server failed to start")
+            time.sleep(0.05)
+        return self
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.serve())
+
+    @property
+    def port(self) -> int:
+        return self.server.servers[0].sockets[0].getsockname()[1]
+
+    def call(self, fn):
+        """Runs a plain callable on the app loop and waits for it."""
+        done = threading.Event()
+        result = {}
+
+        def _wrapper():
+            result["value"] = fn()
+            done.set()
+
+        self.loop.call_soon_threadsafe(_wrapper)
+        done.wait(timeout=10)
+        return result.get("value")
+
+    def stop(self):
+        self.server.should_exit = True
+        self._thread.join(timeout=15)
+
+
+async def run_session(ws_url: str, session_no: int, args) -> list[TurnResult]:
+    samples = SAMPLE_RATE * args.frame_ms // 1000
+    frame_s = args.frame_ms / 1000
+    state = {"utterance": None}
+    results = []
+
+    async with websockets.connect(ws_url, max_size=None) as ws:
+        async def send_audio():
+            next_at = time.perf_counter()
+            while True:
+                utterance = state["utterance"]
+                await ws.send(speech_frame(utterance, samples) if utterance is not None else silence_frame(samples))
+                next_at += frame_s
+                await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+
+        sender = asyncio.create_task(send_audio())
+        try:
+            for turn in range(args.turns):
+                state["utterance"] = (session_no + turn) % len(UTTERANCES)
+                await asyncio.sleep(args.speech_ms / 1000)
+                state["utterance"] = None
+                speech_end = time.perf_counter()
+                results.append(await _await_reply(ws, speech_end, args.turn_timeout))
+                await asyncio.sleep(args.think_ms / 1000)
+        finally:
+            sender.cancel()
+    return results
+
+
+async def _await_reply(ws, speech_end: float, timeout: float) -> TurnResult:
+    result = TurnResult()
+    deadline = speech_end + timeout
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return result
+        try:
+            message = await asyncio.wait_for(ws.recv(), remaining)
+        except asyncio.TimeoutError:
+            return result
+        now = time.perf_counter() - speech_end
+        if isinstance(message, bytes):
+            continue
+        try:
+            data = json.loads(message)
+        except json.JSONDecodeError:
+            # Plain-text frames are the echoed final transcript.
+            result.stt = now
+            continue
+        if not isinstance(data, dict):
+            continue
+        if ("audio_chunk" in data or "filler_chunk" in data) and math.isnan(result.first_sound):
+            result.first_sound = now
+        if "audio_chunk" in data and math.isnan(result.ttfa):
+            result.ttfa = now
+        if data.get("status") == "final_audio":
+            result.ok, result.total = True, now
+            return result
+        if data.get("status") == "error":
+            return result
+
+
+async def run_level(port: int, concurrency: int, args) -> tuple[list[TurnResult], float]:
+    user_id = f"bench-user-{uuid.uuid4().hex[:8]}"
+
+    async def one(session_no: int):
+        await asyncio.sleep(session_no * args.ramp_ms / 1000)
+        url = f"ws://127.0.0.1:{port}/ws/bench-{uuid.uuid4()}?user_id={user_id}"
+        try:
+            return await run_session(url, session_no, args)
+        except Exception as e:
+            logging.getLogger("benchmarks").warning(f"Session {session_no} failed: {e}")
+            return [TurnResult()]
+
+    started = time.perf_counter()
+    per_session = await asyncio.gather(*(one(i) for i in range(concurrency)))
+    return [r for session in per_session for r in session], time.perf_counter() - started
+
+
+def summarize(concurrency: int, results: list[TurnResult], wall: float, lag: list[float]) -> dict:
+    ok = [r for r in results if r.ok]
+    return {
+        "concurrency": concurrency,
+        "turns_ok": len(ok),
+        "turns_failed": len(results) - len(ok),
+        "stt_p50": percentile([r.stt for r in ok if not math.isnan(r.stt)], 50),
+        "ttfa_p50": percentile([r.ttfa for r in ok], 50),
+        "ttfa_p95": percentile([r.ttfa for r in ok], 95),
+        "first_sound_p50": percentile([r.first_sound for r in ok], 50),
+        "turn_p50": percentile([r.total for r in ok], 50),
+        "turn_p90": percentile([r.total for r in ok], 90),
+        "turn_p99": percentile([r.total for r in ok], 99),
+        "turns_per_s": len(ok) / wall if wall else 0.0,
+        "loop_lag_p50": percentile(lag, 50),
+        "loop_lag_p99": percentile(lag, 99),
+        "loop_lag_max": max(lag) if lag else math.nan,
+    }
+
+
+def build_profile(args) -> FakeProfile:
+    return FakeProfile(
+        stt=Latency.parse(args.stt_latency),
+        silence_ms=args.silence_ms,
+        gemini_first_token=Latency.parse(args.gemini_first_token),
+        gemini_token=Latency.parse(args.gemini_token),
+        embed=Latency.parse(args.embed_latency),
+        murf_first_chunk=Latency.parse(args.murf_first_chunk),
+        murf_chunk=Latency.parse(args.murf_chunk),
+        http=Latency.parse(args.http_latency),
+        seed=args.seed,
+    )
+
+
+def boot_app(fakes: FakeUpstreams, data_dir: str, verbose: bool):
+    """Points config at the fakes + a scratch data dir, then imports main.
+
+    ``config`` reads the environment at import time, so it is reloaded in
+    case something (e.g. utils.logger, via services.session_recorder)
+    already imported it. Must run before anything imports ``main``.
+    """
+    os.environ.update(fakes.env())
+    os.environ.update({
+        "DB_PATH": os.path.join(data_dir, "app_data.db"),
+        "CHROMA_PATH": os.path.join(data_dir, "chroma_db"),
+        "UPLOAD_DIR": os.path.join(data_dir, "uploads"),
+        "FILLER_DIR": os.path.join(data_dir, "fillers"),
+    })
+    if "config" in sys.modules:
+        importlib.reload(sys.modules["config"])
+    app_module = importlib.import_module("main")
+    if not verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    return app_module.app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated session counts to run")
+    parser.add_argument("--turns", type=int, default=3, help="Spoken turns per session")
+    parser.add_argument("--frame-ms", type=int, default=50, help="PCM frame size sent by the client")
+    parser.add_argument("--speech-ms", type=int, default=1200, help="Length of each synthetic utterance")
+    parser.add_argument("--think-ms", type=int, default=300, help="Pause between a reply and the next utterance")
+    parser.add_argument("--ramp-ms", type=int, default=20, help="Stagger between session starts")
+    parser.add_argument("--turn-timeout", type=float, default=30.0, help="Seconds before a turn counts as failed")
+    parser.add_argument("--silence-ms", type=int, default=300, help="Trailing silence that ends a turn (fake STT)")
+    for name, default in [("stt-latency", "150:30"), ("gemini-first-token", "400:100"), ("gemini-token", "30:10"),
+                          ("embed-latency", "80:20"), ("murf-first-chunk", "250:50"), ("murf-chunk", "60:20"),
+                          ("http-latency", "120:40")]:
+        parser.add_argument(f"--{name}", default=default, help=f"MEAN[:JITTER] ms (default {default})")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Also write the summary rows to this file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's INFO logs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    levels = [int(n) for n in args.concurrency.split(",") if n.strip()]
+
+    fakes = FakeUpstreams(build_profile(args)).start()
+    data_dir = tempfile.mkdtemp(prefix="voice-bench-")
+    server = AppServer(boot_app(fakes, data_dir, args.verbose)).start()
+    probe = LoopLagProbe()
+    server.call(probe.start)
+
+    rows = []
+    try:
+        for concurrency in levels:
+            server.call(probe.reset)
+            results, wall = asyncio.run(run_level(server.port, concurrency, args))
+            lag = server.call(probe.reset) or []
+            rows.append(summarize(concurrency, results, wall, lag))
+    finally:
+        server.call(probe.stop)
+        server.stop()
+        fakes.stop()
+
+    print_table(
+        ["N", "ok", "fail", "stt p50", "ttfa p50", "ttfa p95", "sound p50", "turn p50", "turn p90", "turn p99",
+         "turns/s", "lag p50", "lag p99", "lag max"],
+        [[r["concurrency"], r["turns_ok"], r["turns_failed"], ms(r["stt_p50"]), ms(r["ttfa_p50"]), ms(r["ttfa_p95"]),
+          ms(r["first_sound_p50"]), ms(r["turn_p50"]), ms(r["turn_p90"]), ms(r["turn_p99"]), f"{r['turns_per_s']:.2f}",
+          ms(r["loop_lag_p50"]), ms(r["loop_lag_p99"]), ms(r["loop_lag_max"])] for r in rows],
+    )
+    print("(latencies in ms, measured from end of synthetic speech)")
+    print(f"Upstream calls: {fakes.counters}")
+    print(f"Tool prefetch: {importlib.import_module('services.prefetch').stats()}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"profile": asdict(build_profile(args)), "levels": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,485 @@
+"""
+Local stand-ins for every upstream the voice pipeline talks to, so the app
+can be exercised end to end without real API keys.
+
+One aiohttp server hosts all of them on a single port:
+
+- ``/assembly/v3/ws``     AssemblyAI v3 streaming STT (WebSocket)
+- ``/gemini/...``         Gemini generateContent / streamGenerateContent /
+                          batchEmbedContents (REST + SSE)
+- ``/murf/ws``            Murf streaming TTS (WebSocket)
+- ``/finnhub/api/v1/...`` Finnhub quote / profile2 / news
+- ``/openweather/...``    OpenWeather current weather + forecast
+- ``/coinmarketcap/...``  CoinMarketCap quotes/latest
+
+Every stand-in sleeps for a configurable ``Latency`` (mean +/- jitter) before
+answering, so the numbers the harness reports move the way they would
+against the real providers as those latencies change.
+
+*What* the stand-ins answer is delegated to a scenario object.
+``SyntheticScenario`` is the default: scripted utterances, keyword-driven
+function calls and deterministic market/weather data. Other scenarios (e.g.
+``benchmarks/replay.py`` replaying a recorded session) only need to provide
+the same methods; any answer item carrying a ``_delay`` key (seconds) is
+paced by that instead of the profile latency.
+
+Synthetic audio protocol: the benchmark client sends 16-bit PCM where speech
+frames are filled with ``SPEECH_MARKER + utterance_index`` and silence frames
+are zero. The fake STT picks the transcript from that marker and ends the
+turn after ``silence_ms`` of trailing silence, like real endpointing.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+
+from aiohttp import web, WSMsgType
+
+SAMPLE_RATE = 16000
+SPEECH_MARKER = 1000
+MURF_SAMPLE_RATE = 44100
+
+# Mix of plain chat turns and turns that make Gemini call a tool.
+UTTERANCES = [
+    "What's the price of AAPL right now?",
+    "Tell me a fun fact about the ocean.",
+    "What's the weather like in Mumbai?",
+    "Compare TSLA and MSFT for me.",
+    "How are you doing today?",
+    "What is Bitcoin trading at?",
+]
+
+_KNOWN_TICKERS = {"AAPL", "TSLA", "MSFT", "GOOGL", "AMZN", "NVDA"}
+
+
+@dataclass
+class Latency:
+    """A delay of ``mean_ms`` +/- uniform ``jitter_ms`` (never negative)."""
+    mean_ms: float = 0.0
+    jitter_ms: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        """Parses "MEAN" or "MEAN:JITTER" (milliseconds)."""
+        mean, _, jitter = spec.partition(":")
+        return cls(float(mean), float(jitter or 0))
+
+    def sample(self, rng: random.Random) -> float:
+        """Returns a delay in seconds."""
+        delay = self.mean_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, delay) / 1000
+
+    async def sleep(self, rng: random.Random):
+        delay = self.sample(rng)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class FakeProfile:
+    """Latency knobs for every stand-in."""
+    stt: Latency = field(default_factory=lambda: Latency(150, 30))
+    silence_ms: int = 300
+    gemini_first_token: Latency = field(default_factory=lambda: Latency(400, 100))
+    gemini_token: Latency = field(default_factory=lambda: Latency(30, 10))
+    embed: Latency = field(default_factory=lambda: Latency(80, 20))
+    murf_first_chunk: Latency = field(default_factory=lambda: Latency(250, 50))
+    murf_chunk: Latency = field(default_factory=lambda: Latency(60, 20))
+    http: Latency = field(default_factory=lambda: Latency(120, 40))
+    seed: int = 7
+
+
+def speech_frame(utterance_index: int, samples: int) -> bytes:
+    return struct.pack("<h", SPEECH_MARKER + utterance_index) * samples
+
+
+def silence_frame(samples: int) -> bytes:
+    return b"\x00\x00" * samples
+
+
+def _stable_fraction(key: str) -> float:
+    """Deterministic 0..1 value per key, so fake prices don't wobble between runs."""
+    return int(hashlib.sha256(key.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+
+
+def _wav_header(data_length: int) -> bytes:
+    return (b"RIFF" + struct.pack("<I", 36 + data_length) + b"WAVEfmt "
+            + struct.pack("<IHHIIHH", 16, 1, 1, MURF_SAMPLE_RATE, MURF_SAMPLE_RATE * 2, 2, 16)
+            + b"data" + struct.pack("<I", data_length))
+
+
+def _text_part(text: str) -> dict:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}]}
+
+
+def _final(chunk: dict) -> dict:
+    chunk["candidates"][0]["finishReason"] = "STOP"
+    return chunk
+
+
+class SyntheticSttSession:
+    """Silence-based endpointing over the marker-encoded synthetic PCM."""
+
+    def __init__(self, scenario: "SyntheticScenario", silence_ms: int):
+        self.scenario = scenario
+        self.silence_bytes = silence_ms * SAMPLE_RATE * 2 // 1000
+        self.utterance = None
+        self.trailing_silence = 0
+
+    def feed(self, frame: bytes) -> str | dict | None:
+        """Returns the transcript (or a full Turn event) once a spoken turn
+        has ended, else None."""
+        if len(frame) < 2:
+            return None
+        (first_sample,) = struct.unpack_from("<h", frame)
+        if first_sample >= SPEECH_MARKER:
+            self.utterance = first_sample - SPEECH_MARKER
+            self.trailing_silence = 0
+            return None
+        if self.utterance is None:
+            return None
+        self.trailing_silence += len(frame)
+        if self.trailing_silence < self.silence_bytes:
+            return None
+        utterance, self.utterance = self.utterance, None
+        return self.scenario.transcript(utterance)
+
+
+class SyntheticScenario:
+    """Scripted, deterministic answers for every stand-in."""
+
+    def __init__(self, profile: FakeProfile):
+        self.profile = profile
+
+    def transcript(self, utterance_index: int) -> str:
+        return UTTERANCES[utterance_index % len(UTTERANCES)]
+
+    def new_stt_session(self) -> SyntheticSttSession:
+        return SyntheticSttSession(self, self.profile.silence_ms)
+
+    # ---- Gemini ----
+    def gemini_chunks(self, body: dict) -> list[dict]:
+        contents = body.get("contents") or []
+        last_parts = contents[-1].get("parts", []) if contents else []
+        text = " ".join(p.get("text", "") for p in last_parts)
+        lowered = text.lower()
+
+        if any("functionResponse" in p for p in last_parts) or text.startswith(("Function call results", "Tool results")):
+            return self._text_chunks("Here's what I found: the numbers look steady today, "
+                                     "with only small moves since the last close.")
+        if "extract durable facts" in lowered:
+            return [_final(_text_part("[]"))]
+
+        if body.get("tools"):
+            call = self._function_call_for(lowered)
+            if call:
+                return [_final({"candidates": [{"content": {"role": "model", "parts": [{"functionCall": call}]}, "index": 0}]})]
+
+        return self._text_chunks("Sure! Here's a quick answer to keep things moving. "
+                                 "Let me know if you'd like more detail on any of it.")
+
+    def _function_call_for(self, lowered: str) -> dict | None:
+        if "weather" in lowered:
+            city = lowered.rsplit(" in ", 1)[-1].strip(" ?.!") or "mumbai"
+            return {"name": "get_current_weather_func", "args": {"location": city.title()}}
+        symbols = [w.strip("?,.!").upper() for w in lowered.split()]
+        symbols = [s for s in symbols if s in _KNOWN_TICKERS]
+        if "compare" in lowered:
+            return {"name": "compare_stocks", "args": {"symbols": ",".join(symbols or ["TSLA", "MSFT"])}}
+        if "bitcoin" in lowered or "btc" in lowered:
+            return {"name": "get_crypto_price", "args": {"symbol": "BTC"}}
+        if symbols and ("price" in lowered or "trading" in lowered):
+            return {"name": "get_stock_price", "args": {"symbol": symbols[0]}}
+        return None
+
+    @staticmethod
+    def _text_chunks(text: str, words_per_chunk: int = 4) -> list[dict]:
+        words = text.split(" ")
+        pieces = [" ".join(words[i:i + words_per_chunk]) + " " for i in range(0, len(words), words_per_chunk)]
+        pieces[-1] = pieces[-1].rstrip()
+        chunks = [_text_part(p) for p in pieces]
+        _final(chunks[-1])
+        return chunks
+
+    def embedding(self, text: str, dims: int = 768) -> list[float]:
+        seed = int(hashlib.sha256(text.encode()).hexdigest()[:16], 16)
+        rng = random.Random(seed)
+        return [rng.uniform(-1, 1) for _ in range(dims)]
+
+    # ---- Murf ----
+    def murf_messages(self, text: str, context_id: str) -> list[dict]:
+        """Roughly a quarter second of audio per 40 characters of input text."""
+        chunk_bytes = MURF_SAMPLE_RATE // 4 * 2
+        n_chunks = max(1, math.ceil(len(text) / 40))
+        messages = []
+        for i in range(n_chunks):
+            pcm = b"\x00\x01" * (chunk_bytes // 2)
+            if i == 0:
+                pcm = _wav_header(chunk_bytes * n_chunks) + pcm
+            messages.append({"audio": base64.b64encode(pcm).decode(), "context_id": context_id})
+        messages.append({"final": True, "context_id": context_id})
+        return messages
+
+
+class FakeUpstreams:
+    """Runs every stand-in on one local port, in its own thread and event loop
+    so a blocked application loop can never stall the fakes (and vice versa)."""
+
+    def __init__(self, profile: FakeProfile | None = None, scenario=None, host: str = "127.0.0.1"):
+        self.profile = profile or FakeProfile()
+        self.scenario = scenario or SyntheticScenario(self.profile)
+        self.host = host
+        self.port = None
+        self.rng = random.Random(self.profile.seed)
+        self.counters = {"stt_turns": 0, "gemini_calls": 0, "embed_calls": 0, "murf_calls": 0, "http_calls": 0}
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    # ---- lifecycle ----
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="fake-upstreams", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout=10):
+            raise RuntimeError("Fake upstreams failed to start")
+        return self
+
+    def stop(self):
+        if self._loop:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(timeout=10)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._runner = web.AppRunner(self._build_app(), access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, 0)
+        self._loop.run_until_complete(site.start())
+        self.port = self._runner.addresses[0][1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def env(self) -> dict:
+        """Environment variables that point the app (and the Gemini SDK) here."""
+        ws_base = f"ws://{self.host}:{self.port}"
+        return {
+            "ASSEMBLY_AI_API_KEY": "bench",
+            "MURF_API_KEY": "bench",
+            "GEMINI_API_KEY": "bench",
+            "FINNHUB_API_KEY": "bench",
+            "OPENWEATHER_API_KEY": "bench",
+            "COINMARKETCAP_API_KEY": "bench",
+            "ASSEMBLY_AI_STREAMING_HOST": f"{ws_base}/assembly",
+            "MURF_WS_URL": f"{ws_base}/murf/ws",
+            "FINNHUB_BASE_URL": f"{self.base_url}/finnhub/api/v1",
+            "OPENWEATHER_BASE_URL": f"{self.base_url}/openweather/data/2.5",
+            "COINMARKETCAP_BASE_URL": f"{self.base_url}/coinmarketcap/v1",
+            "GOOGLE_GEMINI_BASE_URL": f"{self.base_url}/gemini/",
+        }
+
+    def _build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/assembly/v3/ws", self._assembly_ws)
+        app.router.add_post("/gemini/{version}/models/{target}", self._gemini)
+        app.router.add_get("/murf/ws", self._murf_ws)
+        app.router.add_get("/finnhub/api/v1/quote", self._finnhub_quote)
+        app.router.add_get("/finnhub/api/v1/stock/profile2", self._finnhub_profile)
+        app.router.add_get("/finnhub/api/v1/news", self._finnhub_news)
+        app.router.add_get("/finnhub/api/v1/company-news", self._finnhub_news)
+        app.router.add_get("/openweather/data/2.5/weather", self._weather)
+        app.router.add_get("/openweather/data/2.5/forecast", self._forecast)
+        app.router.add_get("/coinmarketcap/v1/cryptocurrency/quotes/latest", self._cmc_quotes)
+        return app
+
+    async def _pace(self, item: dict, latency: Latency):
+        """Sleeps for the item's own ``_delay`` (seconds, set by replay
+        scenarios) if it carries one, else for the profile latency."""
+        delay = item.pop("_delay", None)
+        if delay is None:
+            await latency.sleep(self.rng)
+        elif delay > 0:
+            await asyncio.sleep(delay)
+
+    # ---- AssemblyAI ----
+    async def _assembly_ws(self, request: web.Request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        started = time.time()
+        await ws.send_json({"type": "Begin", "id": f"fake-{id(ws)}", "expires_at": int(started) + 3600})
+
+        stt = self.scenario.new_stt_session()
+        turn_order = 0
+        audio_bytes = 0
+
+        async def emit_turn(order: int, turn: str | dict):
+            if isinstance(turn, str):
+                turn = {"type": "Turn", "turn_order": order, "turn_is_formatted": True, "end_of_turn": True,
+                        "transcript": turn, "end_of_turn_confidence": 1.0, "words": []}
+            await self._pace(turn, self.profile.stt)
+            if ws.closed:
+                return
+            self.counters["stt_turns"] += 1
+            await ws.send_json(turn)
+
+        async for msg in ws:
+            if msg.type == WSMsgType.BINARY:
+                audio_bytes += len(msg.data)
+                turn = stt.feed(msg.data)
+                if turn:
+                    asyncio.create_task(emit_turn(turn_order, turn))
+                    turn_order += 1
+            elif msg.type == WSMsgType.TEXT:
+                if json.loads(msg.data).get("type") == "Terminate":
+                    await ws.send_json({
+                        "type": "Termination",
+                        "audio_duration_seconds": audio_bytes // (SAMPLE_RATE * 2),
+                        "session_duration_seconds": int(time.time() - started),
+                    })
+                    break
+        await ws.close()
+        return ws
+
+    # ---- Gemini ----
+    async def _gemini(self, request: web.Request):
+        _, _, method = request.match_info["target"].partition(":")
+        body = await request.json()
+
+        if method == "batchEmbedContents":
+            self.counters["embed_calls"] += 1
+            await self.profile.embed.sleep(self.rng)
+            embeddings = []
+            for req in body.get("requests", []):
+                text = " ".join(p.get("text", "") for p in req.get("content", {}).get("parts", []))
+                embeddings.append({"values": self.scenario.embedding(text, req.get("outputDimensionality") or 768)})
+            return web.json_response({"embeddings": embeddings})
+
+        self.counters["gemini_calls"] += 1
+        chunks = self.scenario.gemini_chunks(body)
+
+        if method == "generateContent":
+            for i, chunk in enumerate(chunks):
+                await self._pace(chunk, self.profile.gemini_token if i else self.profile.gemini_first_token)
+            return web.json_response(self._merge_chunks(chunks))
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for i, chunk in enumerate(chunks):
+            await self._pace(chunk, self.profile.gemini_token if i else self.profile.gemini_first_token)
+            await response.write(f"data: {json.dumps(chunk)}\r\n\r\n".encode())
+        await response.write_eof()
+        return response
+
+    @staticmethod
+    def _merge_chunks(chunks: list[dict]) -> dict:
+        parts, text = [], ""
+        for chunk in chunks:
+            for part in chunk["candidates"][0]["content"]["parts"]:
+                if "text" in part:
+                    text += part["text"]
+                else:
+                    parts.append(part)
+        if text:
+            parts.insert(0, {"text": text})
+        return {"candidates": [{"content": {"role": "model", "parts": parts}, "finishReason": "STOP", "index": 0}]}
+
+    # ---- Murf ----
+    async def _murf_ws(self, request: web.Request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        context_id, text = None, ""
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            data = json.loads(msg.data)
+            context_id = data.get("context_id", context_id)
+            text += data.get("text", "")
+            if data.get("end"):
+                break
+
+        self.counters["murf_calls"] += 1
+        for i, message in enumerate(self.scenario.murf_messages(text, context_id)):
+            if not i:
+                await self._pace(message, self.profile.murf_first_chunk)
+            elif "audio" in message or "_delay" in message:
+                await self._pace(message, self.profile.murf_chunk)
+            if ws.closed:
+                break
+            await ws.send_str(json.dumps(message))
+        await ws.close()
+        return ws
+
+    # ---- Finnhub / OpenWeather / CoinMarketCap ----
+    async def _http_delay(self):
+        self.counters["http_calls"] += 1
+        await self.profile.http.sleep(self.rng)
+
+    async def _finnhub_quote(self, request: web.Request):
+        await self._http_delay()
+        symbol = request.query.get("symbol", "").upper()
+        price = 50 + 450 * _stable_fraction(symbol)
+        change = round((_stable_fraction(symbol + "d") - 0.5) * 10, 2)
+        return web.json_response({
+            "c": round(price, 2), "d": change, "dp": round(change / price * 100, 2),
+            "h": round(price + 3, 2), "l": round(price - 3, 2), "o": round(price - change, 2), "pc": round(price - change, 2),
+        })
+
+    async def _finnhub_profile(self, request: web.Request):
+        await self._http_delay()
+        symbol = request.query.get("symbol", "").upper()
+        return web.json_response({"name": symbol, "ticker": symbol,
+                                  "marketCapitalization": round(1e5 + 2e6 * _stable_fraction(symbol + "cap"), 1)})
+
+    async def _finnhub_news(self, request: web.Request):
+        await self._http_delay()
+        now = int(time.time())
+        return web.json_response([
+            {"headline": f"Markets move on headline {i}", "summary": "Stocks were mixed as investors weighed new data.",
+             "source": "FakeWire", "datetime": now - i * 3600}
+            for i in range(1, 6)
+        ])
+
+    async def _cmc_quotes(self, request: web.Request):
+        await self._http_delay()
+        data = {}
+        for symbol in request.query.get("symbol", "").upper().split(","):
+            if not symbol:
+                continue
+            price = 100 + 60000 * _stable_fraction(symbol)
+            rank = 1 + int(200 * _stable_fraction(symbol + "rank"))
+            data[symbol] = {"name": symbol.title(), "cmc_rank": rank, "quote": {"USD": {
+                "price": price, "percent_change_24h": round((_stable_fraction(symbol + "d") - 0.5) * 8, 2),
+                "market_cap": price * 19e6, "volume_24h": price * 4e5,
+            }}}
+        return web.json_response({"data": data})
+
+    def _weather_block(self, city: str) -> dict:
+        temp = round(15 + 20 * _stable_fraction(city.lower()), 1)
+        return {"main": {"temp": temp, "feels_like": temp + 1, "humidity": 60, "pressure": 1012},
+                "weather": [{"description": "scattered clouds"}], "wind": {"speed": 3.5}}
+
+    async def _weather(self, request: web.Request):
+        await self._http_delay()
+        city = request.query.get("q", "Nowhere")
+        return web.json_response({"name": city.title(), "sys": {"country": "XX"}, "visibility": 10000,
+                                  **self._weather_block(city)})
+
+    async def _forecast(self, request: web.Request):
+        await self._http_delay()
+        city = request.query.get("q", "Nowhere")
+        return web.json_response({
+            "city": {"name": city.title(), "country": "XX"},
+            "list": [{"dt_txt": f"2026-01-01 {h:02d}:00:00", **self._weather_block(f"{city}{h}")} for h in range(0, 24, 3)],
+        })
@@ -0,0 +1,151 @@
+"""
+Accuracy and latency of the local intent router (services/intent_router.py)
+on a labeled utterance set.
+
+Every utterance is labeled with the tool call a careful model would make
+for it, or None when it should go through the normal tool loop (chit-chat,
+open-ended or multi-part questions). For a sweep of thresholds it reports:
+
+- routed: utterances the router would take at that threshold;
+- correct / wrong: routed with the labeled tool and arguments, or not
+  (a wrong route answers the wrong question, so it is the number to keep
+  at zero);
+- coverage: share of the labeled tool questions routed correctly;
+- rounds saved: Gemini rounds skipped, counting two per templated answer
+  (at the template threshold) and one per grounded answer.
+
+Plus ``classify`` time per utterance. End to end, run
+``INTENT_ROUTER_ENABLED=true python -m benchmarks.e2e_latency`` against the
+same run without it.
+
+Usage (from the repo root):
+
+    python -m benchmarks.intent_router
+    python -m benchmarks.intent_router --template-threshold 0.95 --show-errors
+"""
+import argparse
+import time
+
+import config
+from benchmarks.common import percentile, print_table
+from services.intent_router import classify
+
+STOCK, CRYPTO, COMPARE = "get_stock_price", "get_crypto_price", "compare_stocks"
+WEATHER, FORECAST = "get_current_weather_func", "get_weather_forecast_func"
+
+
+def _weather(tool, city, units="metric"):
+    return tool, {"location": city, "units": units}
+
+
+LABELED = [
+    ("What's the price of AAPL right now?", (STOCK, {"symbol": "AAPL"})),
+    ("price of BTC", (CRYPTO, {"symbol": "BTC"})),
+    ("What is Bitcoin trading at?", (CRYPTO, {"symbol": "BTC"})),
+    ("How much is ethereum worth today?", (CRYPTO, {"symbol": "ETH"})),
+    ("Tesla stock price", (STOCK, {"symbol": "TSLA"})),
+    ("How is Nvidia doing today?", (STOCK, {"symbol": "NVDA"})),
+    ("what's MSFT trading at", (STOCK, {"symbol": "MSFT"})),
+    ("Give me a quote for Amazon", (STOCK, {"symbol": "AMZN"})),
+    ("How much does one dogecoin cost?", (CRYPTO, {"symbol": "DOGE"})),
+    ("solana price please", (CRYPTO, {"symbol": "SOL"})),
+    ("Is Apple stock up today?", (STOCK, {"symbol": "AAPL"})),
+    ("Netflix share price", (STOCK, {"symbol": "NFLX"})),
+    ("Compare TSLA and MSFT for me.", (COMPARE, {"symbols": "TSLA,MSFT"})),
+    ("Compare Apple, Google and Microsoft", (COMPARE, {"symbols": "AAPL,GOOGL,MSFT"})),
+    ("Nvidia versus AMD stock", (COMPARE, {"symbols": "NVDA,AMD"})),
+    ("What's the weather like in Mumbai?", _weather(WEATHER, "Mumbai")),
+    ("weather in Pune", _weather(WEATHER, "Pune")),
+    ("What's the temperature in London right now?", _weather(WEATHER, "London")),
+    ("Is it raining in Bangalore?", _weather(WEATHER, "Bangalore")),
+    ("What's the forecast for Delhi tomorrow?", _weather(FORECAST, "Delhi")),
+    ("Will it rain in Chennai tomorrow?", _weather(FORECAST, "Chennai")),
+    ("weather in New York in fahrenheit", _weather(WEATHER, "New York", "imperial")),
+    ("How hot is it in Dubai?", _weather(WEATHER, "Dubai")),
+    ("Is it cold in Toronto today?", _weather(WEATHER, "Toronto")),
+    ("Weekend forecast for San Francisco", _weather(FORECAST, "San Francisco")),
+    ("Tell me a fun fact about the ocean.", None),
+    ("How are you doing today?", None),
+    ("What's your name?", None),
+    ("Should I buy Tesla stock?", None),
+    ("Why did Apple stock drop yesterday?", None),
+    ("Explain what a market cap is", None),
+    ("What's the latest market news?", None),
+    ("Analyze my portfolio of AAPL and BTC", None),
+    ("What's the price of AAPL and the weather in Mumbai?", None),
+    ("I ate an apple for breakfast", None),
+    ("Remind me what we talked about earlier", None),
+    ("What was bitcoin's price last year?", None),
+    ("Do you think it will rain in Pune next week, and should I cancel my trip?", None),
+    ("I'm flying to Paris next month", None),
+    ("Tell me about the history of Amazon", None),
+    ("How do I pronounce Shopify?", None),
+    ("Bitcoin and ethereum prices", None),
+    ("Weather in Mumbai and Delhi", None),
+    # Known hard cases.
+    ("How are TSLA and MSFT doing?", (COMPARE, {"symbols": "TSLA,MSFT"})),
+    ("Pune weather", _weather(WEATHER, "Pune")),
+    ("How's the weather?", None),
+    ("Is it hot in here?", None),
+    ("What's the resale value of a Tesla Model 3?", None),
+    ("How much is a used Tesla worth?", None),
+    ("What's Tesla stock worth today?", (STOCK, {"symbol": "TSLA"})),
+    ("What's TSLA worth right now?", (STOCK, {"symbol": "TSLA"})),
+    ("Is Meta a good place to work?", None),
+    ("What does an Uber from the airport cost?", None),
+]
+
+
+def _same(route, label) -> bool:
+    tool, args = label
+    if route.tool != tool:
+        return False
+    if tool == COMPARE:
+        return set(route.args["symbols"].split(",")) == set(args["symbols"].split(","))
+    return route.args == args
+
+
+def evaluate(threshold: float, template_threshold: float, routes: list, show_errors: bool = False) -> list:
+    routed = correct = wrong = saved = 0
+    for (text, label), route in zip(LABELED, routes):
+        if route is None or route.confidence < threshold:
+            continue
+        routed += 1
+        if label and _same(route, label):
+            correct += 1
+            saved += 2 if route.confidence >= template_threshold else 1
+        else:
+            wrong += 1
+            if show_errors:
+                print(f"  [{threshold:.2f}] {text!r} -> {route.tool} {route.args} ({route.confidence:.2f}), "
+                      f"expected {label}")
+    labeled = sum(1 for _, label in LABELED if label)
+    return [f"{threshold:.2f}", routed, correct, wrong, f"{correct / labeled:.0%}", saved]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--thresholds", default="0.5,0.6,0.7,0.8,0.9,0.95")
+    parser.add_argument("--template-threshold", type=float, default=config.INTENT_ROUTER_TEMPLATE_THRESHOLD)
+    parser.add_argument("--repeat", type=int, default=200, help="Timing repetitions per utterance")
+    parser.add_argument("--show-errors", action="store_true", help="Print every wrong route")
+    args = parser.parse_args(argv)
+
+    routes = [classify(text) for text, _ in LABELED]
+    rows = [evaluate(float(t), args.template_threshold, routes, args.show_errors)
+            for t in args.thresholds.split(",")]
+    print_table(["threshold", "routed", "correct", "wrong", "coverage", "rounds saved"], rows)
+
+    timings = []
+    for text, _ in LABELED:
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            classify(text)
+            timings.append(time.perf_counter() - start)
+    print(f"{len(LABELED)} utterances ({sum(1 for _, label in LABELED if label)} tool questions); "
+          f"template threshold {args.template_threshold}")
+    print(f"classify: p50 {percentile(timings, 50) * 1e6:.0f} us, p99 {percentile(timings, 99) * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Quote lookups per symbol vs batched (services/quote_batch.py) with the
+long-lived company profile cache (services/skills.py).
+
+``--sessions`` concurrent sessions each run a portfolio analysis, a stock
+comparison or a single crypto price lookup over a set of popular symbols,
+starting within ``--spread-ms`` of each other, against the fake Finnhub /
+CoinMarketCap endpoints (benchmarks/fakes.py). A second round runs after the 60-second
+price cache has expired, which is where the profile cache matters.
+
+"per symbol" approximates the old path: a one-symbol batch, with no window,
+for every symbol, and the profile fetched with every quote. Reports
+upstream requests and per-session latency for each round, then checks that
+both modes return the same results.
+
+Usage (from the repo root):
+
+    python -m benchmarks.quotes
+    python -m benchmarks.quotes --sessions 100 --spread-ms 200
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import time
+
+from benchmarks.common import percentile, print_table
+from benchmarks.fakes import FakeProfile, FakeUpstreams, Latency
+
+STOCKS = ["AAPL", "MSFT", "TSLA", "NVDA", "AMZN", "GOOGL", "META"]
+PORTFOLIO_CRYPTOS = ["BTC", "ETH", "ADA", "DOT"]
+CRYPTOS = PORTFOLIO_CRYPTOS + ["SOL", "XRP", "DOGE", "AVAX", "LINK", "LTC", "TRX", "XLM"]
+
+
+def workload(sessions: int, seed: int) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    calls = []
+    for _ in range(sessions):
+        kind = rng.random()
+        if kind < 0.4:
+            symbols = rng.sample(STOCKS, 3) + rng.sample(PORTFOLIO_CRYPTOS, 2)
+            calls.append(("analyze_portfolio", json.dumps({s: rng.randint(1, 50) for s in symbols})))
+        elif kind < 0.6:
+            calls.append(("compare_stocks", ",".join(rng.sample(STOCKS, 3))))
+        else:
+            calls.append(("get_crypto_price", rng.choice(CRYPTOS)))
+    return calls
+
+
+async def run_round(skills, calls, spread_s: float, seed: int) -> tuple[list[float], list]:
+    rng = random.Random(seed)
+
+    async def session(name, arg, delay):
+        await asyncio.sleep(delay)
+        start = time.perf_counter()
+        result = await getattr(skills, name)(arg)
+        return time.perf_counter() - start, result
+
+    outcomes = await asyncio.gather(*(session(name, arg, rng.uniform(0, spread_s)) for name, arg in calls))
+    return [t for t, _ in outcomes], [r for _, r in outcomes]
+
+
+async def run(args, fakes):
+    import config
+    from services import skills
+    config.FINNHUB_API_KEY = "fake"
+    calls = workload(args.sessions, args.seed)
+    batchers = (skills._STOCK_BATCHER, skills._CRYPTO_BATCHER)
+    modes = {"per symbol": ([(0.0, 1)] * len(batchers), 0.0),
+             "batched": ([(b.window_s, b.max_symbols) for b in batchers], config.QUOTE_PROFILE_TTL_S)}
+    rows, results = [], {}
+    for name, (settings, profile_ttl) in modes.items():
+        for batcher, (window_s, max_symbols) in zip(batchers, settings):
+            batcher.window_s, batcher.max_symbols = window_s, max_symbols
+        config.QUOTE_PROFILE_TTL_S = profile_ttl
+        skills._CACHE.clear()
+        for round_name in ("cold cache", "prices expired"):
+            if round_name == "prices expired":
+                for key in [k for k in skills._CACHE if k.startswith(("stock_", "crypto_"))]:
+                    del skills._CACHE[key]
+            gc.collect()  # keep a collector pause out of the timed round
+            before = fakes.counters["http_calls"]
+            timings, results[name, round_name] = await run_round(skills, calls, args.spread_ms / 1000, args.seed)
+            rows.append([name, round_name, fakes.counters["http_calls"] - before,
+                         f"{percentile(timings, 50) * 1000:.0f}", f"{percentile(timings, 99) * 1000:.0f}"])
+    print_table(["lookups", "round", "upstream requests", "p50 ms", "p99 ms"], rows)
+
+    same = all(results["per symbol", r] == results["batched", r] for r in ("cold cache", "prices expired"))
+    print(f"same results in both modes: {same}; batching: {json.dumps(skills.quote_stats())}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--spread-ms", type=float, default=50, help="Sessions start within this window")
+    parser.add_argument("--http-ms", type=float, default=120, help="Fake market-data request latency")
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    fakes = FakeUpstreams(FakeProfile(http=Latency(args.http_ms, 0))).start()
+    os.environ.update(fakes.env())
+    os.environ.update({"FINNHUB_API_KEY": "fake", "COINMARKETCAP_API_KEY": "fake", "LOG_LEVEL": "WARNING"})
+    asyncio.run(run(args, fakes))
+    fakes.stop()
+
+if __name__ == "__main__":
+    main()
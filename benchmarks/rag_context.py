@@ -0,0 +1,145 @@
+"""
+RAG prompt context: plain top-k chunks vs the assembled context
+(services/rag/context.py) on the fixture manual (benchmarks/rag_fixture.py).
+
+The fixture pages are chunked with the app's splitter and ranked per
+question by a local TF-IDF cosine, a stand-in for the dense + BM25
+retrieval that needs no API key. For each configuration it reports:
+
+- prompt tokens (utils/tokens.py estimate) of the context block, mean and
+  p95 -- prompt size is what the context stage controls, and it is paid on
+  every RAG answer in input tokens and time to first token;
+- repeated: share of context characters that duplicate text already in
+  the context (chunk overlap, boilerplate repeated across pages);
+- coverage: questions whose context contains every phrase the answer has
+  to be grounded in, and the share of all phrases found.
+
+By default the session holds the manual twice -- the current revision and
+the previous one (``--revisions``), as happens when a user uploads an
+updated document -- so the best chunks come in near-identical pairs.
+
+``top<k>`` rows are the old behaviour (the best k chunks concatenated);
+``budget<n>`` rows assemble RAG_CONTEXT_CANDIDATES candidates into at most
+n tokens.
+
+Usage (from the repo root):
+
+    python -m benchmarks.rag_context
+    python -m benchmarks.rag_context --budgets 400,600,800 --candidates 12 --lam 0.5 --show-misses
+"""
+import argparse
+import math
+import re
+from collections import Counter
+
+import config
+from benchmarks.common import percentile, print_table
+from benchmarks.rag_fixture import PAGES, QUESTIONS
+from services.rag.context import assemble
+from services.rag.pdf_processor import chunk_pages
+from services.rag.rag_chat import _prompt
+from utils.tokens import estimate_tokens
+
+_WORD = re.compile(r"\w+")
+
+
+class TfIdfRanker:
+    def __init__(self, chunks: list[dict]):
+        self.chunks = chunks
+        docs = [Counter(_WORD.findall(c["text"].lower())) for c in chunks]
+        df = Counter(term for doc in docs for term in doc)
+        self.idf = {t: math.log(len(docs) / n) + 1 for t, n in df.items()}
+        self.vectors = [self._vector(doc) for doc in docs]
+
+    def _vector(self, counts: Counter) -> dict:
+        v = {t: (1 + math.log(n)) * self.idf.get(t, 0.0) for t, n in counts.items()}
+        norm = math.sqrt(sum(x * x for x in v.values())) or 1.0
+        return {t: x / norm for t, x in v.items()}
+
+    def rank(self, question: str, k: int) -> list[dict]:
+        q = self._vector(Counter(_WORD.findall(question.lower())))
+        scores = [sum(w * v.get(t, 0.0) for t, w in q.items()) for v in self.vectors]
+        order = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+        return [self.chunks[i] for i in order[:k]]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _context(question: str, spans: list[dict]) -> str:
+    return _prompt(question, spans).removesuffix(f"\n\nQuestion: {question}")
+
+
+def _repeated_share(spans: list[dict]) -> float:
+    """Share of characters in 40-char windows already seen earlier in the context."""
+    seen, repeated, total = set(), 0, 0
+    for span in spans:
+        text = _normalize(span["text"])
+        for i in range(0, max(1, len(text) - 39), 10):
+            window = text[i:i + 40]
+            total += 1
+            repeated += window in seen
+            seen.add(window)
+    return repeated / total if total else 0.0
+
+
+def evaluate(ranker: TfIdfRanker, build) -> dict:
+    tokens, repeated, full, phrases_found, phrases_total, misses = [], [], 0, 0, 0, []
+    for question, phrases in QUESTIONS:
+        spans = build(question)
+        context = _normalize(_context(question, spans))
+        tokens.append(estimate_tokens(context))
+        repeated.append(_repeated_share(spans))
+        found = [p for p in phrases if _normalize(p) in context]
+        phrases_found += len(found)
+        phrases_total += len(phrases)
+        if len(found) == len(phrases):
+            full += 1
+        else:
+            misses.append((question, sorted(set(phrases) - set(found))))
+    return {"tokens": tokens, "repeated": sum(repeated) / len(repeated), "full": full,
+            "phrases": phrases_found / phrases_total, "misses": misses}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--top-k", default="3,4,6", help="Plain top-k baselines")
+    parser.add_argument("--budgets", default="400,600,800", help="Context token budgets to assemble into")
+    parser.add_argument("--candidates", type=int, default=config.RAG_CONTEXT_CANDIDATES)
+    parser.add_argument("--lam", type=float, default=config.RAG_MMR_LAMBDA, help="MMR relevance weight")
+    parser.add_argument("--chunk-size", type=int, default=config.RAG_CHUNK_SIZE)
+    parser.add_argument("--overlap", type=int, default=config.RAG_CHUNK_OVERLAP)
+    parser.add_argument("--revisions", type=int, default=2, help="Copies of the manual in the session")
+    parser.add_argument("--show-misses", action="store_true")
+    args = parser.parse_args(argv)
+
+    chunks = []
+    for rev in range(args.revisions):
+        pages = [p.replace("Rev 3.1", f"Rev 3.{1 - rev}") for p in PAGES]
+        chunks += [{**c, "doc_id": f"rev{rev}", "filename": f"nw400_rev3{1 - rev}.pdf"}
+                   for c in chunk_pages(pages, args.chunk_size, args.overlap)]
+    ranker = TfIdfRanker(chunks)
+
+    configs = {f"top{k}": (lambda q, k=k: ranker.rank(q, k)) for k in map(int, args.top_k.split(","))}
+    for budget in map(int, args.budgets.split(",")):
+        configs[f"budget{budget}"] = (lambda q, b=budget: assemble(ranker.rank(q, args.candidates), b, args.lam))
+
+    rows, results = [], {}
+    for name, build in configs.items():
+        r = results[name] = evaluate(ranker, build)
+        rows.append([name, f"{sum(r['tokens']) / len(r['tokens']):.0f}", f"{percentile(r['tokens'], 95):.0f}",
+                     f"{r['repeated']:.1%}", f"{r['full']}/{len(QUESTIONS)}", f"{r['phrases']:.1%}"])
+    print_table(["context", "tokens mean", "tokens p95", "repeated", "fully covered", "phrases"], rows)
+    print(f"{len(chunks)} chunks ({args.chunk_size} chars, {args.overlap} overlap) over "
+          f"{args.revisions} x {len(PAGES)} pages; "
+          f"{args.candidates} candidates, MMR lambda {args.lam}")
+
+    if args.show_misses:
+        for name, r in results.items():
+            for question, missing in r["misses"]:
+                print(f"{name}: {question!r} missing {missing}")
+
+
+if __name__ == "__main__":
+    main()
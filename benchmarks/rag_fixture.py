@@ -0,0 +1,192 @@
+"""
+A small fixture document for the RAG benchmarks: the page texts of an
+eight-page equipment manual (as pdfplumber would extract them, running
+header and footer included) and questions with the phrases a complete
+answer has to be grounded in.
+
+The facts are invented, so a model can't answer from prior knowledge, and
+several answers straddle a chunk boundary or need two paragraphs of the
+same page -- the cases that chunking and context assembly get wrong.
+``pdf_bytes`` renders the pages to a minimal PDF for benchmarks that go
+through the upload path, and ``stage`` writes it where an upload would
+have been streamed to (utils/uploads.py).
+"""
+import hashlib
+import os
+import tempfile
+
+_HEADER = "Northwind NW-400 Heat Pump - Installation and Service Manual"
+_SAFETY = (
+    "WARNING: Disconnect the main supply and the auxiliary heater breaker before opening any panel. "
+    "Capacitors in the inverter board hold a charge for up to 5 minutes after power is removed; "
+    "wait for the service LED to go dark before touching the terminals."
+)
+
+_BODIES = [
+    # 1
+    """1. Introduction
+
+The NW-400 is a split-system air-source heat pump for homes up to 240 square metres. The outdoor unit houses the inverter-driven scroll compressor, the 4-way reversing valve and the electronic expansion valve; the indoor unit contains the coil, the variable-speed blower and the controller board.
+
+This manual covers the 9 kW (NW-409), 12 kW (NW-412) and 16 kW (NW-416) models. Model-specific values are given in the table in section 7. Installation must be carried out by a technician certified for A2L refrigerants, since the NW-400 ships pre-charged with R-32.
+
+Keep this manual with the unit. The serial number plate is on the right-hand side panel of the outdoor unit, behind the service valve cover; quote the serial number and the controller firmware version (menu 9.1) when contacting support.
+
+""" + _SAFETY,
+    # 2
+    """2. Siting the outdoor unit
+
+Place the outdoor unit on a level concrete pad or wall brackets rated for at least 120 kg. Leave 300 mm clear behind the unit, 600 mm on the service-valve side and 1500 mm in front of the fan discharge. Do not install it under a roof overhang that drips onto the coil, because the defrost water will refreeze on the fins.
+
+In areas with snowfall the unit must be raised at least 400 mm above the expected snow line. The condensate drain outlet needs a free path to a soak-away; in climates where the outdoor temperature regularly stays below -5 C, fit the optional drain heater kit NWK-DH2 so the drain does not block with ice.
+
+The sound power level is 58 dB(A) for the NW-409 and 62 dB(A) for the NW-416 in normal mode. Night mode limits the compressor speed and reduces the level by 4 dB(A). Keep the unit at least 3 metres from a neighbour's bedroom window where local rules require it.
+
+""" + _SAFETY,
+    # 3
+    """3. Refrigerant piping
+
+Use annealed copper pipe of refrigeration quality. The liquid line is 3/8 inch for every model; the gas line is 5/8 inch for the NW-409 and NW-412 and 3/4 inch for the NW-416. The maximum pipe run is 30 metres with a maximum height difference of 15 metres between the indoor and outdoor units.
+
+The factory charge covers pipe runs up to 15 metres. For longer runs add 20 grams of R-32 per additional metre of liquid line. Record the added amount on the label inside the service valve cover.
+
+Flare nuts must be tightened with a torque wrench: 35 Nm for 3/8 inch connections, 60 Nm for 5/8 inch and 75 Nm for 3/4 inch. After brazing or flaring, pressure-test the circuit with dry nitrogen at 4.15 MPa for at least 30 minutes, then evacuate to below 500 microns and confirm the vacuum holds for 15 minutes before opening the service valves.
+
+Insulate both lines separately with closed-cell insulation of at least 13 mm wall thickness.""",
+    # 4
+    """4. Electrical connections
+
+The outdoor unit needs a dedicated supply: 230 V single phase for the NW-409 and NW-412, and either 230 V single phase or 400 V three phase for the NW-416. Protect the circuit with a type C breaker of 20 A (NW-409), 25 A (NW-412) or 32 A (NW-416, single phase) and an RCD of 30 mA type A.
+
+The indoor and outdoor units communicate over a two-wire bus on terminals S1 and S2. Use shielded twisted pair cable, at least 0.75 square millimetres, up to 50 metres; connect the shield at the indoor end only. Never run the communication cable in the same conduit as the mains supply.
+
+The auxiliary electric heater in the indoor unit is 3 kW and has its own supply and breaker (16 A). It is enabled in menu 4.3 and only switches on when the outdoor temperature falls below the balance point, which defaults to -7 C.
+
+""" + _SAFETY,
+    # 5
+    """5. Commissioning
+
+Before the first start, energise the outdoor unit for at least 6 hours so the crankcase heater can drive refrigerant out of the compressor oil. Starting earlier risks liquid slugging and voids the compressor warranty.
+
+Run the commissioning wizard from menu 8.2. It checks the bus address, the sensor readings and the rotation of the blower, then runs the compressor at a fixed 60 Hz for 10 minutes. During this test the superheat at the outdoor unit should settle between 4 and 7 K and the discharge temperature should stay below 95 C.
+
+Set the heating curve in menu 3.1. The default curve gives a supply temperature of 45 C at an outdoor temperature of -10 C; for underfloor heating lower it to 35 C. Finally, set the installer PIN in menu 8.9 -- the default PIN is 0400 and must be changed before handing over to the customer.""",
+    # 6
+    """6. Maintenance
+
+Clean the indoor air filter every 4 weeks during the heating season. The filter slides out from the bottom of the indoor unit; wash it in lukewarm water and let it dry fully before refitting.
+
+Once a year a technician should inspect the outdoor coil, clear leaves from the base pan, check that the condensate drain runs freely and measure the refrigerant pressures. The inverter heat sink should be blown out with compressed air at the same visit. Replace the indoor filter every 2 years, part number NWF-400.
+
+The compressor has no serviceable parts. If the compressor has to be replaced, the 4-way valve and the filter drier must be replaced at the same time, and the circuit must be flushed with nitrogen.
+
+""" + _SAFETY,
+    # 7
+    """7. Technical data
+
+NW-409: heating capacity 9.0 kW at A7/W35, COP 4.9; cooling capacity 8.1 kW, EER 3.6; refrigerant charge 1.40 kg; outdoor unit weight 62 kg.
+
+NW-412: heating capacity 12.0 kW at A7/W35, COP 4.7; cooling capacity 10.5 kW, EER 3.4; refrigerant charge 1.85 kg; outdoor unit weight 78 kg.
+
+NW-416: heating capacity 16.0 kW at A7/W35, COP 4.5; cooling capacity 14.2 kW, EER 3.2; refrigerant charge 2.60 kg; outdoor unit weight 96 kg.
+
+All models operate in heating mode down to an outdoor temperature of -25 C and in cooling mode up to 46 C. The maximum supply water temperature is 60 C. The blower delivers up to 1800 cubic metres per hour on the NW-416.""",
+    # 8
+    """8. Fault codes
+
+E1 - Communication fault between indoor and outdoor unit. Check the S1/S2 wiring, the shield connection and that no other bus device uses address 1.
+
+E4 - High discharge temperature. Usually a low refrigerant charge; check for leaks at the flare joints before adding refrigerant.
+
+E7 - Outdoor coil sensor open or shorted. The sensor should read 10 kOhm at 25 C.
+
+P3 - Inverter overcurrent. Check the supply voltage under load; if it drops below 198 V, the supply cable is undersized. If the supply is correct, replace the inverter board, part number NWB-412.
+
+H2 - Defrost failure: the coil did not reach 12 C within the 12-minute defrost limit. Check the reversing valve coil and the defrost sensor.
+
+To clear a fault, correct the cause and hold the MODE and DOWN buttons for 5 seconds. Three P3 faults within 24 hours lock the unit out until it is reset from the installer menu.""",
+]
+
+PAGES = [f"{_HEADER}\n{body}\nRev 3.1 - Page {n} of {len(_BODIES)}" for n, body in enumerate(_BODIES, start=1)]
+
+# (question, phrases the grounding context must contain)
+QUESTIONS = [
+    ("Where is the serial number plate?", ["right-hand side panel", "behind the service valve cover"]),
+    ("How much clearance does the outdoor unit need?", ["300 mm clear behind", "600 mm on the service-valve side",
+                                                        "1500 mm in front"]),
+    ("What should I do about the condensate drain in cold climates?", ["drain heater kit NWK-DH2"]),
+    ("How loud is the NW-416 and what does night mode do?", ["62 dB(A) for the NW-416", "reduces the level by 4 dB(A)"]),
+    ("What size is the gas line on the NW-416?", ["3/4 inch for the NW-416"]),
+    ("How much refrigerant do I add for a 25 metre pipe run?", ["up to 15 metres", "20 grams of R-32 per additional metre"]),
+    ("What torque for a 5/8 inch flare nut?", ["60 Nm for 5/8 inch"]),
+    ("How do I pressure test and evacuate the piping?", ["4.15 MPa for at least 30 minutes", "below 500 microns"]),
+    ("What breaker does the NW-412 need?", ["25 A (NW-412)", "30 mA type A"]),
+    ("What cable should I use between the indoor and outdoor units?", ["shielded twisted pair",
+                                                                       "connect the shield at the indoor end only"]),
+    ("When does the auxiliary heater switch on?", ["below the balance point", "defaults to -7 C"]),
+    ("How long must the outdoor unit be powered before the first start?", ["at least 6 hours"]),
+    ("What superheat should I see during commissioning?", ["between 4 and 7 K"]),
+    ("What is the default installer PIN?", ["default PIN is 0400"]),
+    ("How often should the air filter be cleaned and replaced?", ["every 4 weeks", "every 2 years"]),
+    ("What else must be replaced with the compressor?", ["4-way valve and the filter drier"]),
+    ("What is the COP of the NW-412?", ["COP 4.7"]),
+    ("What is the refrigerant charge and weight of the NW-416?", ["charge 2.60 kg", "weight 96 kg"]),
+    ("What does fault code P3 mean and how do I fix it?", ["Inverter overcurrent", "below 198 V", "NWB-412"]),
+    ("How do I clear a fault code?", ["MODE and DOWN buttons for 5 seconds"]),
+    ("What does E7 mean?", ["coil sensor open or shorted", "10 kOhm at 25 C"]),
+    ("How long should I wait after disconnecting power before touching the terminals?", ["up to 5 minutes"]),
+]
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(text: str, width: int = 95) -> list[str]:
+    lines = []
+    for paragraph in text.splitlines():
+        words, line = paragraph.split(), ""
+        for word in words:
+            if line and len(line) + 1 + len(word) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}".strip()
+        lines.append(line)
+    return lines
+
+
+def pdf_bytes(pages: list[str] = PAGES) -> bytes:
+    """A minimal text-only PDF of the given pages (Helvetica, one text line
+    per wrapped line), for benchmarks that go through the upload path."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in pages:
+        lines = "".join(f"({_escape(line)}) Tj T* " for line in _wrap(page))
+        stream = f"BT /F1 9 Tf 11 TL 40 800 Td {lines}ET"
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def stage(data: bytes, directory: str) -> tuple[str, str]:
+    """Writes ``data`` to a staging file in ``directory``, as
+    utils.uploads.save_upload would; returns (path, sha256) -- the
+    arguments documents.ingest takes after the filename."""
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".part")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return path, hashlib.sha256(data).hexdigest()
@@ -0,0 +1,100 @@
+"""
+Re-uploading a revised document: full indexing vs a new version that
+reuses the previous one's unchanged pages and chunks
+(services/rag/documents.py).
+
+A ``--pages``-page manual (the fixture pages of benchmarks/rag_fixture.py,
+repeated, every line tagged with its page and a service-bulletin line
+added, so no two pages share text) is uploaded to a session, then
+uploaded again as its new version (``replaces=<doc_id>``) with
+``--changed`` pages edited. Runs against a scratch database, upload
+directory and numpy vector index, embeddings from the fake Gemini
+endpoint (benchmarks/fakes.py). Reports upload latency, pages extracted,
+chunks and embedding requests for each upload, then checks:
+
+- the new version's stored chunks are exactly what a full index of it
+  produces;
+- retrieval returns the edited text, and none of the replaced text;
+- the old version was collected.
+
+Usage (from the repo root):
+
+    python -m benchmarks.reindex
+    python -m benchmarks.reindex --pages 500 --changed 3
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+from benchmarks.common import print_table
+from benchmarks.fakes import FakeProfile, FakeUpstreams, Latency
+from benchmarks.rag_fixture import PAGES, pdf_bytes, stage
+
+SESSION = "reindex-session"
+
+
+def manual(pages: int, changed: set[int]) -> list[str]:
+    texts = []
+    for i in range(pages):
+        # Tag every line with the page so no two pages share a chunk.
+        body = "\n".join(f"{line} [{i:04d}]" if line.strip() else line
+                         for line in PAGES[i % len(PAGES)].splitlines())
+        text = f"{body}\nService bulletin SB-{i:04d} applies to serial numbers {i * 1000} to {i * 1000 + 999}."
+        if i in changed:
+            text = text.replace("applies to serial numbers", "was withdrawn for serial numbers")
+        texts.append(text)
+    return texts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--changed", type=int, default=1, help="Pages edited in the new version")
+    parser.add_argument("--embed-ms", type=float, default=80, help="Fake embedding request latency")
+    args = parser.parse_args(argv)
+
+    fakes = FakeUpstreams(FakeProfile(embed=Latency(args.embed_ms, 0))).start()
+    scratch = tempfile.mkdtemp(prefix="reindex-")
+    os.environ.update(fakes.env())
+    os.environ.update({"DB_PATH": os.path.join(scratch, "app.db"), "UPLOAD_DIR": os.path.join(scratch, "uploads"),
+                       "VECTOR_STORE_BACKEND": "numpy", "VECTOR_STORE_PATH": os.path.join(scratch, "vectors"),
+                       "LOG_LEVEL": "WARNING"})
+    os.makedirs(os.environ["UPLOAD_DIR"])
+
+    from services import db
+    from services.rag import documents, vector_store
+    from services.rag.pdf_processor import chunk_text, extract_pages
+    db.init_db()
+
+    changed = set(range(args.pages // 2, args.pages // 2 + args.changed))
+    versions = {"v1 (full index)": manual(args.pages, set()), "v2 (new version)": manual(args.pages, changed)}
+    rows, results, replaces = [], {}, None
+    for name, pages in versions.items():
+        data = pdf_bytes(pages)
+        before, calls = documents.stats(), fakes.counters["embed_calls"]
+        start = time.perf_counter()
+        results[name] = documents.ingest(SESSION, "manual.pdf", *stage(data, os.environ["UPLOAD_DIR"]), replaces)
+        replaces = results[name]["doc_id"]
+        elapsed = time.perf_counter() - start
+        after = documents.stats()
+        rows.append([name, f"{elapsed * 1000:.0f}", after["pages_extracted"] - before["pages_extracted"],
+                     after["chunks_embedded"] - before["chunks_embedded"],
+                     after["chunks_reused"] - before["chunks_reused"], fakes.counters["embed_calls"] - calls])
+    print_table(["upload", "ms", "pages extracted", "chunks embedded", "chunks reused", "embed requests"], rows)
+
+    v2 = results["v2 (new version)"]
+    digest = hashlib.sha256(pdf_bytes(versions["v2 (new version)"])).hexdigest()
+    stored = set(vector_store.document_embeddings(vector_store.document_namespace(digest), digest))
+    expected = {c["text"] for c in chunk_text(extract_pages(documents._file_path(digest)))}
+    hits = vector_store.query_chunks(SESSION, f"Which serial numbers was SB-{min(changed):04d} withdrawn for?")
+    print(f"same doc_id: {v2['doc_id'] == results['v1 (full index)']['doc_id']}; "
+          f"stored chunks match a full index: {stored == expected}; "
+          f"top hit has the edit: {'withdrawn' in hits[0]['text']}; "
+          f"old version collected: {documents.stats()['collected'] == 1}")
+    fakes.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Deterministic replay of a recorded voice session (see
+services/session_recorder.py for how sessions are captured).
+
+The recorded inbound PCM is fed back through ``/ws/{session_id}`` with its
+original timing, while every upstream is served by the local fakes loaded
+with the *recorded* responses instead of synthetic ones:
+
+- AssemblyAI emits the recorded Turn events once the same number of audio
+  bytes has been streamed, after the recorded endpointing delay
+- Gemini returns the recorded response chunks, call by call, with their
+  recorded inter-chunk timing
+- Murf returns the recorded audio messages, call by call
+
+So after any change to gemini_stream, murf_stream, assembly_stream (or
+anything between them) the same production conversation can be re-run and
+compared: the outbound frames the client receives are diffed against the
+recording (ignoring ``context_id``), and per-turn time-to-first-audio and
+turn latency are printed side by side.
+
+Tool calls are re-executed against the synthetic Finnhub/OpenWeather fakes;
+their results only feed the (recorded) Gemini follow-up request, so they
+don't affect the replayed output.
+
+Usage (from the repo root):
+
+    python -m benchmarks.replay recordings/sessions/<name>.json
+    python -m benchmarks.replay <name>.json --speed 0 --ignore-upstream-timing   # fast output-only diff
+
+With --speed 0 every utterance arrives at once, so turns overlap and a slow
+(tool-calling) turn can finish after the next one; use real-time speed when
+comparing sessions whose turns came in quick succession.
+
+Filler clips (services/fillers.py) are switched off for the replay and
+left out of the comparison: whether one plays depends on tool timing.
+
+Exits with status 1 when the replayed output differs from the recording.
+"""
+import argparse
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import math
+import sys
+import tempfile
+import time
+from collections import deque
+
+import websockets
+
+from benchmarks.common import ms, print_table
+from benchmarks.e2e_latency import AppServer, boot_app
+from benchmarks.fakes import FakeProfile, FakeUpstreams, Latency, SyntheticScenario
+from services.session_recorder import load
+
+_SDK_ONLY_FIELDS = ("sdkHttpResponse", "automaticFunctionCallingHistory")
+
+
+class ReplaySttSession:
+    def __init__(self, turns: list[tuple[int, dict]]):
+        self.turns = deque(turns)
+        self.received = 0
+
+    def feed(self, frame: bytes) -> dict | None:
+        self.received += len(frame)
+        if self.turns and self.received >= self.turns[0][0]:
+            return copy.deepcopy(self.turns.popleft()[1])
+        return None
+
+
+class ReplayScenario(SyntheticScenario):
+    """Serves recorded upstream responses in order; falls back to synthetic
+    answers (and counts it) when the app makes calls the recording lacks."""
+
+    def __init__(self, frames: list[dict], use_timing: bool = True):
+        super().__init__(FakeProfile(stt=Latency(), gemini_first_token=Latency(), gemini_token=Latency(),
+                                     embed=Latency(), murf_first_chunk=Latency(), murf_chunk=Latency(),
+                                     http=Latency()))
+        self.use_timing = use_timing
+        self.stt_turns = self._stt_turns(frames)
+        self.gemini = deque(self._paced(f["payload"]["messages"], strip=True) for f in frames if f["kind"] == "gemini")
+        self.murf = deque((f["payload"].get("text", ""), self._paced(f["payload"]["messages"]))
+                          for f in frames if f["kind"] == "murf")
+        self.drift = {"unrecorded_gemini_calls": 0, "unrecorded_murf_calls": 0, "tts_text_changed": 0}
+
+    def _stt_turns(self, frames: list[dict]) -> list[tuple[int, dict]]:
+        audio = []
+        total = 0
+        for f in frames:
+            if f["kind"] == "client_audio":
+                total += len(f["payload"])
+                audio.append((total, f["t"]))
+        turns = []
+        for f in frames:
+            if f["kind"] != "stt_turn":
+                continue
+            needed = f["payload"]["audio_bytes"]
+            reached_at = next((t for cumulative, t in audio if cumulative >= needed), f["t"])
+            event = dict(f["payload"]["event"])
+            event["_delay"] = max(0.0, f["t"] - reached_at) if self.use_timing else 0.0
+            turns.append((needed, event))
+        return turns
+
+    def _paced(self, messages: list[dict], strip: bool = False) -> list[dict]:
+        paced, previous = [], 0.0
+        for m in messages:
+            data = json.loads(m["data"]) if isinstance(m["data"], str) else dict(m["data"])
+            if strip:
+                for key in _SDK_ONLY_FIELDS:
+                    data.pop(key, None)
+            data["_delay"] = max(0.0, m["dt"] - previous) if self.use_timing else 0.0
+            previous = m["dt"]
+            paced.append(data)
+        return paced
+
+    def new_stt_session(self) -> ReplaySttSession:
+        return ReplaySttSession(self.stt_turns)
+
+    def gemini_chunks(self, body: dict) -> list[dict]:
+        contents = body.get("contents") or []
+        last_text = " ".join(p.get("text", "") for p in (contents[-1].get("parts", []) if contents else []))
+        if "extract durable facts" in last_text.lower() or not self.gemini:
+            if "extract durable facts" not in last_text.lower():
+                self.drift["unrecorded_gemini_calls"] += 1
+            return super().gemini_chunks(body)
+        return copy.deepcopy(self.gemini.popleft())
+
+    def murf_messages(self, text: str, context_id: str) -> list[dict]:
+        if not self.murf:
+            self.drift["unrecorded_murf_calls"] += 1
+            return super().murf_messages(text, context_id)
+        recorded_text, messages = self.murf.popleft()
+        if recorded_text != text:
+            self.drift["tts_text_changed"] += 1
+        return copy.deepcopy(messages)
+
+
+async def drive(port: int, index: dict, frames: list[dict], speed: float, settle: float) -> list[dict]:
+    """Sends the recorded inbound audio and collects what the client receives."""
+    session_id = index["session_id"]
+    user_id = index.get("user_id") or "replay-user"
+    inbound = [f for f in frames if f["kind"] == "client_audio"]
+    expected = sum(1 for f in frames if f["kind"] in ("server_text", "server_json"))
+    received = []
+
+    async with websockets.connect(f"ws://127.0.0.1:{port}/ws/{session_id}?user_id={user_id}", max_size=None) as ws:
+        started = time.perf_counter()
+
+        async def receive():
+            async for message in ws:
+                t = time.perf_counter() - started
+                if isinstance(message, bytes):
+                    continue
+                try:
+                    received.append({"t": t, "kind": "server_json", "payload": json.loads(message)})
+                except json.JSONDecodeError:
+                    received.append({"t": t, "kind": "server_text", "payload": message})
+
+        receiver = asyncio.create_task(receive())
+        for f in inbound:
+            if speed > 0:
+                await asyncio.sleep(max(0.0, started + f["t"] / speed - time.perf_counter()))
+            await ws.send(f["payload"])
+
+        # Let in-flight turns finish: stop once everything recorded has come
+        # back, or nothing new has arrived for `settle` seconds.
+        last_count, idle_since = -1, time.perf_counter()
+        while len(received) < expected:
+            if len(received) != last_count:
+                last_count, idle_since = len(received), time.perf_counter()
+            elif time.perf_counter() - idle_since > settle:
+                break
+            await asyncio.sleep(0.05)
+        receiver.cancel()
+    return received
+
+
+def _is_filler(frame: dict) -> bool:
+    payload = frame["payload"]
+    return isinstance(payload, dict) and ("filler_chunk" in payload or payload.get("status") == "filler_stop")
+
+
+def _normalize(frame: dict):
+    payload = frame["payload"]
+    if isinstance(payload, dict):
+        payload = {k: v for k, v in payload.items() if k != "context_id"}
+    return frame["kind"], payload
+
+
+def _describe(frame: dict | None) -> str:
+    if frame is None:
+        return "<missing>"
+    kind, payload = _normalize(frame)
+    if isinstance(payload, dict) and "audio_chunk" in payload:
+        digest = hashlib.sha1(payload["audio_chunk"].encode()).hexdigest()[:10]
+        payload = {**payload, "audio_chunk": f"<{len(payload['audio_chunk'])}b sha1:{digest}>"}
+    return f"{kind} {json.dumps(payload)[:120]}"
+
+
+def diff_outputs(recorded: list[dict], replayed: list[dict], limit: int = 5) -> list[str]:
+    problems = []
+    for i in range(max(len(recorded), len(replayed))):
+        a = recorded[i] if i < len(recorded) else None
+        b = replayed[i] if i < len(replayed) else None
+        if a is None or b is None or _normalize(a) != _normalize(b):
+            problems.append(f"#{i}: recorded {_describe(a)}\n      replayed {_describe(b)}")
+            if len(problems) >= limit:
+                break
+    return problems
+
+
+def turn_latencies(frames: list[dict]) -> list[dict]:
+    """Per turn (starting at the echoed transcript): time to first audio and
+    time to final_audio."""
+    turns = []
+    for f in frames:
+        if f["kind"] == "server_text":
+            turns.append({"transcript": f["payload"], "start": f["t"], "ttfa": math.nan, "total": math.nan})
+        elif turns and isinstance(f["payload"], dict):
+            turn = turns[-1]
+            if "audio_chunk" in f["payload"] and math.isnan(turn["ttfa"]):
+                turn["ttfa"] = f["t"] - turn["start"]
+            if f["payload"].get("status") == "final_audio" and math.isnan(turn["total"]):
+                turn["total"] = f["t"] - turn["start"]
+    return turns
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("recording", help="Path to a recording's .json index (or .frames file)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Inbound audio pacing multiplier (0 = no pacing)")
+    parser.add_argument("--ignore-upstream-timing", action="store_true",
+                        help="Answer upstream calls immediately instead of with their recorded timing")
+    parser.add_argument("--settle", type=float, default=10.0, help="Seconds to wait for trailing output")
+    parser.add_argument("--json", help="Also write the per-turn comparison to this file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's INFO logs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    index, frames = load(args.recording)
+    scenario = ReplayScenario(frames, use_timing=not args.ignore_upstream_timing)
+
+    fakes = FakeUpstreams(scenario.profile, scenario=scenario).start()
+    # Filler clips would be synthesized through the recorded Murf calls.
+    os.environ["FILLERS_ENABLED"] = "false"
+    server = AppServer(boot_app(fakes, tempfile.mkdtemp(prefix="voice-replay-"), args.verbose)).start()
+    try:
+        replayed = asyncio.run(drive(server.port, index, frames, args.speed, args.settle))
+    finally:
+        server.stop()
+        fakes.stop()
+
+    recorded = [f for f in frames if f["kind"] in ("server_text", "server_json") and not _is_filler(f)]
+    rec_turns, rep_turns = turn_latencies(recorded), turn_latencies(replayed)
+    rows = []
+    for i in range(max(len(rec_turns), len(rep_turns))):
+        a = rec_turns[i] if i < len(rec_turns) else {"transcript": "", "ttfa": math.nan, "total": math.nan}
+        b = rep_turns[i] if i < len(rep_turns) else {"transcript": "", "ttfa": math.nan, "total": math.nan}
+        rows.append({"turn": i + 1, "transcript": (a["transcript"] or b["transcript"])[:40],
+                     "ttfa_recorded": a["ttfa"], "ttfa_replayed": b["ttfa"],
+                     "total_recorded": a["total"], "total_replayed": b["total"]})
+
+    print(f"Session {index['session_id']} recorded {index['started_at']} ({len(frames)} frames)")
+    print_table(
+        ["turn", "transcript", "ttfa rec", "ttfa now", "delta", "turn rec", "turn now", "delta"],
+        [[r["turn"], r["transcript"], ms(r["ttfa_recorded"]), ms(r["ttfa_replayed"]),
+          ms(r["ttfa_replayed"] - r["ttfa_recorded"]), ms(r["total_recorded"]), ms(r["total_replayed"]),
+          ms(r["total_replayed"] - r["total_recorded"])] for r in rows],
+    )
+    print(f"Upstream drift: {scenario.drift}")
+
+    problems = diff_outputs(recorded, replayed)
+    if problems:
+        print(f"\nOutput differs from the recording ({len(recorded)} recorded vs {len(replayed)} replayed frames):")
+        for p in problems:
+            print(f"  {p}")
+    else:
+        print(f"\nOutput identical to the recording ({len(recorded)} frames, ignoring context_id).")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"session_id": index["session_id"], "turns": rows, "drift": scenario.drift,
+                       "identical": not problems}, f, indent=2)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+The same PDF uploaded in many sessions: per-session indexing (every upload
+extracted, chunked and embedded into its session's namespace, as
+/rag/upload used to) vs the content-addressed store
+(services/rag/documents.py).
+
+Runs against a scratch database, upload directory and numpy vector index,
+with embeddings from the fake Gemini endpoint (benchmarks/fakes.py, 80ms
+per embedding request by default). The document is the fixture manual
+(benchmarks/rag_fixture.py) rendered to PDF. Reports first and repeat
+upload latency, embedding requests, files on disk and stored vector rows;
+then checks that a session only retrieves documents it uploaded, and that
+deleting every reference garbage-collects the shared copy.
+
+Usage (from the repo root):
+
+    python -m benchmarks.shared_documents
+    python -m benchmarks.shared_documents --sessions 200 --embed-ms 150
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+
+from benchmarks.common import percentile, print_table
+from benchmarks.fakes import FakeProfile, FakeUpstreams, Latency
+from benchmarks.rag_fixture import pdf_bytes, stage
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--embed-ms", type=float, default=80, help="Fake embedding request latency")
+    args = parser.parse_args(argv)
+
+    fakes = FakeUpstreams(FakeProfile(embed=Latency(args.embed_ms, 0))).start()
+    scratch = tempfile.mkdtemp(prefix="shared-docs-")
+    os.environ.update(fakes.env())
+    os.environ.update({"DB_PATH": os.path.join(scratch, "app.db"), "UPLOAD_DIR": os.path.join(scratch, "uploads"),
+                       "VECTOR_STORE_BACKEND": "numpy", "VECTOR_STORE_PATH": os.path.join(scratch, "vectors"),
+                       "LOG_LEVEL": "WARNING"})
+    os.makedirs(os.environ["UPLOAD_DIR"])
+
+    import config
+    from services import db
+    from services.rag import documents, vector_store
+    from services.rag.pdf_processor import extract_and_chunk
+    db.init_db()
+    data = pdf_bytes()
+    backend = vector_store.get_backend()
+
+    def per_session(session_id: str):
+        doc_id = str(uuid.uuid4())
+        path = os.path.join(config.UPLOAD_DIR, f"{doc_id}.pdf")
+        with open(path, "wb") as f:
+            f.write(data)
+        vector_store.add_chunks(session_id, doc_id, "manual.pdf", extract_and_chunk(path))
+
+    modes = {
+        "per-session": (lambda i: per_session(f"old-{i}"), lambda i: f"old-{i}"),
+        "shared": (lambda i: documents.ingest(f"new-{i}", "manual.pdf", *stage(data, config.UPLOAD_DIR)),
+                   lambda i: vector_store.document_namespace(hashlib.sha256(data).hexdigest())),
+    }
+    rows = []
+    for name, (upload, namespace) in modes.items():
+        calls_before = fakes.counters["embed_calls"]
+        files_before = len(os.listdir(config.UPLOAD_DIR))
+        timings = []
+        for i in range(args.sessions):
+            start = time.perf_counter()
+            upload(i)
+            timings.append(time.perf_counter() - start)
+        vectors = sum(backend.count(ns) for ns in {namespace(i) for i in range(args.sessions)})
+        rows.append([name, f"{timings[0] * 1000:.0f}", f"{percentile(timings[1:], 50) * 1000:.1f}",
+                     f"{percentile(timings[1:], 99) * 1000:.1f}", fakes.counters["embed_calls"] - calls_before,
+                     len(os.listdir(config.UPLOAD_DIR)) - files_before, vectors])
+    print_table(["indexing", "first upload ms", "repeat p50 ms", "repeat p99 ms", "embed requests", "files",
+                 "vector rows"], rows)
+
+    hits = vector_store.query_chunks("new-0", "What is the default installer PIN?")
+    own = set(_session_documents("new-0"))
+    outsider = vector_store.query_chunks("no-uploads", "What is the default installer PIN?")
+    print(f"session new-0 retrieved {len(hits)} chunks, all cited as its own document: "
+          f"{all(h['doc_id'] in own for h in hits)}; a session without uploads retrieved {len(outsider)}")
+
+    for i in range(args.sessions):
+        for doc in _session_documents(f"new-{i}"):
+            documents.remove(f"new-{i}", doc)
+    print(f"after deleting all {args.sessions} references: {documents.stats()}")
+    fakes.stop()
+
+
+def _session_documents(session_id: str) -> list[str]:
+    from services.db import get_conn
+    with get_conn() as conn:
+        return [r["doc_id"] for r in conn.execute("SELECT doc_id FROM documents WHERE session_id = ?", (session_id,))]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Characters per turn for the finance skills, before and after the
+spoken-form rendering path (services/skills.py result dicts +
+services/speech.py).
+
+For a fixed quote fixture per skill it reports:
+
+- tool payload: what goes back to Gemini as the function result -- the old
+  markdown string vs the compact JSON the skills return now;
+- TTS text: what Murf is asked to synthesize when the reply repeats the
+  tool output, which is what the model tends to do -- the old markdown
+  as-is vs ``to_speech`` of a reply covering the compact result (the
+  intent router's template answers where there is one, the same sentence
+  shape for news and portfolios);
+- spoken words: an estimate of how much audio that text becomes, with
+  numbers and symbols expanded the way a TTS voice reads them ("$2901.2B"
+  is "two thousand nine hundred one point two billion dollars").
+
+No network and no API keys: the skill renderers are pure functions of the
+quote data, and the legacy markdown renderers are kept here verbatim as the
+baseline.
+
+Usage (from the repo root):
+
+    python -m benchmarks.tts_chars
+    python -m benchmarks.tts_chars --max-chars 400
+"""
+import argparse
+import json
+import re
+from datetime import datetime, timedelta
+
+import config
+from benchmarks.common import print_table
+from services import skills
+from services.intent_router import Route, template_answer
+from services.skills import CryptoData, NewsItem, StockData
+from services.speech import to_speech
+
+STOCKS = [
+    StockData("AAPL", 187.1234, 1.2012, 0.6459, 0, market_cap=2901234.5, day_high=188.4, day_low=185.1),
+    StockData("MSFT", 402.5518, -3.4411, -0.8477, 0, market_cap=2990321.0, day_high=406.0, day_low=401.2),
+    StockData("TSLA", 171.0567, 4.9921, 3.0063, 0, market_cap=544789.9, day_high=172.3, day_low=165.8),
+]
+BTC = CryptoData("BTC", "Bitcoin", 64123.456789, -1234.5678, -1.8897, 1.262e12, 3.41e10, 1)
+NEWS = [
+    NewsItem("Fed holds rates steady, signals patience on cuts", "Markets were little changed after the "
+             "decision as investors weighed the statement against recent inflation data.", "Reuters",
+             datetime.now() - timedelta(hours=3)),
+    NewsItem("Chipmakers rally on strong AI demand outlook", "Semiconductor shares led gains after two "
+             "suppliers raised full-year guidance on data-center orders.", "Bloomberg",
+             datetime.now() - timedelta(hours=7)),
+    NewsItem("Oil slips as inventories rise for a third week", "Crude fell about one percent after a "
+             "bigger-than-expected build in US stockpiles.", "CNBC", datetime.now() - timedelta(days=1)),
+]
+
+
+def _portfolio_analysis() -> dict:
+    holdings = {"AAPL": 100, "MSFT": 20, "BTC": 0.5}
+    positions = []
+    for symbol, qty in holdings.items():
+        if symbol == "BTC":
+            positions.append({"symbol": "BTC", "type": "crypto", "quantity": qty, "price": BTC.price,
+                              "value": BTC.price * qty, "change": BTC.change_24h * qty,
+                              "change_percent": BTC.change_percent_24h})
+        else:
+            q = next(s for s in STOCKS if s.symbol == symbol)
+            positions.append({"symbol": symbol, "type": "stock", "quantity": qty, "price": q.price,
+                              "value": q.price * qty, "change": q.change * qty,
+                              "change_percent": q.change_percent})
+    value = sum(p["value"] for p in positions)
+    change = sum(p["change"] for p in positions)
+    return {
+        "total_value": value, "total_change": change,
+        "change_percent": change / (value - change) * 100, "positions": positions,
+        "best_performer": max(positions, key=lambda x: x["change_percent"]),
+        "worst_performer": min(positions, key=lambda x: x["change_percent"]),
+    }
+
+
+_MARKUP = re.compile(r"[*_`#•|]|[\U0001F000-\U0001FAFF\u2600-\u27BF]")
+
+
+def _integer_words(n: int) -> int:
+    if n < 20:
+        return 1
+    if n < 100:
+        return 1 + (n % 10 > 0)
+    if n < 1000:
+        return 2 + (_integer_words(n % 100) if n % 100 else 0)
+    for size in (10 ** 12, 10 ** 9, 10 ** 6, 1000):
+        if n >= size:
+            return _integer_words(n // size) + 1 + (_integer_words(n % size) if n % size else 0)
+
+
+def spoken_words(text: str) -> int:
+    """Words a TTS voice says for ``text`` (markup and emoji silent)."""
+    text = _MARKUP.sub(" ", text)
+    words = len(re.findall(r"[$%]", text))
+    for token in re.findall(r"\d[\d,]*(?:\.\d+)?|[A-Za-z']+", text):
+        if not token[0].isdigit():
+            words += 1
+            continue
+        whole, _, decimals = token.replace(",", "").partition(".")
+        words += _integer_words(int(whole)) + (1 + len(decimals) if decimals else 0)
+    return words
+
+
+# ---- legacy markdown renderers (the "before" baseline) ----
+def legacy_stock(s: StockData) -> str:
+    arrow, word = ("📈", "up") if s.change >= 0 else ("📉", "down")
+    r = f"**{s.symbol} - ${s.price:.2f}** {arrow}\n"
+    r += f"Change: ${s.change:+.2f} ({s.change_percent:+.2f}%)\n"
+    if s.market_cap:
+        r += f"Market Cap: ${s.market_cap/1000:.1f}B\n"
+    if s.day_high and s.day_low:
+        r += f"Day Range: ${s.day_low:.2f} - ${s.day_high:.2f}\n"
+    return r + f"\n{s.symbol} is {word} {abs(s.change_percent):.2f}% today."
+
+
+def legacy_crypto(c: CryptoData) -> str:
+    arrow, word = ("📈", "up") if c.change_percent_24h >= 0 else ("📉", "down")
+    r = f"**{c.name} ({c.symbol}) - ${c.price:.2f}** {arrow}\n"
+    r += f"24h Change: ${c.change_24h:+.2f} ({c.change_percent_24h:+.2f}%)\n"
+    r += f"Market Cap: ${c.market_cap/1e9:.2f}B\n24h Volume: ${c.volume_24h/1e9:.2f}B\nRank: #{c.rank}\n"
+    return r + f"\n{c.name} is {word} {abs(c.change_percent_24h):.2f}% in the last 24 hours."
+
+
+def legacy_news(items: list[NewsItem]) -> str:
+    r = "**Latest Market News:**\n\n"
+    for i, n in enumerate(items, 1):
+        age = datetime.now() - n.published
+        when = (f"{age.days} days ago" if age.days > 0 else
+                f"{age.seconds // 3600} hours ago" if age.seconds > 3600 else f"{age.seconds // 60} minutes ago")
+        r += f"**{i}. {n.title}**\n_{n.source} • {when}_\n{n.summary}\n\n"
+    return r
+
+
+def legacy_portfolio(a: dict) -> str:
+    r = f"**Portfolio Analysis** {'📈' if a['total_change'] >= 0 else '📉'}\n\n"
+    r += f"**Total Value:** ${a['total_value']:,.2f}\n"
+    r += f"**Today's Change:** ${a['total_change']:+,.2f} ({a['change_percent']:+.2f}%)\n\n**Top Holdings:**\n"
+    for p in sorted(a["positions"], key=lambda x: x["value"], reverse=True)[:5]:
+        r += f"• **{p['symbol']}**: ${p['value']:,.2f} ({p['change_percent']:+.2f}%) {'📈' if p['change'] >= 0 else '📉'}\n"
+    r += f"\n**Best Performer:** {a['best_performer']['symbol']} ({a['best_performer']['change_percent']:+.2f}%)\n"
+    r += f"**Worst Performer:** {a['worst_performer']['symbol']} ({a['worst_performer']['change_percent']:+.2f}%)\n"
+    word = "gained" if a["total_change"] >= 0 else "lost"
+    return r + f"\nYour portfolio has {word} ${abs(a['total_change']):,.2f} today."
+
+
+def legacy_compare(stocks: list[StockData]) -> str:
+    ranked = sorted(stocks, key=lambda x: x.change_percent, reverse=True)
+    r = "**Stock Comparison:**\n\n"
+    for i, s in enumerate(ranked, 1):
+        r += f"**{i}. {s.symbol}** - ${s.price:.2f} {'📈' if s.change >= 0 else '📉'}\n"
+        r += f"   Change: ${s.change:+.2f} ({s.change_percent:+.2f}%)\n\n"
+    best, worst = ranked[0], ranked[-1]
+    return r + (f"**{best.symbol}** is leading with {best.change_percent:+.2f}%, "
+                f"while **{worst.symbol}** is trailing at {worst.change_percent:+.2f}%.")
+
+
+def compact_reply(name: str, result: dict) -> str:
+    """A reply that says everything in ``result`` and nothing more."""
+    answer = template_answer(Route(name), result)
+    if answer:
+        return answer
+    if name == "get_market_news_summary":
+        return " ".join(f"{n['title']}, from {n['source']}." for n in result["news"])
+    word = "up" if result["total_change"] >= 0 else "down"
+    holdings = [f"{h['symbol']} at ${h['value']:,}" for h in result["top_holdings"]]
+    return (f"Your portfolio is worth ${result['total_value']:,} and is {word} {abs(result['change_pct']):.2f}% "
+            f"today. The biggest holdings are {', '.join(holdings[:-1])} and {holdings[-1]}. "
+            f"{result['best']} did best and {result['worst']} did worst.")
+
+
+def cases() -> list[tuple[str, str, dict]]:
+    analysis = _portfolio_analysis()
+    return [
+        ("get_stock_price", legacy_stock(STOCKS[0]), skills.stock_result(STOCKS[0])),
+        ("get_crypto_price", legacy_crypto(BTC), skills.crypto_result(BTC)),
+        ("get_market_news_summary", legacy_news(NEWS), skills.news_result(NEWS)),
+        ("analyze_portfolio", legacy_portfolio(analysis), skills.portfolio_result(analysis)),
+        ("compare_stocks", legacy_compare(STOCKS), skills.comparison_result(STOCKS)),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--max-chars", type=int, default=config.TTS_MAX_CHARS, help="TTS length cap")
+    parser.add_argument("--show", action="store_true", help="Print the spoken text for each skill")
+    args = parser.parse_args(argv)
+
+    rows, totals = [], [0] * 6
+    for name, markdown, result in cases():
+        payload = json.dumps(result, separators=(",", ":"))
+        spoken = to_speech(compact_reply(name, result), args.max_chars)
+        counts = [len(markdown), len(payload), len(markdown), len(spoken),
+                  spoken_words(markdown), spoken_words(spoken)]
+        totals = [t + c for t, c in zip(totals, counts)]
+        rows.append([name, *counts, f"{1 - counts[5] / counts[4]:.0%}"])
+        if args.show:
+            print(f"{name}: {spoken}\n")
+
+    rows.append(["total", *totals, f"{1 - totals[5] / totals[4]:.0%}"])
+    print_table(["skill", "tool before", "tool after", "tts before", "tts after",
+                 "words before", "words after", "words saved"], rows)
+    print(f"(tool/tts in characters; TTS cap {args.max_chars})")
+
+
+if __name__ == "__main__":
+    main()
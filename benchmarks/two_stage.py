@@ -0,0 +1,139 @@
+"""
+Two-stage (coarse scan + full-width rerank) search in the numpy vector
+backend vs exact search: recall@k, query latency and resident memory.
+
+One session index is built on disk, then each configuration opens it in
+its own child process (so RSS counts only the pages that configuration's
+queries touched) and runs the same queries:
+
+- exact: every query scores all full 768-d vectors;
+- c<dims>[i8]: scan the truncated (optionally int8) copy, rerank the best
+  ``--candidates`` with the full vectors.
+
+recall@k is the share of the exact top k each configuration returns.
+
+The default vectors are synthetic with a Matryoshka-like spectrum
+(variance decaying with the dimension index), which is what makes
+truncation work on gemini-embedding-001. Real embeddings give real
+numbers: pass ``--embeddings vectors.npy`` (an (n, 768) float32 array,
+e.g. dumped from a session's seg_*.npy files); queries are then held-out
+rows plus a little noise.
+
+Usage (from the repo root):
+
+    python -m benchmarks.two_stage
+    python -m benchmarks.two_stage --rows 50000 --configs exact,c256,c256i8,c128i8 --candidates 100
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import percentile, print_table
+from benchmarks.vector_store import _rss_mb
+
+DIMS = 768
+SESSION = "bench-session"
+
+
+def vectors(args) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(args.seed)
+    if args.embeddings:
+        data = np.load(args.embeddings).astype(np.float32)
+        rng.shuffle(data)
+        corpus, held_out = data[args.queries:], data[:args.queries]
+        queries = held_out + 0.02 * rng.standard_normal(held_out.shape).astype(np.float32)
+    else:
+        spectrum = (1 + np.arange(DIMS) / 48) ** -0.75
+        centers = rng.standard_normal((max(8, args.rows // 20), DIMS)).astype(np.float32) * spectrum
+
+        def around(n):
+            picks = centers[rng.integers(len(centers), size=n)]
+            return picks + 2.0 * rng.standard_normal((n, DIMS)).astype(np.float32) * spectrum
+
+        corpus, queries = around(args.rows), around(args.queries)
+    normalize = lambda v: v / np.linalg.norm(v, axis=1, keepdims=True)
+    return normalize(corpus), normalize(queries)
+
+
+def _parse(config_name: str) -> tuple[int, bool]:
+    if config_name == "exact":
+        return 0, False
+    return int(config_name[1:].removesuffix("i8")), config_name.endswith("i8")
+
+
+def build(path: str, corpus: np.ndarray, chunk_rows: int = 1000):
+    from services.rag.backends.numpy_memmap import NumpyBackend
+    backend = NumpyBackend(path)
+    for start in range(0, len(corpus), chunk_rows):
+        block = corpus[start:start + chunk_rows]
+        backend.add(SESSION, ids=[f"r{start + i}" for i in range(len(block))], embeddings=block,
+                    documents=[str(start + i) for i in range(len(block))],
+                    metadatas=[{"doc_id": f"d{start}", "filename": "f.pdf", "page": 1}] * len(block))
+
+
+def run_config(path: str, config_name: str, args) -> dict:
+    from services.rag.backends.numpy_memmap import NumpyBackend
+    _, queries = vectors(args)
+    dims, int8 = _parse(config_name)
+    backend = NumpyBackend(path, coarse_dims=dims, coarse_int8=int8, candidates=args.candidates)
+    backend.count(SESSION)   # open (and build any missing coarse files) outside the timing
+    baseline = _rss_mb()
+
+    timings, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        hits = backend.query(SESSION, q, args.top_k)
+        timings.append(time.perf_counter() - start)
+        results.append([int(h["text"]) for h in hits])
+    return {"p50": percentile(timings, 50), "p99": percentile(timings, 99), "rss_mb": _rss_mb() - baseline,
+            "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=20000, help="Vectors in the session (synthetic data)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--candidates", type=int, default=64, help="Rows reranked at full width")
+    parser.add_argument("--configs", default="exact,c256,c256i8,c128,c128i8")
+    parser.add_argument("--embeddings", help="(n, 768) .npy of real embeddings to use instead")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_config(args.child[0], args.child[1], args)))
+        return
+
+    path = tempfile.mkdtemp(prefix="two-stage-")
+    corpus, _ = vectors(args)
+    build(path, corpus)
+    configs = args.configs.split(",")
+    if "exact" not in configs:
+        configs.insert(0, "exact")
+
+    runs = {}
+    for name in configs:
+        out = subprocess.run([sys.executable, "-m", "benchmarks.two_stage", *(argv or sys.argv[1:]),
+                              "--child", path, name],
+                             capture_output=True, text=True, check=True, env={**os.environ, "LOG_LEVEL": "WARNING"})
+        runs[name] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    exact = runs["exact"]["results"]
+    rows = []
+    for name, r in runs.items():
+        recall = np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(r["results"], exact)])
+        rows.append([name, f"{recall:.3f}", f"{r['p50'] * 1000:.2f}", f"{r['p99'] * 1000:.2f}", f"{r['rss_mb']:.1f}"])
+    print_table(["config", f"recall@{args.top_k}", "query p50 ms", "query p99 ms", "RSS MB"], rows)
+    print(f"{len(corpus)} vectors, {args.candidates} rerank candidates, "
+          f"{'real embeddings' if args.embeddings else 'synthetic Matryoshka-like vectors'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Upload handling: reading the whole upload into memory (``await
+file.read()``, as /rag/upload and the audio routes used to) vs streaming it
+to disk in chunks with utils.uploads.save_upload.
+
+Each upload is a Starlette UploadFile over a spooled temporary file -- what
+the multipart parser hands a route -- holding ``--sizes`` MB of PDF-looking
+bytes. Reports peak Python heap (tracemalloc) while handling it, the
+handling time and the worst event-loop stall (benchmarks.common.LoopLagProbe);
+then checks that an oversized upload and a non-PDF are rejected without
+copying.
+
+Usage (from the repo root):
+
+    python -m benchmarks.uploads
+    python -m benchmarks.uploads --sizes 10 100 500
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from starlette.datastructures import UploadFile
+
+from benchmarks.common import LoopLagProbe, print_table
+from utils.uploads import UploadRejected, is_pdf, save_upload
+
+MB = 1024 * 1024
+
+
+def _upload(size_mb: int, head: bytes = b"%PDF-1.4\n") -> UploadFile:
+    spool = tempfile.SpooledTemporaryFile(max_size=MB)
+    block = os.urandom(MB)
+    spool.write(head + block[len(head):])
+    for _ in range(size_mb - 1):
+        spool.write(block)
+    spool.seek(0)
+    return UploadFile(spool, size=size_mb * MB, filename="manual.pdf")
+
+
+async def read_whole(file: UploadFile, directory: str) -> str:
+    contents = await file.read()
+    if not is_pdf(contents[:1024]):
+        raise UploadRejected(415, "Unsupported file type")
+    path = os.path.join(directory, "whole.pdf")
+    with open(path, "wb") as f:
+        f.write(contents)
+    return path
+
+
+async def streamed(file: UploadFile, directory: str) -> str:
+    return (await save_upload(file, 10_000 * MB, is_pdf, directory)).path
+
+
+async def measure(handler, size_mb: int, directory: str) -> list:
+    file = _upload(size_mb)
+    probe = LoopLagProbe(0.005)
+    probe.start()
+    await asyncio.sleep(0.05)
+    probe.reset()
+    tracemalloc.start()
+    start = time.perf_counter()
+    path = await handler(file, directory)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    await asyncio.sleep(0.01)
+    lag = max(probe.reset(), default=0.0)
+    probe.stop()
+    assert os.path.getsize(path) == size_mb * MB
+    os.remove(path)
+    await file.close()
+    return [f"{peak / MB:.1f}", f"{elapsed * 1000:.0f}", f"{lag * 1000:.1f}"]
+
+
+async def run(sizes: list[int]):
+    directory = tempfile.mkdtemp(prefix="uploads-")
+    rows = []
+    for size_mb in sizes:
+        for name, handler in (("read whole", read_whole), ("streamed", streamed)):
+            rows.append([f"{size_mb} MB", name, *await measure(handler, size_mb, directory)])
+    print_table(["upload", "handling", "peak heap MB", "ms", "max loop stall ms"], rows)
+
+    limit_mb = max(1, max(sizes) // 2)
+    for label, file, limit in ((f"{max(sizes)} MB, limit {limit_mb} MB", _upload(max(sizes)), limit_mb * MB),
+                               ("not a PDF", _upload(1, head=b"PK\x03\x04"), 10_000 * MB)):
+        start = time.perf_counter()
+        try:
+            await save_upload(file, limit, is_pdf, directory)
+            outcome = "accepted"
+        except UploadRejected as e:
+            outcome = f"{e.status_code} {e}"
+        print(f"{label}: {outcome} in {(time.perf_counter() - start) * 1000:.1f}ms; "
+              f"files left behind: {len(os.listdir(directory))}")
+        await file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100], help="Upload sizes in MB")
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.sizes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Chroma vs the embedded numpy index (services/rag/backends) on a
+session-sized corpus: ingest time, query latency, resident memory and how
+often the two agree on the top k.
+
+Vectors are synthetic -- unit-length 768-d points around a few hundred
+"topic" centers, so neighbours are meaningful -- and go straight to the
+backends: no embedding calls, no API keys. Each backend runs in its own
+child process against a fresh directory, so RSS numbers aren't polluted by
+the other backend's imports.
+
+- ingest: ``--docs`` documents of ``--chunks`` chunks each, one add() per
+  document (as /rag/upload does);
+- query p50/p99: ``--queries`` top-k searches, after the ingest;
+- cold query: the first search after reopening the store from disk;
+- RSS: resident set after ingest and queries, over the process baseline
+  with both libraries imported (mapped segment pages a query touched
+  count);
+- agreement: share of the numpy (exact) top k also returned by Chroma's
+  approximate HNSW search.
+
+Usage (from the repo root):
+
+    python -m benchmarks.vector_store
+    python -m benchmarks.vector_store --docs 20 --chunks 200 --dtype float16
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import percentile, print_table
+
+DIMS = 768
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def corpus(docs: int, chunks: int, seed: int):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(8, docs * chunks // 20), DIMS)).astype(np.float32)
+
+    def around(n):
+        v = centers[rng.integers(len(centers), size=n)] + 0.6 * rng.standard_normal((n, DIMS)).astype(np.float32)
+        return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+    return around, [around(chunks) for _ in range(docs)]
+
+
+def run_backend(name: str, args) -> dict:
+    import chromadb  # noqa: F401 -- same baseline for both backends
+    from services.rag.backends.chroma import ChromaBackend
+    from services.rag.backends.numpy_memmap import NumpyBackend
+
+    def make():
+        return ChromaBackend(path) if name == "chroma" else NumpyBackend(path, args.dtype)
+
+    around, documents = corpus(args.docs, args.chunks, args.seed)
+    queries = around(args.queries)
+    path = tempfile.mkdtemp(prefix=f"vs-{name}-")
+    session = "bench-session"
+    baseline = _rss_mb()
+
+    backend = make()
+    start = time.perf_counter()
+    for d, vectors in enumerate(documents):
+        backend.add(session, ids=[f"doc{d}_{i}" for i in range(len(vectors))], embeddings=vectors,
+                    documents=[f"chunk {i} of document {d} " * 8 for i in range(len(vectors))],
+                    metadatas=[{"doc_id": f"doc{d}", "filename": f"doc{d}.pdf", "page": i // 4 + 1}
+                               for i in range(len(vectors))])
+    ingest = time.perf_counter() - start
+
+    timings, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        hits = backend.query(session, q, args.top_k)
+        timings.append(time.perf_counter() - start)
+        results.append([h["text"] for h in hits])
+    rss = _rss_mb() - baseline
+
+    reopened = make()
+    start = time.perf_counter()
+    reopened.query(session, queries[0], args.top_k)
+    cold = time.perf_counter() - start
+
+    return {"ingest_s": ingest, "query_p50": percentile(timings, 50), "query_p99": percentile(timings, 99),
+            "cold_query": cold, "rss_mb": rss, "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--docs", type=int, default=5, help="Documents per session")
+    parser.add_argument("--chunks", type=int, default=400, help="Chunks per document")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--dtype", default="float32", help="numpy backend storage dtype")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_backend(args.child, args)))
+        return
+
+    runs = {}
+    for name in ("chroma", "numpy"):
+        out = subprocess.run([sys.executable, "-m", "benchmarks.vector_store", "--child", name, *(argv or sys.argv[1:])],
+                             capture_output=True, text=True, check=True, env={**os.environ, "LOG_LEVEL": "WARNING"})
+        runs[name] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    exact = runs["numpy"]["results"]
+    agreement = np.mean([len(set(a) & set(b)) / max(1, len(b)) for a, b in zip(runs["chroma"]["results"], exact)])
+    rows = [[name, f"{r['ingest_s'] * 1000:.0f}", f"{r['query_p50'] * 1000:.2f}", f"{r['query_p99'] * 1000:.2f}",
+             f"{r['cold_query'] * 1000:.1f}", f"{r['rss_mb']:.1f}"] for name, r in runs.items()]
+    print_table(["backend", "ingest ms", "query p50 ms", "query p99 ms", "cold query ms", "RSS MB"], rows)
+    print(f"{args.docs} docs x {args.chunks} chunks, {DIMS}-d, top {args.top_k}; numpy dtype {args.dtype}; "
+          f"Chroma top-k agreement with exact search: {agreement:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,17 +11,159 @@ FINNHUB_API_KEY = os.getenv("FINNHUB_API_KEY")
 ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 
+# ---- Upstream endpoints (overridable so the app can run against local
+# stand-ins, e.g. the offline benchmark harness in benchmarks/) ----
+ASSEMBLY_AI_STREAMING_HOST = os.getenv("ASSEMBLY_AI_STREAMING_HOST", "streaming.assemblyai.com")
+MURF_WS_URL = os.getenv("MURF_WS_URL", "wss://api.murf.ai/v1/speech/stream-input")
+FINNHUB_BASE_URL = os.getenv("FINNHUB_BASE_URL", "https://finnhub.io/api/v1")
+OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "https://api.openweathermap.org/data/2.5")
+COINMARKETCAP_BASE_URL = os.getenv("COINMARKETCAP_BASE_URL", "https://pro-api.coinmarketcap.com/v1")
+
 # ---- App data paths (persistence layer) ----
 DB_PATH = os.getenv("DB_PATH", "app_data.db")
 CHROMA_PATH = os.getenv("CHROMA_PATH", "./chroma_db")
+# Where document vectors live (services/rag/backends): "chroma" under
+# CHROMA_PATH, or "numpy" memory-mapped segments under VECTOR_STORE_PATH,
+# stored as VECTOR_STORE_DTYPE ("float32" or "float16").
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma").lower()
+VECTOR_STORE_PATH = os.getenv("VECTOR_STORE_PATH", "./vector_index")
+VECTOR_STORE_DTYPE = os.getenv("VECTOR_STORE_DTYPE", "float32")
+# numpy backend only: scan a VECTOR_COARSE_DIMS-wide (optionally int8) copy
+# of the vectors first, then rescore the best VECTOR_RERANK_CANDIDATES with
+# the full vectors (0 = always exact search).
+VECTOR_COARSE_DIMS = int(os.getenv("VECTOR_COARSE_DIMS", "256"))
+VECTOR_COARSE_INT8 = os.getenv("VECTOR_COARSE_INT8", "false").lower() == "true"
+VECTOR_RERANK_CANDIDATES = int(os.getenv("VECTOR_RERANK_CANDIDATES", "64"))
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads/pdfs")
+# Uploads are streamed to disk UPLOAD_CHUNK_BYTES at a time
+# (utils/uploads.py); larger PDFs / audio files are rejected with 413.
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+PDF_MAX_UPLOAD_MB = int(os.getenv("PDF_MAX_UPLOAD_MB", "50"))
+AUDIO_MAX_UPLOAD_MB = int(os.getenv("AUDIO_MAX_UPLOAD_MB", "25"))
+# When set, every WebSocket voice session is captured here for replay
+# (see services/session_recorder.py and benchmarks/replay.py).
+SESSION_RECORD_DIR = os.getenv("SESSION_RECORD_DIR", "")
 
 # ---- RAG / memory tuning knobs ----
+# PDF chunking (services/rag/chunker.py): whole sentences packed to about
+# RAG_CHUNK_TOKENS per chunk; a page remainder under RAG_CHUNK_MIN_TOKENS is
+# carried onto the next page. RAG_CHUNKER=fixed restores the character
+# splitter (RAG_CHUNK_SIZE chars, RAG_CHUNK_OVERLAP overlap, per page).
+RAG_CHUNKER = os.getenv("RAG_CHUNKER", "sentences").lower()
+RAG_CHUNK_TOKENS = int(os.getenv("RAG_CHUNK_TOKENS", "200"))
+RAG_CHUNK_MIN_TOKENS = int(os.getenv("RAG_CHUNK_MIN_TOKENS", "60"))
 RAG_CHUNK_SIZE = int(os.getenv("RAG_CHUNK_SIZE", "800"))
 RAG_CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "100"))
+# When on, an upload with the same filename as a document already in the
+# session is stored as that document's new version (unchanged pages and
+# chunks reused) instead of a separate document. Off by default: names like
+# report.pdf or scan.pdf are reused for unrelated files; clients pass
+# ?replaces=<doc_id> to upload a new version explicitly.
+RAG_DOCUMENT_VERSIONING = os.getenv("RAG_DOCUMENT_VERSIONING", "false").lower() == "true"
+# Chunks embedded per embed_content request (the API accepts up to 100).
+RAG_EMBED_BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", "100"))
 RAG_TOP_K = int(os.getenv("RAG_TOP_K", "4"))
+# Hybrid retrieval (services/rag/lexical_index.py): BM25 and vector results,
+# RAG_FUSION_CANDIDATES of each, merged by reciprocal-rank fusion. When the
+# question names an exact term (a number or code) and the top lexical hit
+# contains it and beats the runner-up by RAG_LEXICAL_MARGIN x, the lexical
+# results are used without embedding the question.
+RAG_HYBRID_ENABLED = os.getenv("RAG_HYBRID_ENABLED", "true").lower() == "true"
+RAG_FUSION_CANDIDATES = int(os.getenv("RAG_FUSION_CANDIDATES", "20"))
+RAG_RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+RAG_LEXICAL_MARGIN = float(os.getenv("RAG_LEXICAL_MARGIN", "1.5"))
+# RAG prompt context (services/rag/context.py): the best RAG_CONTEXT_CANDIDATES
+# chunks are ordered by maximal marginal relevance (RAG_MMR_LAMBDA: 1 = rank
+# only, lower = penalise repeated text harder), overlapping chunks of a page
+# are merged, and the result is cut at RAG_CONTEXT_TOKEN_BUDGET tokens.
+RAG_CONTEXT_CANDIDATES = int(os.getenv("RAG_CONTEXT_CANDIDATES", "10"))
+RAG_MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "600"))
+# Answers are cached per session (services/rag/answer_cache.py): a question
+# with the same text, or an embedding at least RAG_ANSWER_CACHE_THRESHOLD
+# cosine-similar to an answered one, gets the stored answer. Cleared for a
+# session whenever its documents change.
+RAG_ANSWER_CACHE_ENABLED = os.getenv("RAG_ANSWER_CACHE_ENABLED", "true").lower() == "true"
+RAG_ANSWER_CACHE_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.9"))
+RAG_ANSWER_CACHE_PER_SESSION = int(os.getenv("RAG_ANSWER_CACHE_PER_SESSION", "32"))
+RAG_ANSWER_CACHE_MAX_SESSIONS = int(os.getenv("RAG_ANSWER_CACHE_MAX_SESSIONS", "512"))
 MEMORY_FACT_LIMIT = int(os.getenv("MEMORY_FACT_LIMIT", "15"))
-CHAT_HISTORY_LIMIT = int(os.getenv("CHAT_HISTORY_LIMIT", "20"))
+# Per-turn memory retrieval (services/memory/fact_index.py): at most
+# MEMORY_TOP_K facts, and no more than MEMORY_TOKEN_BUDGET tokens of them.
+MEMORY_TOP_K = int(os.getenv("MEMORY_TOP_K", "8"))
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "300"))
+MEMORY_INDEX_MAX_USERS = int(os.getenv("MEMORY_INDEX_MAX_USERS", "1000"))
+# Near-duplicate facts (services/memory/dedup.py) are merged when their
+# embeddings are at least this similar, or their word shingles overlap this much.
+MEMORY_DEDUP_SIMILARITY = float(os.getenv("MEMORY_DEDUP_SIMILARITY", "0.95"))
+MEMORY_DEDUP_JACCARD = float(os.getenv("MEMORY_DEDUP_JACCARD", "0.8"))
+# Conversation context (services/compaction.py): recent turns are sent
+# verbatim up to CONTEXT_WINDOW_TOKENS; older ones are folded into a rolling
+# summary once CONTEXT_SUMMARY_TRIGGER_TOKENS of them have built up.
+CONTEXT_WINDOW_TOKENS = int(os.getenv("CONTEXT_WINDOW_TOKENS", "1500"))
+CONTEXT_SUMMARY_TRIGGER_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TRIGGER_TOKENS", "600"))
+CONTEXT_SUMMARY_MAX_WORDS = int(os.getenv("CONTEXT_SUMMARY_MAX_WORDS", "150"))
+
+# ---- Background memory extraction (services/memory/extraction_worker.py) ----
+MEMORY_EXTRACTION_BATCH_SIZE = int(os.getenv("MEMORY_EXTRACTION_BATCH_SIZE", "8"))
+MEMORY_EXTRACTION_BATCH_WINDOW_S = float(os.getenv("MEMORY_EXTRACTION_BATCH_WINDOW_S", "2"))
+MEMORY_EXTRACTION_MIN_INTERVAL_S = float(os.getenv("MEMORY_EXTRACTION_MIN_INTERVAL_S", "1"))
+MEMORY_EXTRACTION_MAX_RETRIES = int(os.getenv("MEMORY_EXTRACTION_MAX_RETRIES", "3"))
+MEMORY_EXTRACTION_MAX_CHARS = int(os.getenv("MEMORY_EXTRACTION_MAX_CHARS", "8000"))
+# Live sessions are mined every MEMORY_CHECKPOINT_INTERVAL_S (0 = only on
+# disconnect), once they have at least MEMORY_CHECKPOINT_MIN_MESSAGES new messages.
+MEMORY_CHECKPOINT_INTERVAL_S = float(os.getenv("MEMORY_CHECKPOINT_INTERVAL_S", "300"))
+MEMORY_CHECKPOINT_MIN_MESSAGES = int(os.getenv("MEMORY_CHECKPOINT_MIN_MESSAGES", "6"))
+
+# ---- Diagnostics / admin ----
+# Admin endpoints (/admin/*) are disabled unless ADMIN_TOKEN is set; callers
+# must send it in the X-Admin-Token header.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+PROFILE_MAX_SECONDS = int(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+
+# ---- Logging (see utils/logger.py) ----
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # "text" or "json"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Comma-separated "<logger>=<N>/s" caps per message template, and
+# "<logger>=<fraction>" sampling, for INFO/DEBUG records only.
+LOG_RATE_LIMITS = os.getenv("LOG_RATE_LIMITS", "httpx=2/s,google_genai=2/s")
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+# Cached chat objects for HTTP /agent/chat (services/chat_registry.py).
+CHAT_REGISTRY_MAX_SESSIONS = int(os.getenv("CHAT_REGISTRY_MAX_SESSIONS", "256"))
+CHAT_REGISTRY_TTL_S = float(os.getenv("CHAT_REGISTRY_TTL_S", "900"))
+# Replies are rewritten for speech (services/speech.py) and capped at this
+# many characters before they are sent to TTS.
+TTS_MAX_CHARS = int(os.getenv("TTS_MAX_CHARS", "450"))
+# Stock "let me check" clips played while tools run (services/fillers.py),
+# synthesized once per voice into FILLER_DIR; skipped for tool rounds that
+# finish within FILLER_DELAY_MS.
+FILLERS_ENABLED = os.getenv("FILLERS_ENABLED", "true").lower() == "true"
+FILLER_DIR = os.getenv("FILLER_DIR", "fillers")
+FILLER_DELAY_MS = float(os.getenv("FILLER_DELAY_MS", "300"))
+# Voice turns start the quote/weather lookups a transcript names before the
+# model asks for them (services/prefetch.py).
+TOOL_PREFETCH_ENABLED = os.getenv("TOOL_PREFETCH_ENABLED", "true").lower() == "true"
+# Crypto quote lookups that miss the cache within QUOTE_BATCH_WINDOW_MS of each
+# other (any session or tool) are fetched as one CoinMarketCap request for up
+# to QUOTE_BATCH_MAX_SYMBOLS (services/quote_batch.py); stock lookups, which
+# have no multi-symbol endpoint, don't wait. Company profiles (market cap) are
+# cached for QUOTE_PROFILE_TTL_S, prices for 60 seconds.
+QUOTE_BATCH_WINDOW_MS = float(os.getenv("QUOTE_BATCH_WINDOW_MS", "20"))
+QUOTE_BATCH_MAX_SYMBOLS = int(os.getenv("QUOTE_BATCH_MAX_SYMBOLS", "50"))
+QUOTE_PROFILE_TTL_S = float(os.getenv("QUOTE_PROFILE_TTL_S", "86400"))
+# Local fast path for simple tool questions (services/intent_router.py):
+# routes scored at or above INTENT_ROUTER_THRESHOLD call the tool directly and
+# need one model round; at or above INTENT_ROUTER_TEMPLATE_THRESHOLD none.
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "false").lower() == "true"
+INTENT_ROUTER_THRESHOLD = float(os.getenv("INTENT_ROUTER_THRESHOLD", "0.7"))
+INTENT_ROUTER_TEMPLATE_THRESHOLD = float(os.getenv("INTENT_ROUTER_TEMPLATE_THRESHOLD", "0.9"))
+# Most tool-calling rounds per turn before the model must answer.
+MAX_TOOL_ROUNDS = int(os.getenv("MAX_TOOL_ROUNDS", "3"))
 
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "gemini-embedding-001")
 CHAT_MODEL = os.getenv("CHAT_MODEL", "gemini-2.5-flash")
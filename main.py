@@ -1,12 +1,12 @@
-from fastapi import FastAPI, Request, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Request, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect, Depends, Header, Query
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import os
 import time
 import random
-import uuid
 import asyncio
+import secrets
 
 import config
 from schema import (
@@ -16,21 +16,29 @@ from schema import (
 )
 from services.stt import transcribe_audio
 from services.tts import murf_tts
+from services.speech import to_speech
 from services.llm_service import query_llm
-from services import session_store, db
+from services import db, session_recorder, prefetch, intent_router, skills
+from services.chat_registry import registry as chat_registry
 from services.db import get_conn
-from utils.logger import logger
+from services.diagnostics import LoopBlockMonitor, sample_profile
+from utils.logger import logger, turn_logger, bind_session, bind_turn, log_stats
+from utils.streaming import sse_event, iterate_in_thread, QueueSink, SSE_HEADERS
+from utils.uploads import SavedUpload, UploadRejected, save_upload, is_audio, is_pdf
 
 from services.assembly_stream import create_assembly_client
 from services.gemini_stream import init_gemini_client, create_assistant_chat, process_gemini_response
 from services.murf_stream import stream_murf_tts
+from services.fillers import FillerPlayback, library as filler_library
 
-from services.rag.pdf_processor import extract_and_chunk
-from services.rag.vector_store import add_chunks, delete_document
-from services.rag.rag_chat import rag_answer
+from services.rag import documents
+from services.rag.vector_store import stats as retrieval_stats
+from services.rag.rag_chat import rag_answer, stream_rag_answer
+from services.rag.answer_cache import cache as answer_cache
 
 from services.memory.memory_store import get_facts, delete_fact
-from services.memory.memory_extractor import extract_and_store_new_facts
+from services.memory.dedup import compact as compact_memories
+from services.memory.extraction_worker import ExtractionWorker
 
 app = FastAPI()
 
@@ -38,8 +46,6 @@ RECORDINGS_DIR = "recordings"
 os.makedirs(RECORDINGS_DIR, exist_ok=True)
 os.makedirs(config.UPLOAD_DIR, exist_ok=True)
 
-MURF_WS_URL = "wss://api.murf.ai/v1/speech/stream-input"
-
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
@@ -50,10 +56,34 @@ async def health_check():
     hitting the full UI/template render or a DB query just to check liveness."""
     return {"status": "ok"}
 
+loop_monitor = LoopBlockMonitor(config.LOOP_BLOCK_THRESHOLD_MS) if config.LOOP_MONITOR_ENABLED else None
+memory_worker = ExtractionWorker(
+    batch_size=config.MEMORY_EXTRACTION_BATCH_SIZE,
+    batch_window=config.MEMORY_EXTRACTION_BATCH_WINDOW_S,
+    min_interval=config.MEMORY_EXTRACTION_MIN_INTERVAL_S,
+    max_retries=config.MEMORY_EXTRACTION_MAX_RETRIES,
+    checkpoint_interval=config.MEMORY_CHECKPOINT_INTERVAL_S,
+    checkpoint_min_messages=config.MEMORY_CHECKPOINT_MIN_MESSAGES,
+    max_chars=config.MEMORY_EXTRACTION_MAX_CHARS,
+)
+
+
 @app.on_event("startup")
 def on_startup():
     db.init_db()
     logger.info("Database initialized")
+    memory_worker.start()
+    if loop_monitor:
+        loop_monitor.start()
+    if config.FILLERS_ENABLED:
+        filler_library.warm()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await memory_worker.stop()
+    if loop_monitor:
+        loop_monitor.stop()
 
 
 # ---------------------------------------------------------------------------
@@ -90,10 +120,24 @@ def generate_audio(req: TTSRequest):
     return {"audio_url": audio_url}
 
 
+async def save_audio(file: UploadFile) -> SavedUpload:
+    try:
+        return await save_upload(file, config.AUDIO_MAX_UPLOAD_MB * 1024 * 1024, is_audio)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+
+async def transcribe_upload(file: UploadFile) -> str:
+    audio = await save_audio(file)
+    try:
+        return await asyncio.to_thread(transcribe_audio, audio.path)
+    finally:
+        audio.discard()
+
+
 @app.post("/transcribe/file")
 async def transcribe_file(file: UploadFile = File(...)):
-    audio_data = await file.read()
-    transcription = transcribe_audio(audio_data)
+    transcription = await transcribe_upload(file)
     return {"transcription": transcription}
 
 
@@ -102,52 +146,82 @@ async def transcribe_file(file: UploadFile = File(...)):
 # ---------------------------------------------------------------------------
 @app.post("/agent/chat/{session_id}", response_model=ChatResponse)
 async def agent_chat(session_id: str, file: UploadFile = File(...), user_id: str = None, request: Request = None):
-    audio_bytes = await file.read()
-    transcription = transcribe_audio(audio_bytes)
+    bind_session(session_id)
+    bind_turn()
+    transcription = await transcribe_upload(file)
 
     user_ip = request.client.host if request and request.client else "unknown"
-    logger.info(f"Transcript from IP {user_ip} (session {session_id}): {transcription}")
+    turn_logger.info("Transcript from IP %s: %s", user_ip, transcription)
 
-    session_store.append_message(session_id, "user", transcription)
-    history = session_store.get_history(session_id)
-    llm_reply = await query_llm(history, user_id=user_id)
-    session_store.append_message(session_id, "assistant", llm_reply)
+    llm_reply = await query_llm(session_id, transcription, user_id=user_id)
 
-    audio_url = murf_tts(llm_reply)
+    audio_url = murf_tts(to_speech(llm_reply))
     return {"transcription": transcription, "reply": llm_reply, "audio_url": audio_url}
 
 
-# ---------------------------------------------------------------------------
-# RAG: PDF upload + document Q&A
-# ---------------------------------------------------------------------------
-@app.post("/rag/upload/{session_id}", response_model=RagUploadResponse)
-async def upload_pdf(session_id: str, file: UploadFile = File(...)):
-    if not file.filename.lower().endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+@app.post("/agent/chat/{session_id}/stream")
+async def agent_chat_stream(session_id: str, file: UploadFile = File(...), user_id: str = None,
+                            request: Request = None):
+    """/agent/chat as Server-Sent Events: `transcription`, then `token`
+    events while the reply is generated, `reply` with the full text, then
+    `audio` events (Murf streaming messages, same shape as on /ws) and
+    finally `done`. A failure part-way sends `error` before `done`."""
+    bind_session(session_id)
+    bind_turn()
+    # Transcribed before the response starts, so the staged audio is removed
+    # even if the client goes away before the body is streamed.
+    transcription = await transcribe_upload(file)
+    user_ip = request.client.host if request and request.client else "unknown"
+    turn_logger.info("Transcript from IP %s: %s", user_ip, transcription)
 
-    doc_id = str(uuid.uuid4())
-    file_path = os.path.join(config.UPLOAD_DIR, f"{doc_id}.pdf")
+    async def events():
+        yield sse_event("transcription", {"text": transcription})
 
-    try:
-        contents = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(contents)
+        queue: asyncio.Queue = asyncio.Queue()
 
-        chunks = extract_and_chunk(file_path)
-        if not chunks:
-            raise HTTPException(status_code=400, detail="Couldn't extract any text from this PDF")
+        async def produce():
+            try:
+                reply = await query_llm(session_id, transcription, user_id=user_id,
+                                        on_text=lambda piece: queue.put_nowait(("token", {"text": piece})))
+                await queue.put(("reply", {"text": reply}))
+                spoken = to_speech(reply)
+                if spoken:
+                    context_id = f"ctx_{int(time.time())}_{random.randint(1000, 9999)}"
+                    await stream_murf_tts(spoken, QueueSink(queue, "audio"),
+                                          config.MURF_WS_URL, config.MURF_API_KEY, context_id)
+            except Exception as e:
+                logger.error("Agent chat stream failed: %s", e, exc_info=True)
+                await queue.put(("error", {"message": "Sorry, something went wrong generating the reply."}))
+            finally:
+                await queue.put(None)
 
-        add_chunks(session_id, doc_id, file.filename, chunks)
+        producer = asyncio.create_task(produce())
+        try:
+            while (item := await queue.get()) is not None:
+                yield sse_event(*item)
+            yield sse_event("done", {})
+        finally:
+            producer.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
 
-        with get_conn() as conn:
-            conn.execute(
-                "INSERT INTO documents (doc_id, session_id, filename, chunk_count) VALUES (?, ?, ?, ?)",
-                (doc_id, session_id, file.filename, len(chunks))
-            )
 
-        return {"doc_id": doc_id, "filename": file.filename, "chunks_indexed": len(chunks)}
-    except HTTPException:
-        raise
+# ---------------------------------------------------------------------------
+# RAG: PDF upload + document Q&A
+# ---------------------------------------------------------------------------
+@app.post("/rag/upload/{session_id}", response_model=RagUploadResponse)
+async def upload_pdf(session_id: str, file: UploadFile = File(...), replaces: str | None = None):
+    """Indexes a PDF for the session. ``replaces`` (a doc_id) uploads a new
+    version of that document; see services/rag/documents.py."""
+    try:
+        upload = await save_upload(file, config.PDF_MAX_UPLOAD_MB * 1024 * 1024, is_pdf, config.UPLOAD_DIR)
+        return await asyncio.to_thread(documents.ingest, session_id, file.filename, upload.path, upload.sha256,
+                                       replaces)
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail="Only PDF files are supported"
+                            if e.status_code == 415 else str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"PDF upload failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to process PDF")
@@ -155,10 +229,22 @@ async def upload_pdf(session_id: str, file: UploadFile = File(...)):
 
 @app.post("/rag/chat/{session_id}", response_model=RagChatResponse)
 async def rag_chat_endpoint(session_id: str, req: RagChatRequest):
-    result = rag_answer(session_id, req.question)
+    result = await asyncio.to_thread(rag_answer, session_id, req.question)
     return result
 
 
+@app.post("/rag/chat/{session_id}/stream")
+async def rag_chat_stream(session_id: str, req: RagChatRequest):
+    """/rag/chat as Server-Sent Events: `sources` first (retrieval is done
+    before generation starts), then `token` events, then `done`."""
+    async def events():
+        async for event, data in iterate_in_thread(lambda: stream_rag_answer(session_id, req.question)):
+            yield sse_event(event, data)
+        yield sse_event("done", {})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @app.get("/rag/documents/{session_id}")
 async def list_documents(session_id: str):
     with get_conn() as conn:
@@ -171,14 +257,7 @@ async def list_documents(session_id: str):
 
 @app.delete("/rag/documents/{session_id}/{doc_id}")
 async def delete_document_endpoint(session_id: str, doc_id: str):
-    delete_document(session_id, doc_id)
-    with get_conn() as conn:
-        conn.execute("DELETE FROM documents WHERE doc_id = ? AND session_id = ?", (doc_id, session_id))
-
-    file_path = os.path.join(config.UPLOAD_DIR, f"{doc_id}.pdf")
-    if os.path.exists(file_path):
-        os.remove(file_path)
-
+    await asyncio.to_thread(documents.remove, session_id, doc_id)
     return {"success": True}
 
 
@@ -202,14 +281,61 @@ async def delete_memory_fact(user_id: str, fact_id: int):
     return {"success": True}
 
 
+# ---------------------------------------------------------------------------
+# Admin: runtime diagnostics (disabled unless ADMIN_TOKEN is set)
+# ---------------------------------------------------------------------------
+def require_admin(x_admin_token: str = Header(default="")):
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not secrets.compare_digest(x_admin_token, config.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.get("/admin/stats", dependencies=[Depends(require_admin)])
+async def admin_stats():
+    return {
+        "event_loop": loop_monitor.stats() if loop_monitor else None,
+        "logging": log_stats(),
+        "memory_extraction": memory_worker.stats(),
+        "chat_registry": chat_registry.stats(),
+        "tool_prefetch": prefetch.stats(),
+        "quote_batching": skills.quote_stats(),
+        "intent_router": intent_router.stats(),
+        "rag_retrieval": retrieval_stats(),
+        "documents": await asyncio.to_thread(documents.stats),
+        "rag_answer_cache": answer_cache.stats(),
+    }
+
+
+@app.post("/admin/memory/compact", dependencies=[Depends(require_admin)])
+async def admin_compact_memory(user_id: str | None = None):
+    """Folds duplicate / superseded memory facts (one user, or everyone)."""
+    stats = await asyncio.to_thread(compact_memories, user_id)
+    logger.info("Memory compaction: %s", stats)
+    return stats
+
+
+@app.get("/admin/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def admin_profile(seconds: float = Query(10, gt=0)):
+    """Samples every thread for `seconds` and returns collapsed stacks
+    (flamegraph.pl / speedscope input)."""
+    seconds = min(seconds, config.PROFILE_MAX_SECONDS)
+    collapsed = await asyncio.to_thread(sample_profile, seconds, config.PROFILE_SAMPLE_INTERVAL_MS)
+    return PlainTextResponse(collapsed, headers={"Content-Disposition": "attachment; filename=profile.collapsed"})
+
+
 # ---------------------------------------------------------------------------
 # WebSocket: real-time streaming voice chat
 # ---------------------------------------------------------------------------
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     await websocket.accept()
+    bind_session(session_id)
     user_id = websocket.query_params.get("user_id")
     logger.info(f"WebSocket connected for session: {session_id} (user_id={user_id})")
+    recorder = session_recorder.start(config.SESSION_RECORD_DIR, session_id, user_id)
+    if recorder:
+        websocket = session_recorder.RecordingWebSocket(websocket, recorder)
     connected_flag = {"value": True}
 
     user_ip = getattr(websocket.client, "host", "unknown")
@@ -217,13 +343,17 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
 
     loop = asyncio.get_event_loop()
     gemini_client = init_gemini_client()
-    chat = create_assistant_chat(gemini_client, user_id=user_id)
+    chat = create_assistant_chat(gemini_client, session_id, user_id=user_id)
 
     context_id = f"ctx_{int(time.time())}_{random.randint(1000, 9999)}"
     logger.info(f"Generated context ID: {context_id}")
 
     async def on_final_transcript(transcript: str):
-        logger.info(f"Transcript from IP {user_ip}: {transcript}")
+        # Runs as its own task, so the turn id stays local to this turn.
+        bind_turn()
+        turn_logger.info("Transcript from IP %s: %s", user_ip, transcript)
+        # Warm the market/weather cache while the first model round runs.
+        turn_prefetch = prefetch.start(transcript)
         try:
             await process_gemini_response(
                 session_id,
@@ -231,8 +361,9 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 chat,
                 websocket,
                 lambda text, ws=websocket: stream_murf_tts(
-                    text, ws, MURF_WS_URL, config.MURF_API_KEY, context_id
+                    text, ws, config.MURF_WS_URL, config.MURF_API_KEY, context_id
                 ),
+                filler=FillerPlayback(websocket, context_id) if config.FILLERS_ENABLED else None,
             )
         except Exception as e:
             logger.error(f"Error while processing Gemini response: {e}", exc_info=True)
@@ -244,6 +375,8 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 })
             except Exception:
                 logger.warning("Failed to notify client about Gemini error")
+        finally:
+            turn_prefetch.finish()
 
     try:
         client = create_assembly_client(loop, websocket, on_final_transcript, connected_flag)
@@ -256,6 +389,8 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
         })
         return
 
+    if user_id:
+        memory_worker.track(session_id, user_id)
     try:
         while True:
             try:
@@ -279,15 +414,14 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
         except Exception as e:
             logger.warning(f"Error while disconnecting AssemblyAI client: {e}")
 
-        # Mine this session's new turns for long-term memory facts.
+        # Mine this session's new turns for long-term memory facts, off the
+        # request path (see services/memory/extraction_worker.py).
         if user_id:
-            try:
-                new_facts = extract_and_store_new_facts(session_id, user_id)
-                if new_facts:
-                    logger.info(f"Stored {len(new_facts)} new memory facts for user {user_id}")
-            except Exception as e:
-                logger.warning(f"Memory extraction failed on disconnect: {e}")
+            memory_worker.untrack(session_id)
+            memory_worker.enqueue(session_id, user_id)
 
+        if recorder:
+            recorder.close()
         logger.info("Streaming session closed")
 
 
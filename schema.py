@@ -31,6 +31,8 @@ class RagUploadResponse(BaseModel):
     doc_id: str
     filename: str
     chunks_indexed: int
+    reused: bool = False  # already indexed for another session; nothing was re-embedded
+    pages_reused: int = 0  # pages of a new version taken from the previous one
 
 
 class RagChatRequest(BaseModel):
@@ -41,6 +43,7 @@ class RagSource(BaseModel):
     doc_id: str
     filename: str
     page: int
+    page_end: Optional[int] = None  # last page, when the cited chunk spans pages
 
 
 class RagChatResponse(BaseModel):
@@ -1,10 +1,12 @@
 import asyncio
+import contextvars
 from assemblyai.streaming.v3 import (
     StreamingClient, StreamingClientOptions, StreamingParameters, StreamingSessionParameters,
     StreamingEvents, StreamingError, BeginEvent, TurnEvent, TerminationEvent
 )
 import config
-from utils.logger import logger
+from services import session_recorder
+from utils.logger import logger, turn_logger, session_id_var
 
 
 def create_assembly_client(loop, websocket, on_final_transcript, connected_flag):
@@ -12,36 +14,47 @@ def create_assembly_client(loop, websocket, on_final_transcript, connected_flag)
     on_final_transcript: async callable invoked with the finalized transcript
     text once AssemblyAI marks a turn as complete and formatted.
     """
+    # SDK callbacks fire on its own reader thread; hand the tasks they create
+    # the endpoint's context so per-session ContextVars (e.g. the session
+    # recorder) are visible to on_final_transcript.
+    session_context = contextvars.copy_context()
+    recorder = session_recorder.current()
+    log_extra = {"session_id": session_id_var.get()}
+
     client = StreamingClient(StreamingClientOptions(
         api_key=config.ASSEMBLY_AI_API_KEY,
-        api_host="streaming.assemblyai.com",
+        api_host=config.ASSEMBLY_AI_STREAMING_HOST,
     ))
 
     def on_turn(self: StreamingClient, event: TurnEvent):
         if event.end_of_turn and event.turn_is_formatted and connected_flag["value"]:
-            logger.info(f"[FINAL] Transcript: {event.transcript}")
+            turn_logger.info("[FINAL] Transcript: %s", event.transcript, extra=log_extra)
+            if recorder:
+                recorder.record_stt_turn(event.model_dump(mode="json"))
 
             if event.transcript.strip():
                 loop.call_soon_threadsafe(
                     asyncio.create_task,
-                    websocket.send_text(event.transcript)
+                    websocket.send_text(event.transcript),
+                    context=session_context,
                 )
                 loop.call_soon_threadsafe(
                     asyncio.create_task,
-                    on_final_transcript(event.transcript)
+                    on_final_transcript(event.transcript),
+                    context=session_context,
                 )
 
         if event.end_of_turn and not event.turn_is_formatted:
             self.set_params(StreamingSessionParameters(format_turns=True))
 
     def on_begin(self: StreamingClient, event: BeginEvent):
-        logger.info(f"AssemblyAI session started: {event.id}")
+        logger.info("AssemblyAI session started: %s", event.id, extra=log_extra)
 
     def on_terminated(self: StreamingClient, event: TerminationEvent):
-        logger.info(f"AssemblyAI session terminated after {event.audio_duration_seconds:.2f}s")
+        logger.info("AssemblyAI session terminated after %.2fs", event.audio_duration_seconds, extra=log_extra)
 
     def on_error(self: StreamingClient, error: StreamingError):
-        logger.error(f"AssemblyAI streaming error: {error}")
+        logger.error("AssemblyAI streaming error: %s", error, extra=log_extra)
 
     client.on(StreamingEvents.Begin, on_begin)
     client.on(StreamingEvents.Turn, on_turn)
@@ -0,0 +1,101 @@
+"""
+Live Gemini chat objects for the HTTP /agent/chat route, keyed by session_id.
+
+The WebSocket path keeps one chat per connection, but the HTTP route used
+to rebuild everything per request (client, system instruction, flattened
+prompt). Now consecutive HTTP turns for a session reuse the same
+gemini_stream.AssistantChat -- its SDK history, and the shared client's
+connections -- instead of re-sending the conversation.
+
+- Bounded: at most CHAT_REGISTRY_MAX_SESSIONS chats (least recently used
+  are evicted first), and chats idle for CHAT_REGISTRY_TTL_S are dropped.
+- A miss (new session, evicted, or server restart) rehydrates the chat
+  from what session_store/compaction have for the session, so eviction
+  only costs one rebuild, never conversation state.
+- Chats built with an old Gemini key are rebuilt after /get-api-keys.
+
+Counters and caps are reported by ``stats()`` (/admin/stats).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import config
+from services.gemini_stream import AssistantChat, init_gemini_client
+from services.genai_client import client_key
+
+
+class _Entry:
+    def __init__(self, assistant: AssistantChat, key: str | None):
+        self.assistant = assistant
+        self.key = key
+        self.last_used = time.monotonic()
+
+
+class ChatRegistry:
+    def __init__(self, max_sessions: int, ttl_seconds: float):
+        self.max_sessions = max_sessions
+        self.ttl = ttl_seconds
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evicted_lru": 0, "evicted_ttl": 0, "rebuilt_for_key": 0}
+
+    def get(self, session_id: str, user_id: str | None = None) -> AssistantChat:
+        """The session's chat, rehydrated from storage on a miss. Blocking
+        on a miss (SQLite + memory retrieval); call via asyncio.to_thread."""
+        client = init_gemini_client()
+        key = client_key()
+        with self._lock:
+            self._evict_expired()
+            entry = self._entries.get(session_id)
+            if entry and entry.assistant.user_id == user_id and entry.key == key:
+                self._entries.move_to_end(session_id)
+                entry.last_used = time.monotonic()
+                self._stats["hits"] += 1
+                return entry.assistant
+            if entry and entry.key != key:
+                self._stats["rebuilt_for_key"] += 1
+            self._stats["misses"] += 1
+
+        assistant = AssistantChat(client, session_id, user_id)
+        with self._lock:
+            # Concurrent misses for a session all build a chat, but the first
+            # one stored is what every caller gets: one history, one lock.
+            entry = self._entries.get(session_id)
+            if entry and entry.assistant.user_id == user_id and entry.key == key:
+                self._entries.move_to_end(session_id)
+                entry.last_used = time.monotonic()
+                return entry.assistant
+            self._entries[session_id] = _Entry(assistant, key)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+                self._stats["evicted_lru"] += 1
+        return assistant
+
+    def discard(self, session_id: str):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def _evict_expired(self):
+        # Entries are kept in last-use order, so expired ones are at the front.
+        cutoff = time.monotonic() - self.ttl
+        while self._entries:
+            session_id, entry = next(iter(self._entries.items()))
+            if entry.last_used >= cutoff:
+                break
+            del self._entries[session_id]
+            self._stats["evicted_ttl"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._evict_expired()
+            return {
+                **self._stats,
+                "sessions": len(self._entries),
+                "max_sessions": self.max_sessions,
+                "ttl_s": self.ttl,
+            }
+
+
+registry = ChatRegistry(config.CHAT_REGISTRY_MAX_SESSIONS, config.CHAT_REGISTRY_TTL_S)
@@ -0,0 +1,157 @@
+"""
+Token-budgeted conversation context with a cached rolling summary.
+
+The HTTP path used to re-send a fixed number of recent messages as one
+blob every turn, and the WebSocket path's chat object grew for the whole
+life of the connection. Now both build their context from:
+
+- a *window* of the most recent messages, kept verbatim, sized by estimated
+  tokens (CONTEXT_WINDOW_TOKENS) rather than message count; and
+- a *summary* of everything older, stored per session in
+  ``session_summaries`` together with the id of the last message it covers.
+
+``build_context`` is cheap (one SQLite read, no LLM call). Messages that
+fall out of the window but aren't summarized yet stay verbatim until they
+add up to CONTEXT_SUMMARY_TRIGGER_TOKENS; then ``schedule_update`` folds
+them into the summary in the background (one LLM call, previous summary +
+the new overflow), so the turn that triggers it doesn't wait. If
+summarizing keeps failing, the oldest unsummarized messages are dropped
+from the prompt (not from the DB) once the total passes twice the budget.
+"""
+import asyncio
+import config
+from services.genai_client import get_client
+from services.db import get_conn
+from utils.logger import logger
+from utils.tokens import estimate_tokens
+
+_MAX_LOAD = 500
+
+_SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and a voice assistant.
+Update the summary so it also covers the new turns below. Keep what matters for continuing the
+conversation: the user's goals and questions, facts and numbers already given, decisions, open threads.
+Drop small talk. Write plain prose, at most {max_words} words. Return only the updated summary.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}
+"""
+
+_in_flight: dict[str, asyncio.Task] = {}
+
+
+def _message_tokens(m: dict) -> int:
+    return estimate_tokens(m["content"]) + 4
+
+
+def get_summary(session_id: str) -> tuple[str | None, int]:
+    with get_conn() as conn:
+        row = conn.execute(
+            "SELECT summary, covered_message_id FROM session_summaries WHERE session_id = ?", (session_id,)
+        ).fetchone()
+    return (row["summary"], row["covered_message_id"]) if row else (None, 0)
+
+
+def _load_uncovered(session_id: str, covered_id: int) -> list[dict]:
+    with get_conn() as conn:
+        rows = conn.execute(
+            """SELECT id, role, content FROM messages
+               WHERE session_id = ? AND id > ?
+               ORDER BY id DESC LIMIT ?""",
+            (session_id, covered_id, _MAX_LOAD)
+        ).fetchall()
+    return [{"id": r["id"], "role": r["role"], "content": r["content"]} for r in reversed(rows)]
+
+
+def _split(messages: list[dict]) -> tuple[list[dict], list[dict]]:
+    """(overflow, window): the window is the newest messages that fit in
+    CONTEXT_WINDOW_TOKENS (always at least the last one)."""
+    used, start = 0, len(messages)
+    for i in range(len(messages) - 1, -1, -1):
+        used += _message_tokens(messages[i])
+        if used > config.CONTEXT_WINDOW_TOKENS and start < len(messages):
+            break
+        start = i
+    return messages[:start], messages[start:]
+
+
+def build_context(session_id: str) -> tuple[str | None, list[dict]]:
+    """Returns (summary, messages): the summary of older turns (or None)
+    and the messages to send verbatim, oldest first. Blocking."""
+    summary, covered_id = get_summary(session_id)
+    messages = _load_uncovered(session_id, covered_id)
+    overflow, window = _split(messages)
+
+    # Not summarized yet: keep verbatim, within a hard cap.
+    budget = 2 * config.CONTEXT_WINDOW_TOKENS - sum(_message_tokens(m) for m in window)
+    kept = []
+    for m in reversed(overflow):
+        budget -= _message_tokens(m)
+        if budget < 0:
+            break
+        kept.append(m)
+    return summary, kept[::-1] + window
+
+
+def needs_update(session_id: str) -> bool:
+    _, covered_id = get_summary(session_id)
+    overflow, _ = _split(_load_uncovered(session_id, covered_id))
+    return sum(_message_tokens(m) for m in overflow) >= config.CONTEXT_SUMMARY_TRIGGER_TOKENS
+
+
+def update_summary(session_id: str) -> bool:
+    """Folds the messages that fell out of the window into the stored
+    summary. Blocking (LLM call). Returns True if the summary moved."""
+    summary, covered_id = get_summary(session_id)
+    overflow, _ = _split(_load_uncovered(session_id, covered_id))
+    if not overflow:
+        return False
+
+    client = get_client()
+    response = client.models.generate_content(
+        model=config.CHAT_MODEL,
+        contents=_SUMMARY_PROMPT.format(
+            max_words=config.CONTEXT_SUMMARY_MAX_WORDS,
+            summary=summary or "(none yet)",
+            turns="\n".join(f"{m['role']}: {m['content']}" for m in overflow),
+        ),
+    )
+    new_summary = (response.text or "").strip()
+    if not new_summary:
+        return False
+
+    with get_conn() as conn:
+        # Guarded on the old cursor so a concurrent update can't move it back.
+        conn.execute(
+            """INSERT INTO session_summaries (session_id, summary, covered_message_id)
+               VALUES (?, ?, ?)
+               ON CONFLICT(session_id) DO UPDATE SET
+                 summary = excluded.summary,
+                 covered_message_id = excluded.covered_message_id,
+                 updated_at = CURRENT_TIMESTAMP
+               WHERE session_summaries.covered_message_id = ?""",
+            (session_id, new_summary, overflow[-1]["id"], covered_id)
+        )
+    return True
+
+
+async def _update(session_id: str):
+    try:
+        if await asyncio.to_thread(needs_update, session_id):
+            if await asyncio.to_thread(update_summary, session_id):
+                logger.info("Updated conversation summary for session %s", session_id)
+    except Exception as e:
+        logger.warning("Conversation summary update failed for session %s: %s", session_id, e)
+    finally:
+        _in_flight.pop(session_id, None)
+
+
+def schedule_update(session_id: str):
+    """Refreshes the session's summary in the background if enough
+    unsummarized history has built up. Call after each turn is stored."""
+    if session_id in _in_flight:
+        return
+    _in_flight[session_id] = asyncio.get_running_loop().create_task(_update(session_id))
+
@@ -25,6 +25,12 @@ def get_conn():
         conn.close()
 
 
+def _add_column_if_missing(conn, table: str, column: str, decl: str):
+    columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
 def init_db():
     with get_conn() as conn:
         conn.execute("""
@@ -54,6 +60,34 @@ def init_db():
             CREATE INDEX IF NOT EXISTS idx_documents_session
             ON documents(session_id)
         """)
+        # Uploads are stored once per distinct file (services/rag/documents.py):
+        # a documents row is one session's reference to a document_blobs row.
+        # Rows from before this have no content_hash; their chunks live in
+        # the session's own vector namespace.
+        _add_column_if_missing(conn, "documents", "content_hash", "TEXT")
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_documents_hash
+            ON documents(content_hash)
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS document_blobs (
+                content_hash TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                chunk_count INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Per-page fingerprints and text of each stored document, so a new
+        # version only re-extracts the pages that changed.
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS document_pages (
+                content_hash TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                fingerprint TEXT NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (content_hash, page)
+            )
+        """)
 
         conn.execute("""
             CREATE TABLE IF NOT EXISTS memories (
@@ -68,6 +102,17 @@ def init_db():
             CREATE INDEX IF NOT EXISTS idx_memories_user
             ON memories(user_id)
         """)
+        # Fact embeddings (float32 bytes) for relevance-ranked retrieval --
+        # see services/memory/fact_index.py. Added after the table shipped,
+        # so migrate existing databases in place.
+        _add_column_if_missing(conn, "memories", "embedding", "BLOB")
+        # Normalized-text hash for exact dedup (services/memory/dedup.py).
+        # Pre-existing rows stay NULL until the compaction job fills them in.
+        _add_column_if_missing(conn, "memories", "fact_hash", "TEXT")
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_memories_user_hash
+            ON memories(user_id, fact_hash)
+        """)
 
         # Tracks which sessions have already been mined for memory facts,
         # so we don't re-extract from turns we've already processed.
@@ -78,3 +123,31 @@ def init_db():
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+
+        # BM25 index over document chunks (services/rag/lexical_index.py).
+        # Chunks uploaded before it existed are only in the vector store.
+        # session_id holds the vector namespace: the session for older
+        # uploads, "doc-<hash>" for shared documents.
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunk_fts USING fts5(
+                text,
+                session_id UNINDEXED,
+                doc_id UNINDEXED,
+                filename UNINDEXED,
+                page UNINDEXED,
+                page_end UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+
+        # Rolling summary of each session's older turns -- see
+        # services/compaction.py. covered_message_id is the last message
+        # folded into the summary; everything after it is sent verbatim.
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS session_summaries (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                covered_message_id INTEGER NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
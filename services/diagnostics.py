@@ -0,0 +1,120 @@
+"""
+Runtime diagnostics for finding event-loop stalls in production.
+
+A lot of the app still does sync I/O inside coroutines (sqlite3 via
+get_conn, requests.post in murf_tts, pdfplumber in upload_pdf, the sync
+Gemini stream iterator). While any of those run, every other WebSocket on
+the loop is frozen. Two tools make that visible without redeploying:
+
+1. ``LoopBlockMonitor`` -- a heartbeat coroutine on the loop plus a watchdog
+   thread. When the heartbeat is late by more than the threshold, the
+   watchdog grabs the loop thread's *current* stack (i.e. whatever is
+   blocking it right now) and logs it once per stall, then logs the total
+   stall duration when the loop comes back.
+2. ``sample_profile`` -- a stdlib sampling profiler that snapshots every
+   thread's stack at a fixed interval for N seconds and returns the result
+   in the collapsed-stack format flamegraph.pl / speedscope read
+   (``frame;frame;frame count`` per line). Served by ``/admin/profile``.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+from utils.logger import logger
+
+_MAX_STACK_FRAMES = 30
+
+
+class LoopBlockMonitor:
+    def __init__(self, threshold_ms: float, interval_ms: float = 20):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.stalls = 0
+        self.max_lag = 0.0
+        self.total_blocked = 0.0
+        self._last_beat = time.monotonic()
+        self._loop_thread_id = None
+        self._task = None
+        self._watchdog = None
+        self._stop = threading.Event()
+        self._stall_reported = False
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info("Event-loop block monitor started (threshold %.0fms)", self.threshold * 1000)
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = now - before - self.interval
+            self._last_beat = now
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag > self.threshold:
+                self.stalls += 1
+                self.total_blocked += lag
+                logger.warning("Event loop was blocked for %.0fms", lag * 1000)
+            self._stall_reported = False
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            overdue = time.monotonic() - self._last_beat - self.interval
+            if overdue <= self.threshold or self._stall_reported:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self._stall_reported = True
+            stack = "".join(traceback.format_stack(frame)[-_MAX_STACK_FRAMES:])
+            logger.warning("Event loop blocked for %.0fms so far; loop thread is in:\n%s", overdue * 1000, stack)
+
+    def stats(self) -> dict:
+        return {
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "stalls": self.stalls,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "total_blocked_ms": round(self.total_blocked * 1000, 1),
+        }
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{frame.f_lineno})"
+
+
+def sample_profile(seconds: float, interval_ms: float = 5) -> str:
+    """Samples every thread's stack for ``seconds`` and returns collapsed
+    stacks, rooted at the thread name. Blocking -- run it in a worker thread."""
+    interval = interval_ms / 1000
+    own_id = threading.get_ident()
+    counts: Counter[str] = Counter()
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}"))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+
+    return "\n".join(f"{stack} {n}" for stack, n in counts.most_common()) + "\n"
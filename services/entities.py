@@ -0,0 +1,116 @@
+"""
+Lightweight entity extraction from a final transcript: stock tickers,
+crypto symbols and weather cities, with no model call.
+
+Used by services/prefetch.py to guess which tool calls a turn will make
+before Gemini has asked for them. It only has to be cheap and rarely
+wrong -- a miss just means the tool call fetches as it always did, and a
+false positive costs one wasted upstream request.
+
+- Tickers and crypto symbols match as written in upper case ("AAPL",
+  "BTC"); company and coin names ("Tesla", "bitcoin") match in any case,
+  but company names only when the sentence also sounds like a market
+  question, so "I had an apple" doesn't fetch AAPL.
+- Cities match only alongside a weather word; "forecast"/"tomorrow"-style
+  words ask for the forecast instead of current conditions.
+"""
+import re
+from dataclasses import dataclass, field
+
+STOCK_ALIASES = {
+    "apple": "AAPL", "microsoft": "MSFT", "tesla": "TSLA", "google": "GOOGL", "alphabet": "GOOGL",
+    "amazon": "AMZN", "nvidia": "NVDA", "meta": "META", "facebook": "META", "netflix": "NFLX",
+    "intel": "INTC", "amd": "AMD", "ibm": "IBM", "oracle": "ORCL", "salesforce": "CRM",
+    "adobe": "ADBE", "paypal": "PYPL", "uber": "UBER", "disney": "DIS", "coca cola": "KO",
+    "coca-cola": "KO", "pepsi": "PEP", "pepsico": "PEP", "walmart": "WMT", "nike": "NKE",
+    "boeing": "BA", "jpmorgan": "JPM", "jp morgan": "JPM", "goldman sachs": "GS", "visa": "V",
+    "mastercard": "MA", "starbucks": "SBUX", "mcdonald's": "MCD", "mcdonalds": "MCD",
+    "spotify": "SPOT", "shopify": "SHOP", "palantir": "PLTR", "broadcom": "AVGO",
+    "qualcomm": "QCOM", "cisco": "CSCO", "coinbase": "COIN", "airbnb": "ABNB", "snowflake": "SNOW",
+    "berkshire hathaway": "BRK.B", "exxon": "XOM", "chevron": "CVX", "pfizer": "PFE",
+    "johnson & johnson": "JNJ", "infosys": "INFY", "wipro": "WIT", "tsmc": "TSM", "alibaba": "BABA",
+}
+# Tickers recognized when spoken/written as a symbol. Single letters and
+# symbols that collide with crypto are left to the alias table.
+TICKERS = {t for t in STOCK_ALIASES.values() if len(t) > 1} | {"SPY", "QQQ", "DIA", "IWM", "VOO", "ARM"}
+
+CRYPTO_ALIASES = {
+    "bitcoin": "BTC", "ethereum": "ETH", "ether": "ETH", "solana": "SOL", "cardano": "ADA",
+    "polkadot": "DOT", "dogecoin": "DOGE", "doge": "DOGE", "ripple": "XRP", "litecoin": "LTC",
+    "tether": "USDT", "binance coin": "BNB", "shiba inu": "SHIB", "avalanche": "AVAX",
+    "chainlink": "LINK", "polygon": "MATIC", "tron": "TRX", "toncoin": "TON",
+}
+CRYPTO_SYMBOLS = set(CRYPTO_ALIASES.values())
+
+CITIES = [
+    "mumbai", "delhi", "new delhi", "bangalore", "bengaluru", "chennai", "kolkata", "hyderabad",
+    "pune", "ahmedabad", "jaipur", "lucknow", "kochi", "goa", "chandigarh", "indore", "surat",
+    "nagpur", "bhopal", "patna", "new york", "los angeles", "san francisco", "chicago", "seattle",
+    "boston", "miami", "houston", "austin", "dallas", "washington", "toronto", "vancouver",
+    "london", "paris", "berlin", "madrid", "rome", "amsterdam", "dublin", "zurich", "vienna",
+    "moscow", "istanbul", "dubai", "abu dhabi", "doha", "riyadh", "cairo", "nairobi", "lagos",
+    "johannesburg", "cape town", "singapore", "hong kong", "tokyo", "osaka", "seoul", "beijing",
+    "shanghai", "bangkok", "jakarta", "kuala lumpur", "manila", "sydney", "melbourne",
+    "auckland", "mexico city", "sao paulo", "buenos aires", "lima", "karachi", "lahore",
+    "dhaka", "kathmandu", "colombo",
+]
+
+_FINANCE_WORDS = re.compile(
+    r"\b(price|prices|stock|stocks|share|shares|trading|trade|worth|market|cap|quote|compare|"
+    r"invest|investing|buy|sell|up|down|doing|value|portfolio|performance|ticker|crypto|coin)\b", re.I)
+_WEATHER_WORDS = re.compile(
+    r"\b(weather|temperature|forecast|rain|raining|rainy|sunny|humid|humidity|hot|cold|warm|"
+    r"degrees|wind|windy|snow|snowing|umbrella|cloudy|storm)\b", re.I)
+_FORECAST_WORDS = re.compile(r"\b(forecast|tomorrow|tonight|later|this week|weekend|next few)\b", re.I)
+
+
+def _alternation(names) -> re.Pattern:
+    ordered = sorted(names, key=len, reverse=True)   # "new delhi" before "delhi"
+    return re.compile(r"\b(" + "|".join(re.escape(n) for n in ordered) + r")\b", re.I)
+
+
+_STOCK_NAMES = _alternation(STOCK_ALIASES)
+_CRYPTO_NAMES = _alternation(CRYPTO_ALIASES)
+_CITY_NAMES = _alternation(CITIES)
+_SYMBOL = re.compile(r"(?<![\w.$])\$?([A-Z]{2,5}(?:\.[A-Z])?)\b")
+
+
+@dataclass
+class Entities:
+    stocks: list[str] = field(default_factory=list)
+    cryptos: list[str] = field(default_factory=list)
+    cities: list[str] = field(default_factory=list)
+    forecast: bool = False
+
+    def __bool__(self):
+        return bool(self.stocks or self.cryptos or self.cities)
+
+
+def _add(items: list[str], value: str):
+    if value not in items:
+        items.append(value)
+
+
+def extract(text: str) -> Entities:
+    """Tickers, crypto symbols and weather cities mentioned in ``text``."""
+    found = Entities()
+    if not text:
+        return found
+
+    for match in _SYMBOL.finditer(text):
+        symbol = match.group(1)
+        if symbol in CRYPTO_SYMBOLS:
+            _add(found.cryptos, symbol)
+        elif symbol in TICKERS:
+            _add(found.stocks, symbol)
+    for match in _CRYPTO_NAMES.finditer(text):
+        _add(found.cryptos, CRYPTO_ALIASES[match.group(1).lower()])
+    if _FINANCE_WORDS.search(text):
+        for match in _STOCK_NAMES.finditer(text):
+            _add(found.stocks, STOCK_ALIASES[match.group(1).lower()])
+
+    if _WEATHER_WORDS.search(text):
+        for match in _CITY_NAMES.finditer(text):
+            _add(found.cities, match.group(1).title())
+        found.forecast = bool(_FORECAST_WORDS.search(text))
+    return found
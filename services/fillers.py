@@ -0,0 +1,168 @@
+"""
+Pre-synthesized filler clips ("Let me check that for you") that cover the
+silence while tools run.
+
+A tool turn is two model rounds plus the tool calls in between -- often a
+couple of seconds in which the caller hears nothing. When the model asks
+for a tool, ``FillerPlayback`` streams a short stock phrase to the client
+(after FILLER_DELAY_MS, so fast tool rounds don't get one), and the client
+fades it out as soon as the real answer's first audio chunk arrives.
+
+Clips are synthesized once per voice through the same Murf streaming API
+and stored as WAV files under FILLER_DIR/<voice_id>/; later starts just
+load them. Missing clips are generated in the background at startup (or
+with ``python -m services.fillers``); until then turns simply go without.
+"""
+import asyncio
+import base64
+import os
+import random
+import sys
+import time
+import wave
+
+import config
+from services.murf_stream import VOICE_ID, stream_murf_tts
+from utils.logger import logger
+
+PHRASES = [
+    "Let me check that for you.",
+    "One moment while I look that up.",
+    "Sure, give me a second.",
+]
+SAMPLE_RATE = 44100
+_CHUNK_BYTES = SAMPLE_RATE // 4 * 2     # 0.25 s of 16-bit mono PCM
+_WAV_HEADER = 44
+
+
+class _Collector:
+    """Takes the place of the client WebSocket in stream_murf_tts."""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+        self.failed = False
+
+    async def send_json(self, data: dict):
+        if "audio_chunk" in data:
+            self.chunks.append(base64.b64decode(data["audio_chunk"]))
+        elif data.get("status") == "error":
+            self.failed = True
+
+
+def _pcm(chunks: list[bytes]) -> bytes:
+    if chunks and chunks[0][:4] == b"RIFF":
+        chunks = [chunks[0][_WAV_HEADER:], *chunks[1:]]
+    return b"".join(chunks)
+
+
+class FillerLibrary:
+    def __init__(self, directory: str, phrases: list[str] = PHRASES):
+        self.directory = directory
+        self.phrases = phrases
+        self._clips: dict[str, list[bytes]] = {}
+        self._warming: dict[str, asyncio.Task] = {}
+
+    def _path(self, voice_id: str, index: int) -> str:
+        return os.path.join(self.directory, voice_id, f"{index}.wav")
+
+    def _load(self, voice_id: str) -> list[bytes]:
+        clips = []
+        for i in range(len(self.phrases)):
+            path = self._path(voice_id, i)
+            if os.path.exists(path):
+                with wave.open(path, "rb") as f:
+                    clips.append(f.readframes(f.getnframes()))
+        return clips
+
+    def _save(self, voice_id: str, index: int, pcm: bytes):
+        path = self._path(voice_id, index)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with wave.open(tmp, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(SAMPLE_RATE)
+            f.writeframes(pcm)
+        os.replace(tmp, path)
+
+    async def ensure(self, voice_id: str = VOICE_ID) -> int:
+        """Synthesizes and stores any of this voice's clips that are missing,
+        then loads them. Returns how many clips are available."""
+        for i, phrase in enumerate(self.phrases):
+            if os.path.exists(self._path(voice_id, i)):
+                continue
+            collector = _Collector()
+            context_id = f"filler_{int(time.time())}_{i}"
+            await stream_murf_tts(phrase, collector, config.MURF_WS_URL, config.MURF_API_KEY, context_id,
+                                  voice_id=voice_id)
+            pcm = _pcm(collector.chunks)
+            if collector.failed or not pcm:
+                logger.warning("Couldn't synthesize filler clip %d for voice %s", i, voice_id)
+                continue
+            await asyncio.to_thread(self._save, voice_id, i, pcm)
+        self._clips[voice_id] = await asyncio.to_thread(self._load, voice_id)
+        logger.info("Filler clips ready for voice %s: %d/%d", voice_id, len(self._clips[voice_id]), len(self.phrases))
+        return len(self._clips[voice_id])
+
+    def warm(self, voice_id: str = VOICE_ID):
+        """Runs ``ensure`` in the background (call from a running loop)."""
+        if voice_id not in self._warming:
+            self._warming[voice_id] = asyncio.get_running_loop().create_task(self.ensure(voice_id))
+
+    def clip(self, voice_id: str = VOICE_ID) -> bytes | None:
+        clips = self._clips.get(voice_id)
+        return random.choice(clips) if clips else None
+
+
+library = FillerLibrary(config.FILLER_DIR)
+
+
+class FillerPlayback:
+    """One turn's filler. ``start`` is called when the model asks for a
+    tool; ``finish`` once the reply text is ready, before its audio."""
+
+    def __init__(self, websocket, context_id: str, voice_id: str = VOICE_ID, lib: FillerLibrary = library):
+        self.websocket = websocket
+        self.context_id = context_id
+        self.voice_id = voice_id
+        self.library = lib
+        self.sent = False
+        self._task: asyncio.Task | None = None
+
+    def start(self, *_):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._play())
+
+    async def _play(self):
+        pcm = self.library.clip(self.voice_id)
+        if not pcm:
+            return
+        await asyncio.sleep(config.FILLER_DELAY_MS / 1000)
+        self.sent = True
+        for n, offset in enumerate(range(0, len(pcm), _CHUNK_BYTES), 1):
+            await self.websocket.send_json({
+                "filler_chunk": base64.b64encode(pcm[offset:offset + _CHUNK_BYTES]).decode(),
+                "chunk_number": n,
+                "context_id": self.context_id,
+            })
+
+    async def finish(self, speaking: bool):
+        """Stops the filler -- not yet started, or part-way through sending
+        -- so no filler chunk can follow the answer's audio. If some was
+        sent and no answer audio will follow to cut it off, tells the client
+        to stop it."""
+        if self._task:
+            self._task.cancel()
+            # wait() rather than await: returns once the filler has stopped
+            # without re-raising its CancelledError here, while a
+            # cancellation of the turn itself still propagates.
+            await asyncio.wait([self._task])
+            if not self._task.cancelled() and self._task.exception():
+                logger.warning("Filler playback failed: %s", self._task.exception())
+        if self.sent and not speaking:
+            await self.websocket.send_json({"status": "filler_stop", "context_id": self.context_id})
+
+
+if __name__ == "__main__":
+    count = asyncio.run(library.ensure(sys.argv[1] if len(sys.argv) > 1 else VOICE_ID))
+    print(f"{count}/{len(library.phrases)} filler clips in {library.directory}")
@@ -7,6 +7,12 @@ Fixes vs the original:
 - `tools` are actually attached to the chat config now (they were commented
   out before, so finance/weather function calling silently never fired in
   the live voice path).
+- Memory facts in the system instruction are re-ranked against each
+  utterance (services/memory/fact_index.py) and sent as a per-turn config.
+- The chat's history is bounded: once it outgrows the context budget it is
+  rebuilt from a rolling summary + recent window (services/compaction.py).
+- Tool calls go through orchestrator.run_chat_turn: function_response parts
+  sent back into the same chat, several rounds, parallel calls per round.
 - One persistent `chat` object per WebSocket connection is reused for every
   turn, instead of the old code re-creating a brand-new client + chat on
   every single message (which also meant Gemini had no real conversational
@@ -14,63 +20,146 @@ Fixes vs the original:
   conversation_text as one blob each time).
 - Chat history is persisted to SQLite via services.session_store instead of
   the in-memory CHAT_SESSIONS_REAL dict.
+- Simple single-tool questions can skip the model's tool-choosing round
+  (services/intent_router.py, off by default).
 """
+import asyncio
 import json
 from google import genai
 from google.genai import types
-from services.skills import tools, handle_financial_function_call
-from services.orchestrator import build_system_instruction
-from services import session_store
+from services.skills import tools
+from services.orchestrator import build_system_instruction, run_chat_turn, to_contents
+from services import session_store, compaction, intent_router
+from services.speech import to_speech
+from services.fillers import FillerPlayback
 import config
-from utils.logger import logger
+from services.genai_client import get_client
+from utils.logger import turn_logger
+from utils.tokens import estimate_tokens
 
 
 def init_gemini_client() -> genai.Client:
-    return genai.Client()
+    return get_client()
 
 
-def create_assistant_chat(client: genai.Client, user_id: str | None = None):
-    return client.chats.create(
-        model=config.CHAT_MODEL,
-        config=types.GenerateContentConfig(
-            system_instruction=build_system_instruction(user_id),
-            tools=[tools],
-        ),
+def assistant_config(user_id: str | None = None, query: str | None = None,
+                     summary: str | None = None) -> types.GenerateContentConfig:
+    return types.GenerateContentConfig(
+        system_instruction=build_system_instruction(user_id, query, summary),
+        tools=[tools],
     )
 
 
-async def process_gemini_response(session_id: str, transcript: str, chat, websocket, stream_tts_fn):
-    session_store.append_message(session_id, "user", transcript)
+def _part_tokens(part: types.Part) -> int:
+    tokens = estimate_tokens(part.text or "")
+    if part.function_call:
+        tokens += estimate_tokens(part.function_call.name or "")
+        tokens += estimate_tokens(json.dumps(part.function_call.args or {}, default=str))
+    if part.function_response:
+        tokens += estimate_tokens(json.dumps(part.function_response.response or {}, default=str))
+    return tokens
 
-    final_text = ""
-    function_calls = []
 
-    response = chat.send_message_stream(transcript)
-    for chunk in response:
-        if chunk.text:
-            final_text += chunk.text
-        if chunk.candidates and chunk.candidates[0].content.parts:
-            for part in chunk.candidates[0].content.parts:
-                if part.function_call:
-                    function_calls.append({"name": part.function_call.name, "arguments": dict(part.function_call.args)})
+class AssistantChat:
+    """The Gemini chat for one voice session plus the conversation summary
+    its history starts after. Once the chat's history outgrows the context
+    budget, ``compact_if_needed`` swaps in a fresh chat seeded from
+    services/compaction.py (summary + recent window), so a long call doesn't
+    resend an ever-growing history every turn."""
 
-    if function_calls:
-        results = []
-        for fc in function_calls:
-            result = await handle_financial_function_call(fc["name"], fc["arguments"])
-            results.append({"function_name": fc["name"], "result": result})
+    def __init__(self, client: genai.Client, session_id: str, user_id: str | None = None):
+        self.client = client
+        self.session_id = session_id
+        self.user_id = user_id
+        self.summary = None
+        self.chat = None
+        # One turn at a time: overlapping sends would interleave history.
+        self.lock = asyncio.Lock()
+        self.rebuild()
 
-        context = "Function call results:\n" + "\n".join(
-            f"- {r['function_name']}: {json.dumps(r['result']) if not isinstance(r['result'], str) else r['result']}"
-            for r in results
+    def rebuild(self):
+        """(Re)creates the chat from what's stored for the session -- also
+        how a reconnecting session picks up where it left off. Blocking."""
+        self.summary, messages = compaction.build_context(self.session_id)
+        self.chat = self.client.chats.create(
+            model=config.CHAT_MODEL,
+            config=assistant_config(self.user_id, summary=self.summary),
+            history=to_contents(messages),
         )
-        final_response = chat.send_message_stream(context)
-        final_text = "".join(chunk.text for chunk in final_response if chunk.text)
 
-    logger.info(f"Gemini final response for session {session_id}: {final_text[:200]}")
-    session_store.append_message(session_id, "assistant", final_text)
+    def turn_config(self, query: str) -> types.GenerateContentConfig:
+        return assistant_config(self.user_id, query, self.summary)
 
-    if final_text.strip():
-        await stream_tts_fn(final_text.strip())
+    def record_turn(self, text: str, reply: str):
+        """Adds a turn answered without the model to the chat's history, so
+        follow-up questions still see it."""
+        self.chat.record_history(
+            user_input=types.Content(role="user", parts=[types.Part(text=text)]),
+            model_output=[types.Content(role="model", parts=[types.Part(text=reply)])],
+            is_valid=True,
+        )
+
+    def history_tokens(self) -> int:
+        """Estimated size of the chat's history, tool calls and their
+        results included: on a tool-heavy call those are most of it."""
+        return sum(_part_tokens(part) for content in self.chat.get_history() for part in (content.parts or []))
+
+    def compact_if_needed(self) -> bool:
+        limit = config.CONTEXT_WINDOW_TOKENS + config.CONTEXT_SUMMARY_TRIGGER_TOKENS
+        if self.history_tokens() <= limit:
+            return False
+        self.rebuild()
+        return True
+
+
+def create_assistant_chat(client: genai.Client, session_id: str, user_id: str | None = None) -> AssistantChat:
+    return AssistantChat(client, session_id, user_id)
+
+
+async def generate_reply(session_id: str, text: str, assistant: AssistantChat, on_text=None,
+                         on_tool_calls=None) -> str:
+    """One user turn on ``assistant``: stores the message, runs the tool loop
+    and stores + returns the reply. Shared by the WebSocket and HTTP paths;
+    ``on_text`` / ``on_tool_calls`` are passed to run_chat_turn."""
+    async with assistant.lock:
+        session_store.append_message(session_id, "user", text)
+
+        routed = await intent_router.route_turn(text, on_tool_calls)
+        if routed and routed.answer:
+            final_text = routed.answer
+            assistant.record_turn(text, final_text)
+            if on_text:
+                on_text(final_text)
+        else:
+            # Re-pick the memory facts for this utterance; the per-call config
+            # replaces the chat's default one for this turn only.
+            turn_config = await asyncio.to_thread(assistant.turn_config, text)
+            message = routed.message(text) if routed else text
+            final_text = await run_chat_turn(assistant.chat, message, turn_config, on_text, on_tool_calls)
+
+        turn_logger.info("Gemini final response: %.200s", final_text)
+        session_store.append_message(session_id, "assistant", final_text)
+
+        compaction.schedule_update(session_id)
+        if await asyncio.to_thread(assistant.compact_if_needed):
+            turn_logger.info("Compacted chat history (summary: %s)", "yes" if assistant.summary else "no")
+    return final_text
+
+
+async def process_gemini_response(session_id: str, transcript: str, assistant: AssistantChat, websocket,
+                                  stream_tts_fn, filler: FillerPlayback | None = None):
+    try:
+        final_text = await generate_reply(session_id, transcript, assistant,
+                                          on_tool_calls=filler.start if filler else None)
+    except Exception:
+        if filler:
+            await filler.finish(speaking=False)
+        raise
+
+    spoken = to_speech(final_text)
+    if filler:
+        await filler.finish(speaking=bool(spoken))
+    if spoken:
+        await stream_tts_fn(spoken)
     else:
         await websocket.send_json({"status": "error", "message": "No response generated"})
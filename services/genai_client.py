@@ -0,0 +1,32 @@
+"""
+One shared google-genai client for the whole process.
+
+Every call site used to build its own ``genai.Client()`` -- per request, per
+embedding, per extraction -- which re-reads settings and throws away the
+client's HTTP connection pool each time (the loop monitor caught client
+construction blocking the event loop on WebSocket connect). The client is
+rebuilt only when the Gemini key changes at runtime via /get-api-keys.
+"""
+import os
+import threading
+from google import genai
+
+_client: genai.Client | None = None
+_client_key: str | None = None
+_lock = threading.Lock()
+
+
+def get_client() -> genai.Client:
+    global _client, _client_key
+    key = os.environ.get("GEMINI_API_KEY")
+    with _lock:
+        if _client is None or key != _client_key:
+            _client = genai.Client()
+            _client_key = key
+        return _client
+
+
+def client_key() -> str | None:
+    """The key the current client was built with (lets caches holding SDK
+    objects notice a key change)."""
+    return _client_key
@@ -0,0 +1,192 @@
+"""
+Deterministic fast path for simple, single-intent tool questions.
+
+A tool question normally costs two Gemini rounds: one to decide on the
+tool call, one to phrase its result. For utterances like "price of BTC" or
+"what's the weather in Pune" the first round adds nothing, so ``classify``
+recognizes them locally -- services/entities.py for symbols and places,
+plus a few phrasing patterns -- and scores how sure it is:
+
+- at or above INTENT_ROUTER_TEMPLATE_THRESHOLD the tool is called directly
+  and the answer is a fixed template: no Gemini call at all;
+- at or above INTENT_ROUTER_THRESHOLD the tool is called directly and its
+  result is sent along with the question in a single Gemini round;
+- anything else (several intents, open-ended questions like "should I buy
+  Tesla?", unknown symbols) goes through the normal tool loop.
+
+A failed tool call is never answered from a template; the model gets the
+error and explains it. Off by default (INTENT_ROUTER_ENABLED);
+``python -m benchmarks.intent_router`` measures accuracy and coverage per
+threshold on a labeled utterance set. Counters are in ``stats()``
+(/admin/stats).
+"""
+import json
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+
+from google.genai import types
+
+import config
+from services import entities, session_recorder
+from services.skills import handle_financial_function_call
+from services.speech import format_price
+from utils.logger import turn_logger
+
+MAX_WORDS = 14
+
+_PRICE_ASK = re.compile(r"\b(price|prices|trading|worth|quote|cost|costs|how much|value|priced)\b", re.I)
+# A company named rather than written as a ticker ("Tesla", not "TSLA") is
+# only templated alongside a stock-specific word: "the resale value of a
+# Tesla" is about the car. Worth/value/cost alone never count for a name.
+_STOCK_ASK = re.compile(r"\b(stock|stocks|share|shares|ticker|trading|market)\b", re.I)
+_VALUE_ASK = re.compile(r"\b(worth|value|cost|costs|how much)\b", re.I)
+_COMPARE_ASK = re.compile(r"\b(compare|comparison|versus|vs\.?|against)\b", re.I)
+_WEATHER_ASK = re.compile(r"\b(weather|temperature|forecast|how (hot|cold|warm))\b", re.I)
+_IMPERIAL = re.compile(r"\b(fahrenheit|imperial)\b", re.I)
+# Questions that need judgement, history or several steps: the model's job.
+_OPEN_ENDED = re.compile(
+    r"\b(why|should|would|could|explain|recommend|predict|prediction|think|opinion|advice|analy[sz]e|"
+    r"history|historical|yesterday|last (week|month|year)|news|portfolio|remember|if|buy|sell)\b", re.I)
+_FOLLOW_ON = re.compile(r"\b(and (also|then|what|how|tell)|also|plus)\b", re.I)
+
+_lock = threading.Lock()
+_stats = {"classified": 0, "templated": 0, "grounded": 0, "passed_through": 0, "tool_errors": 0}
+
+
+@dataclass
+class Route:
+    tool: str
+    args: dict = field(default_factory=dict)
+    confidence: float = 0.0
+
+
+def classify(text: str) -> Route | None:
+    """The single tool call ``text`` asks for, with a confidence in [0, 1],
+    or None when it isn't a simple tool question."""
+    if not text or _OPEN_ENDED.search(text):
+        return None
+    found = entities.extract(text)
+    kinds = [kind for kind in (found.stocks, found.cryptos, found.cities) if kind]
+    if len(kinds) != 1:
+        return None
+
+    if found.cities:
+        if len(found.cities) > 1:
+            return None
+        tool = "get_weather_forecast_func" if found.forecast else "get_current_weather_func"
+        units = "imperial" if _IMPERIAL.search(text) else "metric"
+        route = Route(tool, {"location": found.cities[0], "units": units},
+                      0.9 if _WEATHER_ASK.search(text) else 0.75)
+    elif found.cryptos:
+        if len(found.cryptos) > 1:
+            return None
+        route = Route("get_crypto_price", {"symbol": found.cryptos[0]}, 0.95 if _PRICE_ASK.search(text) else 0.75)
+    elif len(found.stocks) > 1:
+        route = Route("compare_stocks", {"symbols": ",".join(found.stocks)},
+                      0.9 if _COMPARE_ASK.search(text) else 0.6)
+    else:
+        symbol = found.stocks[0]
+        if re.search(rf"(?<![\w.]){re.escape(symbol)}\b", text) or _STOCK_ASK.search(text):
+            confidence = 0.95 if _PRICE_ASK.search(text) else 0.75
+        elif _PRICE_ASK.search(text) and not _PRICE_ASK.search(_VALUE_ASK.sub("", text)):
+            return None
+        else:
+            confidence = 0.75
+        route = Route("get_stock_price", {"symbol": symbol}, confidence)
+
+    if _FOLLOW_ON.search(text):
+        route.confidence -= 0.2
+    if len(text.split()) > MAX_WORDS:
+        route.confidence -= 0.2
+    return route
+
+
+def _temp(value: float, units: str) -> str:
+    return f"{value:.0f}{units}" if units.startswith("°") else f"{value:.0f} kelvin"
+
+
+def _move(pct: float) -> str:
+    return f"{'up' if pct >= 0 else 'down'} {abs(pct):.2f}%"
+
+
+def template_answer(route: Route, result: dict) -> str | None:
+    """A spoken answer built from a successful tool result, or None."""
+    if not isinstance(result, dict) or "error" in result or result.get("success") is False:
+        return None
+    if route.tool == "get_stock_price":
+        return f"{result['symbol']} is at ${format_price(result['price'])}, {_move(result['change_pct'])} today."
+    if route.tool == "get_crypto_price":
+        return (f"{result['name']} is at ${format_price(result['price'])}, "
+                f"{_move(result['change_pct_24h'])} over the last 24 hours.")
+    if route.tool == "compare_stocks":
+        ranked = result["ranked_by_change"]
+        moves = "; ".join(f"{s['symbol']} is {_move(s['change_pct'])} at ${format_price(s['price'])}" for s in ranked)
+        return f"{ranked[0]['symbol']} is leading today. {moves}."
+    if route.tool == "get_current_weather_func":
+        d = result["data"]
+        return (f"In {d['location'].split(',')[0]} it's {_temp(d['temperature'], d['units'])} with "
+                f"{d['description'].lower()}, feeling like {_temp(d['feels_like'], d['units'])}, "
+                f"and humidity is {d['humidity']}%.")
+    if route.tool == "get_weather_forecast_func":
+        d = result["data"]
+        temps = [f["temperature"] for f in d["forecast"]]
+        sky = Counter(f["description"].lower() for f in d["forecast"]).most_common(1)[0][0]
+        return (f"Over the next 24 hours in {d['location'].split(',')[0]}, expect mostly {sky}, with temperatures "
+                f"between {_temp(min(temps), d['units'])} and {_temp(max(temps), d['units'])}.")
+    return None
+
+
+@dataclass
+class RoutedTurn:
+    route: Route
+    result: dict
+    answer: str | None = None     # set when no model call is needed
+
+    def message(self, text: str) -> list[types.Part]:
+        """The user's question with the tool result already attached, for a
+        single model round."""
+        data = json.dumps(self.result, separators=(",", ":"), default=str)
+        return [
+            types.Part(text=f"Tool results already fetched for the question below -- "
+                            f"{self.route.tool}({json.dumps(self.route.args)}): {data}. "
+                            f"Answer from them; only call a tool if they don't cover the question."),
+            types.Part(text=text),
+        ]
+
+
+async def route_turn(text: str, on_tool_calls=None) -> RoutedTurn | None:
+    """Runs the fast path for ``text`` if it qualifies (see module
+    docstring); None means the turn should take the normal tool loop."""
+    if not config.INTENT_ROUTER_ENABLED:
+        return None
+    route = classify(text)
+    with _lock:
+        _stats["classified"] += 1
+    if route is None or route.confidence < config.INTENT_ROUTER_THRESHOLD:
+        with _lock:
+            _stats["passed_through"] += 1
+        return None
+
+    if on_tool_calls:
+        on_tool_calls([route.tool])
+    result = await handle_financial_function_call(route.tool, dict(route.args))
+    session_recorder.record("tool", {"name": route.tool, "args": route.args, "result": result})
+
+    answer = template_answer(route, result) if route.confidence >= config.INTENT_ROUTER_TEMPLATE_THRESHOLD else None
+    failed = isinstance(result, dict) and ("error" in result or result.get("success") is False)
+    with _lock:
+        _stats["tool_errors"] += failed
+        _stats["templated" if answer else "grounded"] += 1
+    turn_logger.info("Intent router: %s %s (%.2f, %s)", route.tool, route.args, route.confidence,
+                     "template" if answer else "one model round")
+    return RoutedTurn(route, result, answer)
+
+
+def stats() -> dict:
+    with _lock:
+        s = dict(_stats)
+    s.update(enabled=config.INTENT_ROUTER_ENABLED, threshold=config.INTENT_ROUTER_THRESHOLD,
+             template_threshold=config.INTENT_ROUTER_TEMPLATE_THRESHOLD)
+    return s
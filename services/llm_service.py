@@ -1,17 +1,20 @@
 """
 Consolidated LLM entrypoint for the plain HTTP chat route (/agent/chat).
 Replaces the old llm.py, which used a hardcoded 10-word limit and no tools.
+
+Turns run on the session's cached chat (services/chat_registry.py) through
+the same generate_reply as the WebSocket path.
 """
-from google import genai
-from services.orchestrator import run_tool_calling_turn
+import asyncio
+from services.chat_registry import registry
+from services.gemini_stream import generate_reply
 from utils.logger import logger
 
 
-async def query_llm(messages: list[dict], user_id: str | None = None) -> str:
-    conversation_text = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
-    client = genai.Client()
+async def query_llm(session_id: str, text: str, user_id: str | None = None, on_text=None) -> str:
     try:
-        return await run_tool_calling_turn(client, conversation_text, user_id)
+        assistant = await asyncio.to_thread(registry.get, session_id, user_id)
+        return await generate_reply(session_id, text, assistant, on_text)
     except Exception as e:
         logger.error(f"LLM query failed: {e}", exc_info=True)
         return "Sorry, I ran into an error generating a response."
@@ -0,0 +1,208 @@
+"""
+Duplicate and superseded fact handling for long-term memory.
+
+The extractor used to insert every string it got back, so a user who says
+"I hold 10 AAPL" in ten sessions ended up with ten near-identical rows
+crowding everything else out of the prompt. Every write now goes through
+``store_fact``, which compares the new fact against the user's existing
+ones:
+
+1. Exact duplicates -- same text after normalization (case, punctuation,
+   whitespace), compared via ``memories.fact_hash`` -- are dropped.
+2. Near-duplicates are merged into the existing row *in place* (same id,
+   newer text, embedding and timestamp), so the latest statement wins:
+   - the same statement with only numbers changed ("I hold 10 AAPL" ->
+     "I hold 15 AAPL") -- a superseded fact;
+   - embeddings closer than MEMORY_DEDUP_SIMILARITY (paraphrases);
+   - MinHash-estimated word-shingle Jaccard above MEMORY_DEDUP_JACCARD,
+     which also covers rows that have no embedding yet.
+   If several rows match, the best one is updated and the rest are deleted.
+
+``compact`` applies the same rules to rows written before this existed and
+returns a stats report; it runs from ``POST /admin/memory/compact`` or
+``python -m services.memory.dedup``.
+"""
+import hashlib
+import json
+import re
+import sys
+
+import numpy as np
+
+import config
+from services.db import get_conn
+from services.memory import fact_index
+
+_NUM_PERM = 64
+_PRIME = (1 << 31) - 1      # Mersenne prime; a*h + b stays well inside uint64
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, _PRIME, _NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, _PRIME, _NUM_PERM, dtype=np.uint64)
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def normalize_fact(fact: str) -> str:
+    text = re.sub(r"[^\w\s.%$-]", " ", fact.lower())
+    text = re.sub(r"(?<!\d)[.-]|[.-](?!\d)", " ", text)
+    return " ".join(text.split())
+
+
+def fact_hash(fact: str) -> str:
+    return hashlib.sha1(normalize_fact(fact).encode()).hexdigest()
+
+
+def _shingles(normalized: str) -> set[str]:
+    words = normalized.split()
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def minhash_signature(fact: str) -> np.ndarray:
+    shingles = _shingles(normalize_fact(fact)) or {""}
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") % _PRIME for s in shingles],
+        dtype=np.uint64,
+    )
+    return ((np.multiply.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _PRIME).min(axis=1)
+
+
+def jaccard_estimate(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+def _without_numbers(fact: str) -> str:
+    return " ".join(_NUMBER.sub(" ", normalize_fact(fact)).split())
+
+
+class _Candidate:
+    def __init__(self, row_id: int, fact: str, embedding: bytes | None):
+        self.id = row_id
+        self.fact = fact
+        self.skeleton = _without_numbers(fact)
+        self.vector = np.frombuffer(embedding, dtype=np.float32) if embedding is not None else None
+        self._signature = None
+
+    @property
+    def signature(self) -> np.ndarray:
+        if self._signature is None:
+            self._signature = minhash_signature(self.fact)
+        return self._signature
+
+
+def _match_score(new: _Candidate, old: _Candidate) -> float | None:
+    """How strongly ``new`` restates ``old``, or None if it doesn't."""
+    if new.skeleton and new.skeleton == old.skeleton:
+        return 2.0
+    if new.vector is not None and old.vector is not None and new.vector.shape == old.vector.shape:
+        similarity = float(new.vector @ old.vector)
+        if similarity >= config.MEMORY_DEDUP_SIMILARITY:
+            return similarity
+    jaccard = jaccard_estimate(new.signature, old.signature)
+    if jaccard >= config.MEMORY_DEDUP_JACCARD:
+        return jaccard
+    return None
+
+
+def _load_candidates(conn, user_id: str) -> list[_Candidate]:
+    rows = conn.execute(
+        "SELECT id, fact, embedding FROM memories WHERE user_id = ? ORDER BY id ASC", (user_id,)
+    ).fetchall()
+    return [_Candidate(r["id"], r["fact"], r["embedding"]) for r in rows]
+
+
+def _matches(new: _Candidate, existing: list[_Candidate]) -> list[_Candidate]:
+    scored = [(score, old) for old in existing if (score := _match_score(new, old)) is not None]
+    return [old for _, old in sorted(scored, key=lambda pair: -pair[0])]
+
+
+def is_known(conn, user_id: str, fact: str) -> bool:
+    """Cheap exact check, so callers can skip embedding facts the user
+    already has."""
+    return conn.execute("SELECT 1 FROM memories WHERE user_id = ? AND fact_hash = ? LIMIT 1",
+                        (user_id, fact_hash(fact))).fetchone() is not None
+
+
+def store_fact(conn, user_id: str, fact: str, embedding: bytes | None, category: str = "general") -> str:
+    """Inserts, merges or drops ``fact`` within the caller's transaction.
+    Returns "inserted", "updated" or "duplicate"."""
+    if is_known(conn, user_id, fact):
+        return "duplicate"
+    digest = fact_hash(fact)
+
+    matches = _matches(_Candidate(0, fact, embedding), _load_candidates(conn, user_id))
+    if not matches:
+        conn.execute(
+            "INSERT INTO memories (user_id, fact, category, embedding, fact_hash) VALUES (?, ?, ?, ?, ?)",
+            (user_id, fact, category, embedding, digest)
+        )
+        return "inserted"
+
+    keep, *extra = matches
+    conn.execute(
+        """UPDATE memories SET fact = ?, embedding = ?, fact_hash = ?, created_at = CURRENT_TIMESTAMP
+           WHERE id = ?""",
+        (fact, embedding, digest, keep.id)
+    )
+    if extra:
+        conn.executemany("DELETE FROM memories WHERE id = ?", [(c.id,) for c in extra])
+    return "updated"
+
+
+def compact(user_id: str | None = None) -> dict:
+    """Dedups existing rows (one user, or everyone). Walks each user's facts
+    oldest first; a row that restates an earlier one is folded into it
+    (earlier id, later text). Blocking."""
+    stats = {"users": 0, "rows_scanned": 0, "exact_removed": 0, "near_removed": 0, "hashes_backfilled": 0}
+    with get_conn() as conn:
+        if user_id:
+            users = [user_id]
+        else:
+            users = [r["user_id"] for r in conn.execute("SELECT DISTINCT user_id FROM memories")]
+
+        for uid in users:
+            stats["users"] += 1
+            rows = conn.execute(
+                "SELECT id, fact, embedding, fact_hash FROM memories WHERE user_id = ? ORDER BY id ASC", (uid,)
+            ).fetchall()
+            kept: list[_Candidate] = []
+            hashes: dict[str, _Candidate] = {}
+            changed = False
+            for r in rows:
+                stats["rows_scanned"] += 1
+                digest = fact_hash(r["fact"])
+                if r["fact_hash"] != digest:
+                    conn.execute("UPDATE memories SET fact_hash = ? WHERE id = ?", (digest, r["id"]))
+                    stats["hashes_backfilled"] += 1
+
+                if digest in hashes:
+                    conn.execute("DELETE FROM memories WHERE id = ?", (r["id"],))
+                    stats["exact_removed"] += 1
+                    changed = True
+                    continue
+
+                current = _Candidate(r["id"], r["fact"], r["embedding"])
+                matches = _matches(current, kept)
+                if not matches:
+                    kept.append(current)
+                    hashes[digest] = current
+                    continue
+
+                target = matches[0]
+                conn.execute("UPDATE memories SET fact = ?, embedding = ?, fact_hash = ? WHERE id = ?",
+                             (r["fact"], r["embedding"], digest, target.id))
+                conn.execute("DELETE FROM memories WHERE id = ?", (r["id"],))
+                stats["near_removed"] += 1
+                changed = True
+                merged = _Candidate(target.id, r["fact"], r["embedding"])
+                kept[kept.index(target)] = merged
+                hashes = {h: c for h, c in hashes.items() if c is not target}
+                hashes[digest] = merged
+
+            if changed:
+                fact_index.invalidate(uid)
+
+    stats["rows_removed"] = stats["exact_removed"] + stats["near_removed"]
+    return stats
+
+
+if __name__ == "__main__":
+    print(json.dumps(compact(sys.argv[1] if len(sys.argv) > 1 else None), indent=2))
@@ -0,0 +1,188 @@
+"""
+Background long-term memory extraction.
+
+The WebSocket endpoint used to extract facts inline in
+its ``finally`` block -- a blocking Gemini call plus several SQLite round
+trips on the event loop, on every disconnect -- and a long session was never
+mined until it ended. Instead, sessions are now handed to this worker:
+
+- ``enqueue`` on disconnect; ``track`` / ``untrack`` register live sessions
+  so a checkpoint task re-enqueues them every MEMORY_CHECKPOINT_INTERVAL_S
+  (once they've gathered MEMORY_CHECKPOINT_MIN_MESSAGES new messages).
+- Jobs are collected for up to MEMORY_EXTRACTION_BATCH_WINDOW_S and up to
+  MEMORY_EXTRACTION_BATCH_SIZE sessions are mined with a single LLM call.
+- LLM calls are spaced at least MEMORY_EXTRACTION_MIN_INTERVAL_S apart;
+  failed batches are retried with exponential backoff, up to
+  MEMORY_EXTRACTION_MAX_RETRIES times.
+- A session's facts and its memory_extraction_log cursor are committed in
+  one transaction, so a failed or interrupted batch just gets re-mined.
+
+All DB and Gemini work runs in worker threads via asyncio.to_thread.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+
+from services.memory.memory_extractor import (
+    commit_facts, extract_facts_batch, format_conversation, load_pending_messages,
+)
+from utils.logger import logger
+
+
+@dataclass
+class ExtractionJob:
+    session_id: str
+    user_id: str
+    final: bool = True
+    attempt: int = 0
+
+
+class ExtractionWorker:
+    def __init__(self, batch_size: int = 8, batch_window: float = 2.0, min_interval: float = 1.0,
+                 max_retries: int = 3, checkpoint_interval: float = 300.0, checkpoint_min_messages: int = 6,
+                 max_chars: int = 8000):
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_min_messages = checkpoint_min_messages
+        self.max_chars = max_chars
+
+        self._queue: asyncio.Queue | None = None
+        self._pending: dict[str, ExtractionJob] = {}
+        self._active: dict[str, str] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._last_call = 0.0
+        self._stats = {"llm_calls": 0, "sessions_mined": 0, "facts_stored": 0, "facts_merged": 0,
+                       "facts_duplicate": 0, "retries": 0, "failed_jobs": 0}
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.get_running_loop().create_task(self._run())]
+        if self.checkpoint_interval > 0:
+            self._tasks.append(asyncio.get_running_loop().create_task(self._checkpoints()))
+        logger.info("Memory extraction worker started (batch %d, window %ss)", self.batch_size, self.batch_window)
+
+    async def stop(self, timeout: float = 10.0):
+        """Gives queued jobs up to ``timeout`` seconds to finish; anything left
+        keeps its cursor and is picked up by the next extraction."""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Memory extraction worker stopped with %d jobs pending", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+
+    # ---- producers ----------------------------------------------------
+    def enqueue(self, session_id: str, user_id: str, final: bool = True):
+        if self._queue is None:
+            return
+        pending = self._pending.get(session_id)
+        if pending:
+            pending.final = pending.final or final
+            return
+        job = ExtractionJob(session_id, user_id, final)
+        self._pending[session_id] = job
+        self._queue.put_nowait(job)
+
+    def track(self, session_id: str, user_id: str):
+        self._active[session_id] = user_id
+
+    def untrack(self, session_id: str):
+        self._active.pop(session_id, None)
+
+    async def _checkpoints(self):
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            for session_id, user_id in list(self._active.items()):
+                self.enqueue(session_id, user_id, final=False)
+
+    # ---- consumer -----------------------------------------------------
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            for job in batch:
+                self._pending.pop(job.session_id, None)
+            try:
+                await self._process(batch)
+            except Exception as e:
+                self._retry(batch, e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _process(self, batch: list[ExtractionJob]):
+        loaded = await asyncio.to_thread(self._load, batch)
+        if not loaded:
+            return
+
+        wait = self._last_call + self.min_interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._last_call = time.monotonic()
+        self._stats["llm_calls"] += 1
+
+        conversations = {f"S{i}": format_conversation(messages) for i, (_, messages, _) in enumerate(loaded)}
+        facts_by_label = await asyncio.to_thread(extract_facts_batch, conversations)
+
+        for i, (job, messages, has_more) in enumerate(loaded):
+            facts = facts_by_label.get(f"S{i}", [])
+            outcomes = await asyncio.to_thread(commit_facts, job.user_id, job.session_id, facts, messages[-1]["id"])
+            self._stats["sessions_mined"] += 1
+            self._stats["facts_stored"] += outcomes["inserted"]
+            self._stats["facts_merged"] += outcomes["updated"]
+            self._stats["facts_duplicate"] += outcomes["duplicate"]
+            if outcomes["inserted"] or outcomes["updated"]:
+                logger.info("Stored %d new memory facts for user %s (%d updated, %d already known)",
+                            outcomes["inserted"], job.user_id, outcomes["updated"], outcomes["duplicate"])
+            if has_more:
+                # Capped by max_chars: the rest of a long session goes next.
+                self.enqueue(job.session_id, job.user_id, job.final)
+
+    def _load(self, batch: list[ExtractionJob]) -> list[tuple[ExtractionJob, list[dict], bool]]:
+        loaded = []
+        for job in batch:
+            messages, has_more = load_pending_messages(job.session_id, self.max_chars)
+            if not messages or (not job.final and len(messages) < self.checkpoint_min_messages):
+                continue
+            loaded.append((job, messages, has_more))
+        return loaded
+
+    def _retry(self, batch: list[ExtractionJob], error: Exception):
+        logger.warning("Memory extraction batch of %d sessions failed: %s", len(batch), error)
+        for job in batch:
+            if job.attempt >= self.max_retries:
+                self._stats["failed_jobs"] += 1
+                logger.warning("Memory extraction for session %s failed after %d attempts: %s",
+                               job.session_id, job.attempt + 1, error)
+                continue
+            self._stats["retries"] += 1
+            job.attempt += 1
+            delay = min(60.0, 2 ** job.attempt)
+            asyncio.get_running_loop().call_later(delay, self._requeue, job)
+
+    def _requeue(self, job: ExtractionJob):
+        if job.session_id in self._pending:
+            return
+        self._pending[job.session_id] = job
+        self._queue.put_nowait(job)
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "active_sessions": len(self._active),
+        }
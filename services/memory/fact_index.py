@@ -0,0 +1,169 @@
+"""
+Relevance-ranked retrieval over a user's long-term memory facts.
+
+build_system_instruction used to paste the MEMORY_FACT_LIMIT most recent
+facts into every prompt: older but relevant facts fell off the end, and
+irrelevant ones cost tokens on every turn. Now each fact's embedding is
+stored next to it (``memories.embedding``, float32 bytes), and each user's
+facts are held in a small in-process numpy matrix. A turn embeds the
+current utterance once and takes the best-scoring facts that fit in
+MEMORY_TOKEN_BUDGET, so prompt size stays flat as memory grows.
+
+- Users with at most MEMORY_TOP_K facts skip the embedding call entirely:
+  all their facts fit anyway.
+- Rows written before embeddings existed (or whose embedding call failed)
+  are embedded and backfilled the first time the user's index is loaded.
+- Indexes are cached for up to MEMORY_INDEX_MAX_USERS users and dropped
+  whenever that user's facts change (``invalidate``).
+
+Everything here is blocking (SQLite + embedding calls); async callers go
+through asyncio.to_thread.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import config
+from services.db import get_conn
+from services.rag.vector_store import embed_text
+from utils.logger import logger
+from utils.tokens import estimate_tokens
+
+
+class _UserIndex:
+    def __init__(self, rows: list[dict], matrix: np.ndarray):
+        self.rows = rows            # newest first, aligned with matrix rows
+        self.matrix = matrix        # (n, dims) float32, L2-normalized
+
+
+_cache: OrderedDict[str, _UserIndex] = OrderedDict()
+_lock = threading.Lock()
+# Bumped by every invalidate: an index built from a read that raced one is
+# returned to its caller but not cached.
+_generation = 0
+
+
+def to_blob(embedding) -> bytes:
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def embed_facts(facts: list[str]) -> list[bytes | None]:
+    """Embeds facts for storage; a failed embedding is stored as NULL and
+    backfilled later instead of failing the write."""
+    blobs = []
+    for fact in facts:
+        try:
+            blobs.append(to_blob(embed_text(fact)))
+        except Exception as e:
+            logger.warning("Fact embedding failed, will backfill later: %s", e)
+            blobs.append(None)
+    return blobs
+
+
+def invalidate(user_id: str):
+    global _generation
+    with _lock:
+        _generation += 1
+        _cache.pop(user_id, None)
+
+
+def _load(user_id: str) -> _UserIndex:
+    with _lock:
+        index = _cache.get(user_id)
+        if index is not None:
+            _cache.move_to_end(user_id)
+            return index
+        generation = _generation
+
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT id, fact, category, created_at, embedding FROM memories WHERE user_id = ? ORDER BY created_at DESC, id DESC",
+            (user_id,)
+        ).fetchall()
+
+    missing = [r for r in rows if r["embedding"] is None]
+    backfilled = {}
+    for r in missing:
+        try:
+            backfilled[r["id"]] = to_blob(embed_text(r["fact"]))
+        except Exception as e:
+            logger.warning("Could not backfill embedding for fact %s: %s", r["id"], e)
+    if backfilled:
+        with get_conn() as conn:
+            conn.executemany("UPDATE memories SET embedding = ? WHERE id = ?",
+                             [(blob, fact_id) for fact_id, blob in backfilled.items()])
+
+    kept, vectors, dims = [], [], None
+    for r in rows:
+        blob = r["embedding"] if r["embedding"] is not None else backfilled.get(r["id"])
+        # Skip rows embedded with a different model/dimensionality.
+        if blob is None or (dims is not None and len(blob) != dims):
+            continue
+        dims = len(blob)
+        kept.append({"id": r["id"], "fact": r["fact"], "category": r["category"], "created_at": r["created_at"]})
+        vectors.append(np.frombuffer(blob, dtype=np.float32))
+    matrix = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+    index = _UserIndex(kept, matrix)
+
+    with _lock:
+        if generation != _generation:
+            return index
+        _cache[user_id] = index
+        _cache.move_to_end(user_id)
+        while len(_cache) > config.MEMORY_INDEX_MAX_USERS:
+            _cache.popitem(last=False)
+    return index
+
+
+def _within_budget(rows: list[dict], token_budget: int) -> list[dict]:
+    picked, used = [], 0
+    for r in rows:
+        cost = estimate_tokens(r["fact"]) + 2
+        if used + cost > token_budget:
+            continue
+        picked.append(r)
+        used += cost
+    return picked
+
+
+def recent_facts(user_id: str, limit: int, token_budget: int) -> list[dict]:
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT id, fact, category, created_at FROM memories WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+            (user_id, limit)
+        ).fetchall()
+    return _within_budget([dict(r) for r in rows], token_budget)
+
+
+def relevant_facts(user_id: str, query: str | None, top_k: int | None = None,
+                   token_budget: int | None = None) -> list[dict]:
+    """The ``top_k`` facts most relevant to ``query`` that fit in
+    ``token_budget`` tokens, best first. Without a query (e.g. at connect
+    time, before anything was said) falls back to the most recent facts."""
+    top_k = top_k or config.MEMORY_TOP_K
+    token_budget = token_budget or config.MEMORY_TOKEN_BUDGET
+
+    with get_conn() as conn:
+        count = conn.execute("SELECT COUNT(*) FROM memories WHERE user_id = ?", (user_id,)).fetchone()[0]
+    if count == 0:
+        return []
+    if count <= top_k or not (query and query.strip()):
+        return recent_facts(user_id, top_k, token_budget)
+
+    index = _load(user_id)
+    if not index.rows:
+        return recent_facts(user_id, top_k, token_budget)
+    try:
+        q = np.asarray(embed_text(query), dtype=np.float32)
+    except Exception as e:
+        logger.warning("Query embedding failed, using recent facts: %s", e)
+        return recent_facts(user_id, top_k, token_budget)
+    if q.shape[0] != index.matrix.shape[1]:
+        return recent_facts(user_id, top_k, token_budget)
+
+    scores = index.matrix @ q
+    k = min(top_k, len(scores))
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.argsort(-scores[best])]
+    return _within_budget([index.rows[i] for i in best], token_budget)
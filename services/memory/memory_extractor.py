@@ -5,12 +5,10 @@ stores anything new. This is what makes memory persist *across* sessions
 instead of just within one chat's history.
 """
 import json
-from google import genai
 import config
+from services.genai_client import get_client
 from services.db import get_conn
-from services.session_store import get_full_history
-from services.memory.memory_store import add_fact
-from utils.logger import logger
+from services.memory import dedup, fact_index
 
 _EXTRACTION_PROMPT = """Extract durable facts about the user from this conversation snippet.
 Only include facts that would still be useful to remember in a future, unrelated conversation
@@ -23,66 +21,106 @@ Conversation:
 {conversation}
 """
 
+_BATCH_EXTRACTION_PROMPT = """Extract durable facts about the user from each of the conversation snippets below.
+Each snippet is a different conversation (possibly a different user), headed by its label; never mix facts between snippets.
+Only include facts that would still be useful to remember in a future, unrelated conversation
+(e.g. stated preferences, personal details, stock/crypto holdings mentioned, location, recurring interests).
+Do NOT include one-off questions or small talk.
 
-def extract_facts_from_text(conversation_text: str) -> list[str]:
-    if not conversation_text.strip():
-        return []
-    try:
-        client = genai.Client()
-        response = client.models.generate_content(
-            model=config.CHAT_MODEL,
-            contents=_EXTRACTION_PROMPT.format(conversation=conversation_text),
-        )
-        raw = response.text.strip()
-        if raw.startswith("```"):
-            raw = raw.strip("`")
-            raw = raw[4:] if raw.lower().startswith("json") else raw
-        facts = json.loads(raw)
-        return [f.strip() for f in facts if isinstance(f, str) and f.strip()]
-    except Exception as e:
-        logger.warning(f"Memory extraction failed (non-fatal): {e}")
+Return ONLY a JSON object mapping every label to a JSON array of short strings, nothing else.
+Use an empty array for snippets with nothing worth remembering.
+
+{conversations}
+"""
+
+
+def _parse_json_reply(raw: str):
+    raw = raw.strip()
+    if raw.startswith("```"):
+        raw = raw.strip("`")
+        raw = raw[4:] if raw.lower().startswith("json") else raw
+    return json.loads(raw)
+
+
+def _clean(facts) -> list[str]:
+    if not isinstance(facts, list):
         return []
+    return [f.strip() for f in facts if isinstance(f, str) and f.strip()]
+
+
+def extract_facts_batch(conversations: dict[str, str]) -> dict[str, list[str]]:
+    """
+    One LLM call for several sessions' snippets, keyed by an opaque label.
+    Raises on failure, so the caller (the background worker) can retry
+    without advancing any cursor.
+    """
+    if len(conversations) == 1:
+        (label, text), = conversations.items()
+        contents = _EXTRACTION_PROMPT.format(conversation=text)
+    else:
+        contents = _BATCH_EXTRACTION_PROMPT.format(conversations="\n\n".join(
+            f"### {label}\n{text}" for label, text in conversations.items()
+        ))
 
+    client = get_client()
+    response = client.models.generate_content(model=config.CHAT_MODEL, contents=contents)
+    parsed = _parse_json_reply(response.text or "")
 
-def _get_last_extracted_id(session_id: str) -> int:
+    if isinstance(parsed, dict):
+        return {label: _clean(parsed.get(label)) for label in conversations}
+    if isinstance(parsed, list) and (len(conversations) == 1 or not parsed):
+        # Single-snippet prompt, or the model collapsing "nothing anywhere" to [].
+        return {label: _clean(parsed) for label in conversations}
+    raise ValueError(f"Unexpected extraction reply shape: {type(parsed).__name__}")
+
+
+def load_pending_messages(session_id: str, max_chars: int | None = None) -> tuple[list[dict], bool]:
+    """Messages after this session's extraction cursor, oldest first, capped
+    at roughly ``max_chars`` of conversation (always at least one message).
+    The flag is True when the cap left newer messages out."""
     with get_conn() as conn:
-        row = conn.execute(
-            "SELECT last_message_id FROM memory_extraction_log WHERE session_id = ?",
-            (session_id,)
-        ).fetchone()
-    return row["last_message_id"] if row else 0
+        rows = conn.execute(
+            """SELECT id, role, content FROM messages
+               WHERE session_id = ? AND id > COALESCE(
+                 (SELECT last_message_id FROM memory_extraction_log WHERE session_id = ?), 0)
+               ORDER BY id ASC""",
+            (session_id, session_id)
+        ).fetchall()
+
+    messages, total = [], 0
+    for r in rows:
+        total += len(r["content"])
+        if messages and max_chars and total > max_chars:
+            break
+        messages.append({"id": r["id"], "role": r["role"], "content": r["content"]})
+    return messages, len(messages) < len(rows)
+
 
+def format_conversation(messages: list[dict]) -> str:
+    return "\n".join(f"{m['role']}: {m['content']}" for m in messages)
 
-def _set_last_extracted_id(session_id: str, message_id: int):
+
+def commit_facts(user_id: str, session_id: str, facts: list[str], last_message_id: int) -> dict[str, int]:
+    """Stores the facts (with their embeddings, deduplicated against what the
+    user already has) and advances the session's cursor in one transaction,
+    so a crash can never skip turns that weren't mined. Returns counts per
+    dedup.store_fact outcome."""
+    with get_conn() as conn:
+        new_facts = [f for f in facts if not dedup.is_known(conn, user_id, f)]
+    embeddings = fact_index.embed_facts(new_facts)
+    outcomes = {"inserted": 0, "updated": 0, "duplicate": len(facts) - len(new_facts)}
     with get_conn() as conn:
+        for fact, embedding in zip(new_facts, embeddings):
+            outcomes[dedup.store_fact(conn, user_id, fact, embedding)] += 1
         conn.execute(
             """INSERT INTO memory_extraction_log (session_id, last_message_id)
                VALUES (?, ?)
                ON CONFLICT(session_id) DO UPDATE SET
                  last_message_id = excluded.last_message_id,
                  updated_at = CURRENT_TIMESTAMP""",
-            (session_id, message_id)
+            (session_id, last_message_id)
         )
+    if outcomes["inserted"] or outcomes["updated"]:
+        fact_index.invalidate(user_id)
+    return outcomes
 
-
-def extract_and_store_new_facts(session_id: str, user_id: str) -> list[str]:
-    """
-    Call this when a session ends (or periodically). Only mines messages
-    that haven't already been processed for this session, so restarting a
-    session or calling this multiple times doesn't create duplicate facts.
-    """
-    history = get_full_history(session_id)
-    last_id = _get_last_extracted_id(session_id)
-    new_messages = [m for m in history if m["id"] > last_id]
-
-    if not new_messages:
-        return []
-
-    conversation_text = "\n".join(f"{m['role']}: {m['content']}" for m in new_messages)
-    facts = extract_facts_from_text(conversation_text)
-
-    for fact in facts:
-        add_fact(user_id, fact)
-
-    _set_last_extracted_id(session_id, new_messages[-1]["id"])
-    return facts
@@ -4,22 +4,30 @@ keyed by user_id (stable across sessions -- see static/js/app.js for how
 the frontend generates/persists a user_id separately from session_id).
 """
 from services.db import get_conn
+from services.memory import dedup, fact_index
 from config import MEMORY_FACT_LIMIT
 
 
-def add_fact(user_id: str, fact: str, category: str = "general"):
+def add_fact(user_id: str, fact: str, category: str = "general") -> str:
+    """Stores a fact unless the user already has it; a restated or updated
+    version of an existing fact replaces it in place (see dedup.py).
+    Returns "inserted", "updated" or "duplicate"."""
     with get_conn() as conn:
-        conn.execute(
-            "INSERT INTO memories (user_id, fact, category) VALUES (?, ?, ?)",
-            (user_id, fact, category)
-        )
+        if dedup.is_known(conn, user_id, fact):
+            return "duplicate"
+    (embedding,) = fact_index.embed_facts([fact])
+    with get_conn() as conn:
+        outcome = dedup.store_fact(conn, user_id, fact, embedding, category)
+    if outcome != "duplicate":
+        fact_index.invalidate(user_id)
+    return outcome
 
 
 def get_facts(user_id: str, limit: int = MEMORY_FACT_LIMIT) -> list[dict]:
     with get_conn() as conn:
         rows = conn.execute(
             """SELECT id, fact, category, created_at FROM memories
-               WHERE user_id = ? ORDER BY id DESC LIMIT ?""",
+               WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT ?""",
             (user_id, limit)
         ).fetchall()
     return [dict(r) for r in rows]
@@ -31,9 +39,11 @@ def delete_fact(user_id: str, fact_id: int) -> bool:
             "DELETE FROM memories WHERE id = ? AND user_id = ?",
             (fact_id, user_id)
         )
+    fact_index.invalidate(user_id)
     return cur.rowcount > 0
 
 
 def clear_facts(user_id: str):
     with get_conn() as conn:
         conn.execute("DELETE FROM memories WHERE user_id = ?", (user_id,))
+    fact_index.invalidate(user_id)
@@ -1,17 +1,22 @@
 import json
 import asyncio
 import websockets
+from services import session_recorder
 from utils.logger import logger
 
+VOICE_ID = "en-IN-aarav"
 
-async def stream_murf_tts(text: str, websocket, murf_ws_url: str, murf_api_key: str, context_id: str):
+
+async def stream_murf_tts(text: str, websocket, murf_ws_url: str, murf_api_key: str, context_id: str,
+                          voice_id: str = VOICE_ID):
+    capture = session_recorder.capture("murf", {"text": text})
     try:
         async with websockets.connect(
             f"{murf_ws_url}?api-key={murf_api_key}&sample_rate=44100&channel_type=MONO&format=WAV"
         ) as murf_ws:
             await murf_ws.send(json.dumps({
                 "voice_config": {
-                    "voiceId": "en-IN-aarav",
+                    "voiceId": voice_id,
                     "style": "Conversational",
                     "rate": 0, "pitch": 0, "variation": 1,
                 },
@@ -26,6 +31,7 @@ async def stream_murf_tts(text: str, websocket, murf_ws_url: str, murf_api_key:
             while True:
                 try:
                     resp = await asyncio.wait_for(murf_ws.recv(), timeout=100.0)
+                    capture.add(resp)
                     data = json.loads(resp)
                     if "audio" in data:
                         chunk_no += 1
@@ -49,3 +55,5 @@ async def stream_murf_tts(text: str, websocket, murf_ws_url: str, murf_api_key:
     except Exception as e:
         logger.error(f"Murf streaming error: {e}", exc_info=True)
         await websocket.send_json({"status": "error", "message": "Audio generation failed"})
+    finally:
+        capture.close()
@@ -7,12 +7,12 @@ Single source of truth for:
    the WebSocket streaming path and the plain HTTP chat path share one
    implementation instead of two divergent ones.
 """
-import json
-from google import genai
+import asyncio
 from google.genai import types
 import config
 from services.skills import tools, handle_financial_function_call
-from services.memory.memory_store import get_facts
+from services.memory.fact_index import relevant_facts
+from services import session_recorder
 from utils.logger import logger
 
 BASE_SYSTEM_PROMPT = """You are a helpful, concise voice assistant.
@@ -23,63 +23,121 @@ You can help with general conversation, and you have live tools available for:
 
 Use those tools whenever a question calls for current data instead of guessing.
 Keep spoken responses natural and reasonably short, since they will be converted to speech.
+Answer in plain sentences: no markdown, bullet lists, tables or emoji. Round figures the way
+a person would say them, and mention only the numbers that answer the question.
 """
 
 
-def build_system_instruction(user_id: str | None = None) -> str:
-    """Base persona + any long-term facts we've learned about this user."""
-    if not user_id:
-        return BASE_SYSTEM_PROMPT
+def build_system_instruction(user_id: str | None = None, query: str | None = None,
+                             summary: str | None = None) -> str:
+    """Base persona + the long-term facts we've learned about this user that
+    are most relevant to ``query`` (the current utterance), within
+    MEMORY_TOKEN_BUDGET, + the rolling summary of this conversation's older
+    turns (services/compaction.py), if any. Blocking: may embed the query."""
+    sections = [BASE_SYSTEM_PROMPT]
 
-    facts = get_facts(user_id)
-    if not facts:
-        return BASE_SYSTEM_PROMPT
+    facts = relevant_facts(user_id, query) if user_id else []
+    if facts:
+        facts_block = "\n".join(f"- {f['fact']}" for f in facts)
+        sections.append(
+            f"What you remember about this user from earlier sessions:\n{facts_block}\n"
+            f"Use these naturally if relevant. Don't force them into every reply."
+        )
 
-    facts_block = "\n".join(f"- {f['fact']}" for f in facts)
-    return (
-        f"{BASE_SYSTEM_PROMPT}\n"
-        f"What you remember about this user from earlier sessions:\n{facts_block}\n"
-        f"Use these naturally if relevant. Don't force them into every reply."
-    )
+    if summary:
+        sections.append(f"Summary of the earlier part of this conversation:\n{summary}")
+    return "\n".join(sections)
 
 
-async def run_tool_calling_turn(client: genai.Client, conversation_text: str, user_id: str | None = None) -> str:
+def to_contents(messages: list[dict]) -> list[types.Content]:
+    """Stored messages -> chat history: roles mapped to Gemini's, consecutive
+    same-role messages merged, and starting on a user turn."""
+    contents = []
+    for m in messages:
+        role = "model" if m["role"] == "assistant" else "user"
+        if not contents and role == "model":
+            continue
+        if contents and contents[-1].role == role:
+            contents[-1].parts.append(types.Part(text=m["content"]))
+        else:
+            contents.append(types.Content(role=role, parts=[types.Part(text=m["content"])]))
+    return contents
+
+
+def _collect(chat, message, turn_config, capture, emit=None) -> tuple[str, list[types.FunctionCall]]:
+    """Drains one streamed model response (blocking -- runs in a worker
+    thread). Returns its text and any function calls; ``emit``, if given,
+    also gets each text piece as it arrives."""
+    text, calls = "", []
+    for chunk in chat.send_message_stream(message, config=turn_config):
+        if capture:
+            capture.add(chunk.model_dump(mode="json", by_alias=True, exclude_none=True))
+        # Walk the parts directly: chunk.text warns on function_call parts.
+        if chunk.candidates and chunk.candidates[0].content and chunk.candidates[0].content.parts:
+            for part in chunk.candidates[0].content.parts:
+                if part.function_call:
+                    calls.append(part.function_call)
+                elif part.text and not part.thought:
+                    text += part.text
+                    if emit:
+                        emit(part.text)
+    return text, calls
+
+
+def _function_response(call: types.FunctionCall, result) -> types.Part:
+    response = result if isinstance(result, dict) else {"result": result}
+    return types.Part(function_response=types.FunctionResponse(id=call.id, name=call.name, response=response))
+
+
+async def run_chat_turn(chat, message: str, turn_config: types.GenerateContentConfig,
+                        on_text=None, on_tool_calls=None) -> str:
     """
-    One-shot (non-streaming-chat-object) turn: send conversation, execute any
-    function calls Gemini requests, then get the final grounded response.
-    Used by the plain HTTP /agent/chat route.
+    The function-calling loop both chat paths share. Sends ``message`` on
+    ``chat``; while the model asks for tools, runs every call of a round
+    concurrently and sends the results back into the same conversation as
+    function_response parts. After MAX_TOOL_ROUNDS rounds, tools are
+    switched off for the last request so the model has to answer.
+    Returns the final text. ``on_text``, if given, is called on the event
+    loop with the final answer's text: a round that may still call tools
+    can open with text ("let me check...") that isn't part of the answer,
+    so such a round's text is passed on once it ends without calls; only
+    the last round, with tools off, streams piece by piece. ``on_tool_calls``
+    is called with the tool names of each round, before they run.
     """
-    response = client.models.generate_content(
-        model=config.CHAT_MODEL,
-        contents=conversation_text,
-        config=types.GenerateContentConfig(
-            system_instruction=build_system_instruction(user_id),
-            tools=[tools],
-        ),
-    )
-
-    function_calls = []
-    for candidate in response.candidates:
-        for part in candidate.content.parts:
-            if part.function_call:
-                function_calls.append({"name": part.function_call.name, "arguments": dict(part.function_call.args)})
-
-    if not function_calls:
-        return response.text or ""
-
-    results = []
-    for fc in function_calls:
-        result = await handle_financial_function_call(fc["name"], fc["arguments"])
-        results.append({"function_name": fc["name"], "result": result})
-
-    tool_context = "Tool results:\n" + "\n".join(
-        f"- {r['function_name']}: {json.dumps(r['result']) if not isinstance(r['result'], str) else r['result']}"
-        for r in results
-    )
-
-    final_response = client.models.generate_content(
-        model=config.CHAT_MODEL,
-        contents=f"{conversation_text}\n\n{tool_context}",
-        config=types.GenerateContentConfig(system_instruction=build_system_instruction(user_id)),
-    )
-    return final_response.text or ""
+    emit = None
+    if on_text:
+        loop = asyncio.get_running_loop()
+        emit = lambda piece: loop.call_soon_threadsafe(on_text, piece)
+
+    final_round_config = turn_config.model_copy(update={
+        "tool_config": types.ToolConfig(
+            function_calling_config=types.FunctionCallingConfig(mode=types.FunctionCallingConfigMode.NONE)
+        )
+    })
+
+    pending = message
+    for round_no in range(config.MAX_TOOL_ROUNDS + 1):
+        last_round = round_no == config.MAX_TOOL_ROUNDS
+        round_config = final_round_config if last_round else turn_config
+        capture = session_recorder.capture("gemini")
+        try:
+            text, calls = await asyncio.to_thread(_collect, chat, pending, round_config, capture,
+                                                  emit if last_round else None)
+        finally:
+            capture.close()
+        if not calls:
+            if on_text and not last_round and text:
+                on_text(text)
+            return text
+
+        if on_tool_calls:
+            on_tool_calls([call.name for call in calls])
+        args = [dict(call.args or {}) for call in calls]
+        results = await asyncio.gather(
+            *(handle_financial_function_call(call.name, a) for call, a in zip(calls, args))
+        )
+        for call, a, result in zip(calls, args, results):
+            session_recorder.record("tool", {"name": call.name, "args": a, "result": result})
+        logger.info("Tool round %d: %s", round_no + 1, ", ".join(call.name for call in calls))
+        pending = [_function_response(call, result) for call, result in zip(calls, results)]
+    return text
@@ -0,0 +1,102 @@
+"""
+Speculative tool prefetch: start the market/weather lookups a transcript
+obviously needs while Gemini is still deciding to ask for them.
+
+"What's Tesla trading at?" will almost always become a get_stock_price
+call, but only after the first model round (~1 s) -- and then the quote
+request runs on the critical path. ``start`` runs services/entities.py on
+the final transcript and fires those lookups in the background through the
+regular skill functions, which fill the shared cache in services/skills.py.
+When the tool call arrives it is a cache hit, or joins the request still
+in flight.
+
+Each turn is scored in ``finish`` by comparing the cache keys the prefetch
+touched with the ones the turn's tool calls looked up (both recorded via
+skills.cache_lookups):
+
+- hits: tool lookups that were prefetched;
+- misses: tool lookups that weren't;
+- wasted: prefetched keys no tool call used.
+
+Totals are reported by ``stats()`` (/admin/stats).
+"""
+import asyncio
+import contextvars
+import threading
+
+import config
+from services import entities, skills
+from utils.logger import turn_logger
+
+MAX_PREFETCHES_PER_TURN = 5
+
+_lock = threading.Lock()
+_stats = {"turns": 0, "turns_prefetched": 0, "prefetched": 0, "hits": 0, "misses": 0, "wasted": 0}
+
+
+def _lookups(found: entities.Entities) -> list:
+    controller = skills.get_financial_controller()
+    calls = [lambda s=s: controller.get_stock_quote(s) for s in found.stocks]
+    calls += [lambda s=s: controller.get_crypto_quote(s) for s in found.cryptos]
+    weather = skills.get_weather_forecast if found.forecast else skills.get_weather_info
+    calls += [lambda c=c: weather(c) for c in found.cities]
+    return calls[:MAX_PREFETCHES_PER_TURN]
+
+
+class TurnPrefetch:
+    """One turn's prefetch. Create it (via ``start``) in the task that will
+    run the turn's tool calls, and call ``finish`` when the turn is done."""
+
+    def __init__(self, text: str):
+        self.prefetched: set[str] = set()
+        self.used: set[str] = set()
+        self._tasks: list[asyncio.Task] = []
+        skills.cache_lookups.set(self.used)
+
+        found = entities.extract(text) if config.TOOL_PREFETCH_ENABLED else None
+        if not found:
+            return
+        # Prefetches record into their own set, not the turn's.
+        context = contextvars.copy_context()
+        context.run(skills.cache_lookups.set, self.prefetched)
+        loop = asyncio.get_running_loop()
+        for lookup in _lookups(found):
+            self._tasks.append(loop.create_task(self._run(lookup), context=context))
+
+    @staticmethod
+    async def _run(lookup):
+        try:
+            await lookup()
+        except Exception as e:
+            turn_logger.debug("Prefetch failed: %s", e)
+
+    def finish(self):
+        skills.cache_lookups.set(None)
+        # A prefetch the turn never used may still be running; let it finish
+        # and fill the cache for the next turn rather than cancel it.
+        hits = len(self.used & self.prefetched)
+        misses = len(self.used - self.prefetched)
+        wasted = len(self.prefetched - self.used)
+        with _lock:
+            _stats["turns"] += 1
+            _stats["turns_prefetched"] += bool(self._tasks)
+            _stats["prefetched"] += len(self.prefetched)
+            _stats["hits"] += hits
+            _stats["misses"] += misses
+            _stats["wasted"] += wasted
+        if self._tasks:
+            turn_logger.info("Tool prefetch: %d hit, %d missed, %d wasted", hits, misses, wasted)
+
+
+def start(text: str) -> TurnPrefetch:
+    return TurnPrefetch(text)
+
+
+def stats() -> dict:
+    with _lock:
+        s = dict(_stats)
+    lookups = s["hits"] + s["misses"]
+    s["hit_rate"] = round(s["hits"] / lookups, 3) if lookups else None
+    s["waste_rate"] = round(s["wasted"] / s["prefetched"], 3) if s["prefetched"] else None
+    s["enabled"] = config.TOOL_PREFETCH_ENABLED
+    return s
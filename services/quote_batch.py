@@ -0,0 +1,90 @@
+"""
+Windowed batching of quote lookups (services/skills.py).
+
+A portfolio question, a "compare AAPL, MSFT and NVDA" tool call, the
+prefetcher (services/prefetch.py) and other sessions asking at the same
+moment each used to send their own request per symbol. A ``QuoteBatcher``
+holds every symbol asked for within QUOTE_BATCH_WINDOW_MS (or until
+QUOTE_BATCH_MAX_SYMBOLS are waiting), then hands the distinct symbols to
+one ``fetch_many`` call and gives each caller its own symbol's result. A
+symbol asked for twice in a window is fetched once.
+
+The window only pays off for a backend with a real multi-symbol request:
+elsewhere waiting saves no upstream requests and just delays every lookup.
+Such a batcher has no window (``batcher(..., multi_symbol=False)``): it
+only groups the symbols asked for in the same event-loop pass, e.g. one
+tool call's gather, and flushes right after.
+
+``fetch_many(symbols)`` returns {symbol: result}; a symbol missing from it
+(or a failed batch) resolves to None. Callers still keep their own cache
+and single-flight in front of this -- the batcher only sees misses.
+
+Counters are reported by ``stats()`` (/admin/stats).
+"""
+import asyncio
+
+import config
+from utils.logger import logger
+
+
+class QuoteBatcher:
+    def __init__(self, name: str, fetch_many, window_s: float, max_symbols: int):
+        self.name = name
+        self.fetch_many = fetch_many
+        self.window_s = window_s
+        self.max_symbols = max_symbols
+        self._loop = None
+        self._pending: dict[str, asyncio.Future] = {}
+        self._timer: asyncio.Handle | None = None
+        self._stats = {"requests": 0, "coalesced": 0, "batches": 0, "symbols_fetched": 0, "failed_batches": 0}
+
+    async def get(self, symbol: str):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop, self._pending, self._timer = loop, {}, None
+        self._stats["requests"] += 1
+        future = self._pending.get(symbol)
+        if future is None:
+            future = self._pending[symbol] = loop.create_future()
+            if len(self._pending) >= self.max_symbols:
+                self._flush()
+            elif self._timer is None:
+                self._timer = (loop.call_later(self.window_s, self._flush) if self.window_s > 0
+                               else loop.call_soon(self._flush))
+        else:
+            self._stats["coalesced"] += 1
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: dict[str, asyncio.Future]):
+        self._stats["batches"] += 1
+        self._stats["symbols_fetched"] += len(batch)
+        try:
+            results = await self.fetch_many(list(batch))
+        except Exception as e:
+            logger.error("%s batch of %d failed: %s", self.name, len(batch), e)
+            self._stats["failed_batches"] += 1
+            results = {}
+        for symbol, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(symbol))
+
+    def stats(self) -> dict:
+        s = dict(self._stats)
+        s["symbols_per_batch"] = round(s["symbols_fetched"] / s["batches"], 2) if s["batches"] else None
+        s["window_ms"] = self.window_s * 1000
+        return s
+
+
+def batcher(name: str, fetch_many, multi_symbol: bool = True) -> QuoteBatcher:
+    """``multi_symbol``: ``fetch_many`` sends one upstream request for all
+    its symbols, so waiting QUOTE_BATCH_WINDOW_MS for more is worth it."""
+    window_s = config.QUOTE_BATCH_WINDOW_MS / 1000 if multi_symbol else 0.0
+    return QuoteBatcher(name, fetch_many, window_s, config.QUOTE_BATCH_MAX_SYMBOLS)
@@ -0,0 +1,148 @@
+"""
+Answers to document questions, cached per session and matched by meaning.
+
+Users ask the same thing several ways ("what's the refund policy?", "how
+do refunds work?") and each one used to cost an embedding call, retrieval
+and a full generation. A session's answered questions are kept with their
+embedding, answer and sources; a new question is answered from the cache
+when it is, after normalizing case, spacing and trailing punctuation, the
+same text as a cached one (``lookup``, before retrieval), or when its
+embedding is at least RAG_ANSWER_CACHE_THRESHOLD cosine-similar to one
+(``match``, after retrieval). The cache never embeds anything itself: it
+reuses the embedding retrieval computed, so a question retrieval answers
+lexically (services/rag/vector_store.py) costs no embedding call, and
+only gets exact matches.
+
+Questions that differ only in a model number or a figure ("COP of the
+NW-412" vs "of the NW-416") embed almost identically, so a semantic match
+also needs the same tokens containing digits.
+
+- Per session: the answers are only valid for the documents the session
+  had when they were generated. services/rag/documents.py calls
+  ``invalidate`` whenever a session's document set changes (upload, new
+  version, delete), and an answer that was being generated while that
+  happened is not stored.
+- Bounded: RAG_ANSWER_CACHE_PER_SESSION questions per session and
+  RAG_ANSWER_CACHE_MAX_SESSIONS sessions, least recently used first out.
+
+Hit rates are reported by ``stats()`` (/admin/stats).
+"""
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import config
+
+_TRAILING = re.compile(r"[\s?!.]+$")
+_SPACES = re.compile(r"\s+")
+_TOKENS = re.compile(r"[\w./-]+")
+
+
+def _normalize(question: str) -> str:
+    return _TRAILING.sub("", _SPACES.sub(" ", question.strip().lower()))
+
+
+def _anchors(key: str) -> frozenset:
+    return frozenset(t for t in _TOKENS.findall(key) if any(ch.isdigit() for ch in t))
+
+
+class _Session:
+    def __init__(self):
+        # key -> (vector, anchors, result), least recently used first
+        self.entries: OrderedDict[str, tuple] = OrderedDict()
+
+    def nearest(self, vector: np.ndarray, anchors: frozenset, threshold: float) -> str | None:
+        keys = [k for k, (v, a, _) in self.entries.items() if v is not None and a == anchors]
+        if not keys:
+            return None
+        scores = np.stack([self.entries[k][0] for k in keys]) @ vector
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= threshold else None
+
+
+class AnswerCache:
+    def __init__(self, max_sessions: int, per_session: int, threshold: float):
+        self.max_sessions = max_sessions
+        self.per_session = per_session
+        self.threshold = threshold
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "exact_hits": 0, "semantic_hits": 0, "stored": 0,
+                       "stale_discarded": 0, "invalidated": 0, "evicted_answers": 0, "evicted_sessions": 0}
+
+    def _session(self, session_id: str) -> _Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._stats["evicted_sessions"] += 1
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def lookup(self, session_id: str, question: str) -> tuple[dict | None, object]:
+        """Returns (the result cached for this exact question or None, a
+        token for ``match`` and ``store``)."""
+        key = _normalize(question)
+        with self._lock:
+            self._stats["lookups"] += 1
+            session = self._session(session_id)
+            if key in session.entries:
+                session.entries.move_to_end(key)
+                self._stats["exact_hits"] += 1
+                return session.entries[key][2], session
+        return None, session
+
+    def match(self, session_id: str, token, question: str, vector: np.ndarray) -> dict | None:
+        """The result cached for a question similar to this one, given its
+        normalized embedding; None if there is none, or the session's cache
+        was invalidated since ``lookup`` returned ``token``."""
+        with self._lock:
+            if self._sessions.get(session_id) is not token:
+                return None
+            key = token.nearest(vector, _anchors(_normalize(question)), self.threshold)
+            if key is None:
+                return None
+            token.entries.move_to_end(key)
+            self._stats["semantic_hits"] += 1
+            return token.entries[key][2]
+
+    def store(self, session_id: str, token, question: str, vector: np.ndarray | None, result: dict):
+        """Caches ``result`` for the question, unless the session's cache was
+        invalidated (or evicted) since ``lookup`` returned ``token``. Without
+        a ``vector`` it only serves exact matches."""
+        key = _normalize(question)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not token:
+                self._stats["stale_discarded"] += 1
+                return
+            session.entries[key] = (vector, _anchors(key), result)
+            session.entries.move_to_end(key)
+            self._stats["stored"] += 1
+            while len(session.entries) > self.per_session:
+                session.entries.popitem(last=False)
+                self._stats["evicted_answers"] += 1
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            if self._sessions.pop(session_id, None) is not None:
+                self._stats["invalidated"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self._stats["exact_hits"] + self._stats["semantic_hits"]
+            return {
+                **self._stats,
+                "misses": self._stats["lookups"] - hits,
+                "hit_rate": round(hits / self._stats["lookups"], 3) if self._stats["lookups"] else None,
+                "sessions": len(self._sessions),
+                "answers": sum(len(s.entries) for s in self._sessions.values()),
+                "threshold": self.threshold,
+            }
+
+
+cache = AnswerCache(config.RAG_ANSWER_CACHE_MAX_SESSIONS, config.RAG_ANSWER_CACHE_PER_SESSION,
+                    config.RAG_ANSWER_CACHE_THRESHOLD)
@@ -0,0 +1,64 @@
+"""
+Pluggable storage for document chunk vectors, one namespace per session.
+
+services/rag/vector_store.py embeds text and hands vectors to whichever
+backend VECTOR_STORE_BACKEND names:
+
+- "chroma" (default): chromadb.PersistentClient under CHROMA_PATH
+  (services/rag/backends/chroma.py);
+- "numpy": per-session memory-mapped matrices under VECTOR_STORE_PATH
+  (services/rag/backends/numpy_memmap.py) -- no server, no SQLite, one
+  vectorized dot product per query, optionally on a truncated copy of the
+  vectors first (VECTOR_COARSE_DIMS) with a full-width rerank.
+
+Vectors arrive L2-normalized, so both rank by cosine similarity. All
+methods are blocking; async callers go through asyncio.to_thread.
+"""
+import numpy as np
+
+import config
+
+
+class VectorBackend:
+    """What vector_store needs from a backend. ``metadatas`` carry at least
+    doc_id, filename and page; ``query`` returns them merged with the chunk
+    ``text`` and its similarity ``score``, best first."""
+
+    name = ""
+
+    def add(self, session_id: str, ids: list[str], embeddings: np.ndarray, documents: list[str],
+            metadatas: list[dict]):
+        raise NotImplementedError
+
+    def query(self, session_id: str, embedding: np.ndarray, top_k: int) -> list[dict]:
+        raise NotImplementedError
+
+    def count(self, session_id: str) -> int:
+        raise NotImplementedError
+
+    def embeddings(self, session_id: str, doc_id: str) -> dict[str, np.ndarray]:
+        """The stored vector of each of a document's chunks, by chunk text."""
+        raise NotImplementedError
+
+    def delete_document(self, session_id: str, doc_id: str):
+        raise NotImplementedError
+
+    def drop(self, session_id: str):
+        raise NotImplementedError
+
+
+def safe_name(session_id: str) -> str:
+    # Session ids are UUIDs, so this is already safe, but sanitize defensively.
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in session_id)
+
+
+def create(name: str | None = None) -> VectorBackend:
+    name = (name or config.VECTOR_STORE_BACKEND).lower()
+    if name == "chroma":
+        from services.rag.backends.chroma import ChromaBackend
+        return ChromaBackend(config.CHROMA_PATH)
+    if name == "numpy":
+        from services.rag.backends.numpy_memmap import NumpyBackend
+        return NumpyBackend(config.VECTOR_STORE_PATH, config.VECTOR_STORE_DTYPE, config.VECTOR_COARSE_DIMS,
+                            config.VECTOR_COARSE_INT8, config.VECTOR_RERANK_CANDIDATES)
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {name!r} (expected 'chroma' or 'numpy')")
@@ -0,0 +1,81 @@
+"""
+Chroma backend: one collection per chat session.
+
+Collections are looked up once per session and kept, instead of calling
+get_or_create_collection on every operation, and a query counts the
+collection once.
+"""
+import threading
+
+import chromadb
+import numpy as np
+
+from services.rag.backends import VectorBackend, safe_name
+from utils.logger import logger
+
+
+def _collection_name(session_id: str) -> str:
+    return f"docs_{safe_name(session_id)}"
+
+
+class ChromaBackend(VectorBackend):
+    name = "chroma"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._client = None
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def client(self):
+        if self._client is None:
+            self._client = chromadb.PersistentClient(path=self.path)
+        return self._client
+
+    def collection(self, session_id: str):
+        with self._lock:
+            collection = self._collections.get(session_id)
+            if collection is None:
+                collection = self.client().get_or_create_collection(_collection_name(session_id))
+                self._collections[session_id] = collection
+            return collection
+
+    def add(self, session_id, ids, embeddings, documents, metadatas):
+        self.collection(session_id).add(
+            ids=ids, embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+            documents=documents, metadatas=metadatas,
+        )
+
+    def query(self, session_id, embedding, top_k):
+        collection = self.collection(session_id)
+        count = collection.count()
+        if count == 0:
+            return []
+        results = collection.query(query_embeddings=[np.asarray(embedding, dtype=np.float32).tolist()],
+                                   n_results=min(top_k, count))
+        # Default (squared L2) space over unit vectors: distance = 2 - 2 * cosine.
+        return [{**meta, "text": doc, "score": 1 - distance / 2}
+                for doc, meta, distance in zip(results["documents"][0], results["metadatas"][0],
+                                               results["distances"][0])]
+
+    def count(self, session_id):
+        return self.collection(session_id).count()
+
+    def embeddings(self, session_id, doc_id):
+        results = self.collection(session_id).get(where={"doc_id": doc_id}, include=["documents", "embeddings"])
+        return {doc: np.asarray(vector, dtype=np.float32)
+                for doc, vector in zip(results["documents"], results["embeddings"])}
+
+    def delete_document(self, session_id, doc_id):
+        try:
+            self.collection(session_id).delete(where={"doc_id": doc_id})
+        except Exception as e:
+            logger.warning("Failed to delete doc_id %s from Chroma: %s", doc_id, e)
+
+    def drop(self, session_id):
+        with self._lock:
+            self._collections.pop(session_id, None)
+        try:
+            self.client().delete_collection(_collection_name(session_id))
+        except Exception as e:
+            logger.warning("Failed to delete collection for session %s: %s", session_id, e)
@@ -0,0 +1,325 @@
+"""
+Embedded vector index: per-session memory-mapped matrices, no database.
+
+A session's documents are a few thousand 768-d vectors at most, so an
+exact search is one matrix-vector product -- cheaper than Chroma's own
+per-call overhead. Layout under VECTOR_STORE_PATH/<session>/:
+
+- ``seg_NNNNNN.npy``: an append-only segment of vectors, opened with
+  mmap_mode="r" so only the pages a query touches are resident. float32 by
+  default; VECTOR_STORE_DTYPE=float16 halves disk and page cache, but every
+  query then upcasts the segment (several times slower at a few thousand
+  rows -- see benchmarks/vector_store.py);
+- ``seg_NNNNNN.json``: the rows' ids, text and metadata, in matrix order;
+- ``manifest.json``: the live segments and their tombstoned rows.
+
+``add`` writes a new segment; ``delete_document`` only tombstones rows.
+Once tombstones make up over COMPACT_DELETED_FRACTION of the rows, or
+there are more than MAX_SEGMENTS segments, the live rows are rewritten
+into one segment. Every write lands in a temp file and is swapped in with
+os.replace, the manifest last, so a crash leaves the previous state.
+
+Query: scores = segment @ q per segment, tombstones masked to -inf, then
+np.argpartition for the top k.
+
+Two-stage search (VECTOR_COARSE_DIMS, e.g. 256): gemini-embedding-001 is a
+Matryoshka model -- its leading dimensions carry most of the signal -- so
+each segment also gets a truncated, renormalized copy of its vectors
+(``seg_NNNNNN.c256.npy``, or int8 with a per-row scale when
+VECTOR_COARSE_INT8 is set). Sessions with more than
+VECTOR_RERANK_CANDIDATES rows are scanned on that copy first, and only the
+best candidates are rescored with their full vectors, so a query reads a
+third (or, int8, a twelfth) of the bytes and the full matrix is paged in
+only for the candidates. benchmarks/two_stage.py reports recall@k against
+exact search.
+"""
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+from services.rag.backends import VectorBackend, safe_name
+
+MAX_SEGMENTS = 8
+COMPACT_DELETED_FRACTION = 0.3
+MAX_OPEN_SESSIONS = 64
+_BLOCK_ROWS = 1024   # upcast float16/int8 in cache-sized blocks
+
+
+def _write_atomic(path: str, write):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def _scores(matrix: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """matrix @ q in float32, without materializing a float32 copy of a
+    float16/int8 matrix all at once."""
+    if matrix.dtype == np.float32:
+        return matrix @ q
+    return np.concatenate([np.asarray(matrix[i:i + _BLOCK_ROWS], dtype=np.float32) @ q
+                           for i in range(0, len(matrix), _BLOCK_ROWS)] or [np.empty(0, np.float32)])
+
+
+def truncate(vectors: np.ndarray, dims: int) -> np.ndarray:
+    """Leading ``dims`` dimensions, renormalized to unit length."""
+    head = np.asarray(vectors[..., :dims], dtype=np.float32)
+    return head / np.maximum(np.linalg.norm(head, axis=-1, keepdims=True), 1e-12)
+
+
+def quantize(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8: vectors ~= codes * scale[:, None]."""
+    scale = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+    return np.rint(vectors / scale[:, None]).astype(np.int8), scale.astype(np.float32)
+
+
+class _Segment:
+    def __init__(self, name: str, matrix: np.ndarray, rows: list[dict], deleted: set[int]):
+        self.name = name
+        self.matrix = matrix
+        self.rows = rows
+        self.live = np.ones(len(rows), dtype=bool)
+        for i in deleted:
+            self.live[i] = False
+        self.coarse = None          # (n, coarse_dims) float32 or int8
+        self.coarse_scale = None    # (n,) float32, int8 only
+
+
+class _SessionIndex:
+    def __init__(self, directory: str, dtype: str, coarse_dims: int = 0, coarse_int8: bool = False,
+                 candidates: int = 64):
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self.coarse_dims = coarse_dims
+        self.coarse_int8 = coarse_int8
+        self.candidates = candidates
+        self.segments: list[_Segment] = []
+        self.next_seq = 1
+        self.lock = threading.Lock()
+        self._load()
+
+    # ---- persistence ----
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load(self):
+        manifest_path = self._path("manifest.json")
+        if not os.path.exists(manifest_path):
+            return
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        self.next_seq = manifest["next_seq"]
+        for entry in manifest["segments"]:
+            matrix = np.load(self._path(f"{entry['name']}.npy"), mmap_mode="r")
+            with open(self._path(f"{entry['name']}.json")) as f:
+                rows = json.load(f)
+            segment = _Segment(entry["name"], matrix, rows, set(entry["deleted"]))
+            self._attach_coarse(segment)
+            self.segments.append(segment)
+
+    def _coarse_name(self, segment_name: str) -> str:
+        return f"{segment_name}.c{self.coarse_dims}{'i8' if self.coarse_int8 else ''}"
+
+    def _attach_coarse(self, segment: _Segment):
+        """Opens the segment's coarse copy, building it first if this
+        segment predates it (or the coarse settings changed)."""
+        if not self.coarse_dims or self.coarse_dims >= segment.matrix.shape[1]:
+            return
+        name = self._coarse_name(segment.name)
+        if not os.path.exists(self._path(f"{name}.npy")):
+            coarse = truncate(segment.matrix, self.coarse_dims)
+            if self.coarse_int8:
+                coarse, scale = quantize(coarse)
+                _write_atomic(self._path(f"{name}.scale.npy"), lambda f: np.save(f, scale))
+            _write_atomic(self._path(f"{name}.npy"), lambda f: np.save(f, coarse))
+        segment.coarse = np.load(self._path(f"{name}.npy"), mmap_mode="r")
+        if self.coarse_int8:
+            segment.coarse_scale = np.load(self._path(f"{name}.scale.npy"))
+
+    def _write_segment(self, matrix: np.ndarray, rows: list[dict]) -> _Segment:
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"seg_{self.next_seq:06d}"
+        self.next_seq += 1
+        _write_atomic(self._path(f"{name}.npy"), lambda f: np.save(f, matrix.astype(self.dtype)))
+        _write_atomic(self._path(f"{name}.json"), lambda f: f.write(json.dumps(rows).encode()))
+        segment = _Segment(name, np.load(self._path(f"{name}.npy"), mmap_mode="r"), rows, set())
+        self._attach_coarse(segment)
+        return segment
+
+    def _write_manifest(self):
+        manifest = {"next_seq": self.next_seq, "dtype": self.dtype.name, "segments": [
+            {"name": s.name, "rows": len(s.rows), "deleted": np.flatnonzero(~s.live).tolist()}
+            for s in self.segments
+        ]}
+        _write_atomic(self._path("manifest.json"), lambda f: f.write(json.dumps(manifest).encode()))
+
+    # ---- operations (caller holds self.lock) ----
+    def add(self, matrix: np.ndarray, rows: list[dict]):
+        self.segments.append(self._write_segment(matrix, rows))
+        self._write_manifest()
+        self._maybe_compact()
+
+    def delete(self, doc_id: str) -> int:
+        removed = 0
+        for segment in self.segments:
+            for i, row in enumerate(segment.rows):
+                if segment.live[i] and row["doc_id"] == doc_id:
+                    segment.live[i] = False
+                    removed += 1
+        if removed:
+            self._write_manifest()
+            self._maybe_compact()
+        return removed
+
+    def count(self) -> int:
+        return int(sum(s.live.sum() for s in self.segments))
+
+    def embeddings(self, doc_id: str) -> dict[str, np.ndarray]:
+        return {row["text"]: np.asarray(segment.matrix[i], dtype=np.float32)
+                for segment in self.segments for i, row in enumerate(segment.rows)
+                if segment.live[i] and row["doc_id"] == doc_id}
+
+    def _maybe_compact(self):
+        total = sum(len(s.rows) for s in self.segments)
+        deleted = total - self.count()
+        if len(self.segments) > MAX_SEGMENTS or (total and deleted / total > COMPACT_DELETED_FRACTION):
+            self.compact()
+
+    def compact(self):
+        """Rewrites the live rows into a single segment and drops the rest."""
+        old = self.segments
+        live = [s for s in old if s.live.any()]
+        if live:
+            matrix = np.concatenate([np.asarray(s.matrix[s.live]) for s in live])
+            rows = [row for s in live for row, keep in zip(s.rows, s.live) if keep]
+            self.segments = [self._write_segment(matrix, rows)]
+        else:
+            self.segments = []
+        self._write_manifest()
+        for segment in old:
+            for filename in os.listdir(self.directory):
+                if filename.startswith(f"{segment.name}."):
+                    os.remove(self._path(filename))
+
+    def _scan(self, q: np.ndarray, coarse: bool) -> np.ndarray:
+        """Scores of every row (tombstones at -inf), segments concatenated."""
+        scores = []
+        for segment in self.segments:
+            if coarse:
+                s = _scores(segment.coarse, q)
+                if segment.coarse_scale is not None:
+                    s *= segment.coarse_scale
+            else:
+                s = _scores(segment.matrix, q)
+            s[~segment.live] = -np.inf
+            scores.append(s)
+        return np.concatenate(scores)
+
+    @staticmethod
+    def _best(scores: np.ndarray, k: int) -> np.ndarray:
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def search(self, q: np.ndarray, top_k: int) -> list[dict]:
+        k = min(top_k, self.count())
+        if k <= 0:
+            return []
+        offsets = np.cumsum([0] + [len(s.rows) for s in self.segments])
+        two_stage = (self.count() > max(self.candidates, k)
+                     and all(s.coarse is not None for s in self.segments))
+        if two_stage:
+            coarse = self._scan(truncate(q, self.coarse_dims), coarse=True)
+            candidates = np.sort(self._best(coarse, max(self.candidates, k)))
+            # Rescore just the candidates with their full vectors.
+            owner = np.searchsorted(offsets, candidates, side="right") - 1
+            exact = np.empty(len(candidates), dtype=np.float32)
+            for seg in np.unique(owner):
+                mask = owner == seg
+                rows = candidates[mask] - offsets[seg]
+                exact[mask] = np.asarray(self.segments[seg].matrix[rows], dtype=np.float32) @ q
+            picked = self._best(exact, k)
+            top, top_scores = candidates[picked], exact[picked]
+        else:
+            scores = self._scan(q, coarse=False)
+            top = self._best(scores, k)
+            top_scores = scores[top]
+
+        results = []
+        for i, score in zip(top, top_scores):
+            seg = int(np.searchsorted(offsets, i, side="right")) - 1
+            row = self.segments[seg].rows[i - offsets[seg]]
+            results.append({**{key: v for key, v in row.items() if key != "id"}, "score": float(score)})
+        return results
+
+
+class NumpyBackend(VectorBackend):
+    name = "numpy"
+
+    def __init__(self, path: str, dtype: str = "float32", coarse_dims: int = 0, coarse_int8: bool = False,
+                 candidates: int = 64):
+        self.path = path
+        self.dtype = dtype
+        self.coarse_dims = coarse_dims
+        self.coarse_int8 = coarse_int8
+        self.candidates = candidates
+        # One _SessionIndex per session directory: open indexes in LRU
+        # order, and how many callers are using each. Only unused ones are
+        # evicted -- a second instance on the same directory would write
+        # segments and manifests behind the first one's back.
+        self._open: OrderedDict[str, _SessionIndex] = OrderedDict()
+        self._users: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self, session_id: str):
+        """The session's index, with its lock held."""
+        with self._lock:
+            index = self._open.get(session_id)
+            if index is None:
+                index = _SessionIndex(os.path.join(self.path, safe_name(session_id)), self.dtype,
+                                      self.coarse_dims, self.coarse_int8, self.candidates)
+                self._open[session_id] = index
+            self._open.move_to_end(session_id)
+            self._users[session_id] = self._users.get(session_id, 0) + 1
+        try:
+            with index.lock:
+                yield index
+        finally:
+            with self._lock:
+                self._users[session_id] -= 1
+                if not self._users[session_id]:
+                    del self._users[session_id]
+                idle = [sid for sid in self._open if sid not in self._users]
+                for sid in idle[:max(len(self._open) - MAX_OPEN_SESSIONS, 0)]:
+                    del self._open[sid]
+
+    def add(self, session_id, ids, embeddings, documents, metadatas):
+        rows = [{"id": i, "text": text, **meta} for i, text, meta in zip(ids, documents, metadatas)]
+        with self._locked(session_id) as index:
+            index.add(np.asarray(embeddings, dtype=np.float32), rows)
+
+    def query(self, session_id, embedding, top_k):
+        with self._locked(session_id) as index:
+            return index.search(np.asarray(embedding, dtype=np.float32), top_k)
+
+    def count(self, session_id):
+        with self._locked(session_id) as index:
+            return index.count()
+
+    def embeddings(self, session_id, doc_id):
+        with self._locked(session_id) as index:
+            return index.embeddings(doc_id)
+
+    def delete_document(self, session_id, doc_id):
+        with self._locked(session_id) as index:
+            index.delete(doc_id)
+
+    def drop(self, session_id):
+        with self._locked(session_id) as index:
+            shutil.rmtree(index.directory, ignore_errors=True)
+            index.segments, index.next_seq = [], 1
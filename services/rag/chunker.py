@@ -0,0 +1,132 @@
+"""
+Boundary-aware chunking: pack whole sentences into chunks of about
+RAG_CHUNK_TOKENS, across page boundaries when a page leaves only a scrap.
+
+The fixed-width splitter (pdf_processor.chunk_pages) cuts every
+chunk_size - overlap characters whatever is there -- mid-word,
+mid-sentence -- and restarts at every page, so the last 50 characters of a
+page become a chunk of their own that still costs an embedding call and
+a retrieval slot, and the overlap is embedded twice. Here:
+
+- short lines that open or close most pages with the same text (running
+  headers, "Page 3 of 40" footers -- digits ignored) are dropped before
+  chunking; they would otherwise be in every chunk's embedding;
+- page text is split into paragraphs (blank lines) and sentences, and
+  sentences are packed into a chunk until the next one would pass the
+  token target; a paragraph that starts when the chunk is already 3/4
+  full starts a new chunk instead;
+- at a page break the chunk is emitted if it has RAG_CHUNK_MIN_TOKENS,
+  so chunks stay page-aligned for citations; a smaller remainder is
+  carried onto the next page, and the chunk records the pages it covers
+  ("page" .. "page_end");
+- a single sentence longer than the target is split on word boundaries.
+
+No overlap: chunks end on sentence boundaries, and context assembly
+(services/rag/context.py) merges neighbours back together when both are
+retrieved. ``python -m benchmarks.chunking`` compares the two splitters.
+"""
+import re
+from collections import Counter
+
+from utils.tokens import estimate_tokens
+
+_PARAGRAPH = re.compile(r"\n\s*\n")
+# A sentence ends at . ! or ? followed by whitespace and a capital, digit or
+# opening bracket/quote; pieces too short to be sentences ("3.", "Fig.")
+# are glued to what follows.
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\[\"'])")
+_MIN_SENTENCE_CHARS = 12
+_EDGE_LINES = 2
+_MAX_BOILERPLATE_CHARS = 100
+
+
+def _line_key(line: str) -> str:
+    return re.sub(r"\d+", "#", " ".join(line.lower().split()))
+
+
+def strip_boilerplate(pages: list[str], min_share: float = 0.5) -> list[str]:
+    """Pages without the header/footer lines repeated across them: any of a
+    page's first or last two lines, if short, whose text (digits ignored)
+    opens or closes at least ``min_share`` of the pages, and at least 3."""
+    page_lines = [[line for line in (p or "").splitlines()] for p in pages]
+
+    def edges(lines: list[str]) -> list[int]:
+        filled = [i for i, line in enumerate(lines) if line.strip()]
+        filled = [i for i in filled if len(lines[i].strip()) <= _MAX_BOILERPLATE_CHARS]
+        return sorted(set(filled[:_EDGE_LINES] + filled[-_EDGE_LINES:]))
+
+    counts = Counter(key for lines in page_lines for key in {_line_key(lines[i]) for i in edges(lines)})
+    threshold = max(3, min_share * len(pages))
+    repeated = {key for key, n in counts.items() if n >= threshold}
+    if not repeated:
+        return [p or "" for p in pages]
+
+    cleaned = []
+    for lines in page_lines:
+        drop = {i for i in edges(lines) if _line_key(lines[i]) in repeated}
+        cleaned.append("\n".join(line for i, line in enumerate(lines) if i not in drop))
+    return cleaned
+
+
+def _sentences(paragraph: str) -> list[str]:
+    text = " ".join(paragraph.split())
+    sentences = []
+    for piece in _SENTENCE_END.split(text):
+        if sentences and len(sentences[-1]) < _MIN_SENTENCE_CHARS:
+            sentences[-1] = f"{sentences[-1]} {piece}"
+        else:
+            sentences.append(piece)
+    return [s for s in sentences if s]
+
+
+def _split_long(sentence: str, target_tokens: int) -> list[str]:
+    pieces, current = [], []
+    for word in sentence.split():
+        if current and estimate_tokens(" ".join(current + [word])) > target_tokens:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def pack(pages: list[str], target_tokens: int, min_tokens: int, strip_repeated: bool = True) -> list[dict]:
+    """Chunks ({"text", "page", "page_end"}) of the given page texts (page 1
+    first)."""
+    if strip_repeated:
+        pages = strip_boilerplate(pages)
+
+    chunks = []
+    paragraphs: list[list[str]] = []   # the open chunk, as paragraphs of sentences
+    first_page = last_page = 0
+    size = 0
+
+    def emit():
+        nonlocal paragraphs, size
+        text = "\n\n".join(" ".join(p) for p in paragraphs if p)
+        if text:
+            chunks.append({"text": text, "page": first_page, "page_end": last_page})
+        paragraphs, size = [], 0
+
+    for page_num, page in enumerate(pages, start=1):
+        for paragraph in _PARAGRAPH.split(page.strip()):
+            new_paragraph = True
+            for sentence in _sentences(paragraph):
+                for piece in _split_long(sentence, target_tokens) if estimate_tokens(sentence) > target_tokens \
+                        else [sentence]:
+                    cost = estimate_tokens(piece)
+                    if paragraphs and (size + cost > target_tokens or (new_paragraph and size >= 0.75 * target_tokens)):
+                        emit()
+                    if not paragraphs:
+                        first_page = page_num
+                    if new_paragraph or not paragraphs:
+                        paragraphs.append([])
+                    paragraphs[-1].append(piece)
+                    last_page = page_num
+                    size += cost
+                    new_paragraph = False
+        if size >= min_tokens:
+            emit()
+    emit()
+    return chunks
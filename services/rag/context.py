@@ -0,0 +1,152 @@
+"""
+Turn retrieved chunks into the context block of a RAG prompt.
+
+pdf_processor cuts pages into overlapping chunks, so the best few hits for
+a question are often neighbours from the same page that repeat each
+other's text -- pasted into the prompt one after another, the overlap (and
+any copy of the same passage elsewhere) is paid for in tokens and in
+generation time without adding anything. ``assemble``:
+
+1. takes a deeper candidate list than the answer needs
+   (RAG_CONTEXT_CANDIDATES, best first);
+2. orders it by maximal marginal relevance -- rank-based relevance,
+   penalised by word-bigram overlap with what is already selected, so a
+   near-copy of a chosen chunk sinks below fresh material, and one that is
+   almost entirely the same text (_DUPLICATE_SIMILARITY, e.g. the same
+   page of a re-uploaded revision) is dropped;
+3. merges chunks of the same page that overlap or contain one another into
+   a single span, which costs only the text it adds;
+4. stops adding once RAG_CONTEXT_TOKEN_BUDGET (utils/tokens.py estimate)
+   is spent. The best chunk is always kept.
+
+Redundancy is measured on the text rather than on embeddings: the
+duplication here is literal, and chunks from the lexical fast path don't
+come with vectors. ``python -m benchmarks.rag_context`` measures prompt
+size and answer coverage against plain top-k.
+"""
+import re
+
+import config
+from utils.tokens import estimate_tokens
+
+_WORD = re.compile(r"\w+")
+_MIN_OVERLAP_CHARS = 20
+_DUPLICATE_SIMILARITY = 0.8
+
+
+def _shingles(text: str) -> set[str]:
+    words = _WORD.findall(text.lower())
+    return {f"{a} {b}" for a, b in zip(words, words[1:])} or set(words)
+
+
+def _similarity(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _overlap(head: str, tail: str) -> int:
+    """Length of the longest suffix of ``head`` that is a prefix of ``tail``
+    (0 below _MIN_OVERLAP_CHARS)."""
+    probe = tail[:_MIN_OVERLAP_CHARS]
+    if len(probe) < _MIN_OVERLAP_CHARS:
+        return 0
+    start = head.find(probe)
+    while start != -1:
+        if tail.startswith(head[start:]):
+            return len(head) - start
+        start = head.find(probe, start + 1)
+    return 0
+
+
+def merge_text(a: str, b: str) -> str | None:
+    """``a`` and ``b`` as one passage if one contains the other or they
+    overlap end-to-start (in either order), else None."""
+    if b in a:
+        return a
+    if a in b:
+        return b
+    k = _overlap(a, b)
+    if k:
+        return a + b[k:]
+    k = _overlap(b, a)
+    if k:
+        return b + a[k:]
+    return None
+
+
+def mmr_order(candidates: list[dict], lam: float) -> list[tuple[dict, float]]:
+    """Candidates (best first) reordered by maximal marginal relevance, each
+    with its highest similarity to a candidate picked before it."""
+    n = len(candidates)
+    shingles = [_shingles(c["text"]) for c in candidates]
+    relevance = [1.0 - i / n for i in range(n)]
+    redundancy = [0.0] * n
+    remaining = list(range(n))
+    order = []
+    while remaining:
+        best = max(remaining, key=lambda i: lam * relevance[i] - (1 - lam) * redundancy[i])
+        remaining.remove(best)
+        order.append((candidates[best], redundancy[best]))
+        for i in remaining:
+            redundancy[i] = max(redundancy[i], _similarity(shingles[i], shingles[best]))
+    return order
+
+
+def page_label(chunk: dict) -> str:
+    end = chunk.get("page_end") or chunk["page"]
+    return f"page {chunk['page']}" if end == chunk["page"] else f"pages {chunk['page']}-{end}"
+
+
+def _header(span: dict) -> str:
+    return f"[{span['filename']} - {page_label(span)}]\n"
+
+
+def _cost(span: dict) -> int:
+    return estimate_tokens(_header(span) + span["text"])
+
+
+def _absorb(span: dict, spans: list[dict]) -> int:
+    """Folds other same-page spans that now overlap ``span`` into it (a
+    chunk can bridge two spans); returns the tokens that frees."""
+    freed = 0
+    for other in [s for s in spans if s is not span and (s["doc_id"], s["page"]) == (span["doc_id"], span["page"])]:
+        merged = merge_text(span["text"], other["text"])
+        if merged is not None:
+            freed += _cost(span) + _cost(other)
+            span["text"] = merged
+            span["page_end"] = max(span["page_end"], other["page_end"])
+            freed -= _cost(span)
+            spans.remove(other)
+    return freed
+
+
+def assemble(candidates: list[dict], token_budget: int | None = None, lam: float | None = None) -> list[dict]:
+    """Spans ({"text", "page", "page_end", "doc_id", "filename"}) to put in
+    the prompt, most relevant first, within ``token_budget``."""
+    token_budget = token_budget or config.RAG_CONTEXT_TOKEN_BUDGET
+    lam = config.RAG_MMR_LAMBDA if lam is None else lam
+    spans, used = [], 0
+    for chunk, redundancy in mmr_order(candidates, lam):
+        if redundancy >= _DUPLICATE_SIMILARITY:
+            continue
+        same_page = [s for s in spans if (s["doc_id"], s["page"]) == (chunk["doc_id"], chunk["page"])]
+        for span in same_page:
+            merged = merge_text(span["text"], chunk["text"])
+            if merged is None:
+                continue
+            grown = {**span, "text": merged}
+            if used + _cost(grown) - _cost(span) <= token_budget:
+                used += _cost(grown) - _cost(span)
+                span["text"] = merged
+                span["page_end"] = max(span["page_end"], chunk.get("page_end") or chunk["page"])
+                used -= _absorb(span, spans)
+            break
+        else:
+            span = {"text": chunk["text"], "page": chunk["page"], "page_end": chunk.get("page_end") or chunk["page"],
+                    "doc_id": chunk["doc_id"], "filename": chunk["filename"]}
+            if spans and used + _cost(span) > token_budget:
+                continue
+            spans.append(span)
+            used += _cost(span)
+    return spans
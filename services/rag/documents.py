@@ -0,0 +1,271 @@
+"""
+Uploaded documents, stored once per distinct file and shared by sessions.
+
+Every upload used to be written under a fresh UUID, extracted, chunked and
+embedded into the uploading session's own namespace -- the same handbook
+uploaded in 200 sessions cost 200 copies and 200 rounds of embedding
+calls. Now an upload is addressed by the SHA-256 of its bytes:
+
+- the first upload of a file stores it as uploads/<hash>.pdf, indexes its
+  chunks once into the document's own namespace
+  (vector_store.document_namespace) and records it in document_blobs;
+- every upload -- first or not -- adds a documents row, the session's
+  reference (its own doc_id and filename). A known file is indexed by that
+  insert alone;
+- a session searches only the documents it references
+  (vector_store.query_chunks), so sharing storage doesn't share
+  visibility;
+- deleting a document drops the session's reference; when no reference
+  to the file is left (its refcount, the number of documents rows with its
+  hash, reaches zero) its vectors, BM25 rows, blob row and file are
+  garbage-collected.
+
+Uploading a new version of a document -- ``replaces=<doc_id>``, or, if
+RAG_DOCUMENT_VERSIONING is turned on, the same filename in the same
+session -- keeps the session's doc_id. Every stored document keeps a
+fingerprint and the text of each page (document_pages). A new version
+only extracts the pages whose fingerprint the previous version doesn't
+have, and it only embeds the chunks whose text the previous version
+doesn't have; everything else is copied from the old version. The new
+version is indexed into its own namespace first, then the session's
+documents row is switched to it in one UPDATE, and only then is the old
+version released. A query never sees a mix of old and stale chunks.
+
+Work on one hash is serialized by a striped lock, so two sessions
+uploading the same new file index it once, a delete can't collect a file
+another upload is just referencing, and a new version's copy of the
+previous one's pages and vectors isn't collected from under it.
+Documents uploaded before this have no content_hash and stay in their
+session's namespace.
+
+Any change to a session's documents clears its cached answers
+(services/rag/answer_cache.py).
+
+Blocking (extraction, embedding, SQLite); async callers go through
+asyncio.to_thread.
+"""
+import os
+import threading
+import uuid
+
+import config
+from services.db import get_conn
+from services.rag import vector_store
+from services.rag.answer_cache import cache as answer_cache
+from services.rag.pdf_processor import chunk_text, extract_pages_incremental
+from utils.logger import logger
+
+_LOCKS = [threading.Lock() for _ in range(64)]
+_stats_lock = threading.Lock()
+_stats = {"uploads": 0, "indexed": 0, "reused": 0, "collected": 0, "versions_replaced": 0,
+          "pages_extracted": 0, "pages_reused": 0, "chunks_embedded": 0, "chunks_reused": 0}
+
+
+def _lock(digest: str) -> threading.Lock:
+    return _LOCKS[int(digest[:8], 16) % len(_LOCKS)]
+
+
+def _count(outcome: str, n: int = 1):
+    with _stats_lock:
+        _stats[outcome] += n
+
+
+def _file_path(digest: str) -> str:
+    return os.path.join(config.UPLOAD_DIR, f"{digest}.pdf")
+
+
+def _previous_version(session_id: str, filename: str, replaces: str | None):
+    with get_conn() as conn:
+        if replaces:
+            row = conn.execute("SELECT doc_id, content_hash FROM documents WHERE doc_id = ? AND session_id = ?",
+                               (replaces, session_id)).fetchone()
+            if row is None:
+                raise ValueError("The document to replace doesn't exist in this session")
+            return row
+        if config.RAG_DOCUMENT_VERSIONING:
+            return conn.execute(
+                "SELECT doc_id, content_hash FROM documents WHERE session_id = ? AND filename = ? "
+                "ORDER BY uploaded_at DESC LIMIT 1",
+                (session_id, filename),
+            ).fetchone()
+    return None
+
+
+def _blob(digest: str):
+    with get_conn() as conn:
+        return conn.execute("SELECT chunk_count FROM document_blobs WHERE content_hash = ?", (digest,)).fetchone()
+
+
+def _known(previous: str) -> tuple[dict, dict]:
+    """The page texts (by fingerprint) and chunk vectors (by text) of the
+    version with content hash ``previous``. Read under its lock, so a
+    concurrent delete can't collect it part-way through; empty if it has
+    been collected already."""
+    with _lock(previous):
+        with get_conn() as conn:
+            known_pages = {r["fingerprint"]: r["text"] for r in conn.execute(
+                "SELECT fingerprint, text FROM document_pages WHERE content_hash = ?", (previous,))}
+        known_vectors = vector_store.document_embeddings(vector_store.document_namespace(previous), previous)
+    return known_pages, known_vectors
+
+
+def _index(digest: str, filename: str, staged: str, known_pages: dict, known_vectors: dict) -> dict:
+    """Moves the staged copy of a file not seen before into the store and
+    indexes it. Pages and chunks found in ``known_pages`` / ``known_vectors``
+    (see ``_known``) are taken from there instead of being extracted and
+    embedded."""
+    path = _file_path(digest)
+    namespace = vector_store.document_namespace(digest)
+    os.replace(staged, path)
+    try:
+        texts, fingerprints, extracted = extract_pages_incremental(path, known_pages)
+        chunks = chunk_text(texts)
+        if not chunks:
+            raise ValueError("Couldn't extract any text from this PDF")
+        embedded = vector_store.add_chunks(namespace, digest, filename, chunks, known_vectors)
+        with get_conn() as conn:
+            conn.executemany(
+                "INSERT INTO document_pages (content_hash, page, fingerprint, text) VALUES (?, ?, ?, ?)",
+                [(digest, n, fp, text) for n, (fp, text) in enumerate(zip(fingerprints, texts), start=1)],
+            )
+            conn.execute("INSERT INTO document_blobs (content_hash, filename, chunk_count) VALUES (?, ?, ?)",
+                         (digest, filename, len(chunks)))
+    except Exception:
+        vector_store.drop_namespace(namespace)
+        os.remove(path)
+        raise
+    _count("pages_extracted", extracted)
+    _count("pages_reused", len(texts) - extracted)
+    _count("chunks_embedded", embedded)
+    _count("chunks_reused", sum(c["text"] in known_vectors for c in chunks))
+    return {"chunk_count": len(chunks), "pages_reused": len(texts) - extracted}
+
+
+def ingest(session_id: str, filename: str, staged: str, digest: str, replaces: str | None = None) -> dict:
+    """Adds the file to the session, indexing it only if no session has
+    uploaded it before. ``staged`` is a copy of the upload in UPLOAD_DIR
+    and ``digest`` its SHA-256 (utils/uploads.py); ingest takes it over,
+    moving it into the store or deleting it. With ``replaces`` (a doc_id),
+    or with RAG_DOCUMENT_VERSIONING on and a document of the same filename
+    in the session, the upload becomes that document's new version: same
+    doc_id, unchanged pages reused, the old version released once the swap
+    is done. Raises ValueError if it has no extractable text."""
+    try:
+        return _ingest(session_id, filename, staged, digest, replaces)
+    finally:
+        if os.path.exists(staged):
+            os.remove(staged)
+
+
+def _ingest(session_id: str, filename: str, staged: str, digest: str, replaces: str | None) -> dict:
+    previous = _previous_version(session_id, filename, replaces)
+    _count("uploads")
+    # Copied before taking this hash's lock: holding two striped locks at
+    # once could deadlock (two uploads replacing each other's versions, or
+    # both hashes on one stripe).
+    known = ({}, {})
+    if previous and previous["content_hash"] and _blob(digest) is None:
+        known = _known(previous["content_hash"])
+    with _lock(digest):
+        blob = _blob(digest)
+        reused = blob is not None
+        if reused:
+            chunk_count, pages_reused = blob["chunk_count"], 0
+        else:
+            indexed = _index(digest, filename, staged, *known)
+            chunk_count, pages_reused = indexed["chunk_count"], indexed["pages_reused"]
+
+        # The swap to the new version is this one statement: queries see
+        # either the old version's chunks or the new one's, never a mix.
+        # It only applies to the version it replaces; if a concurrent upload
+        # swapped first, that one's version is the one replaced (and
+        # released) instead. A row deleted meanwhile becomes a new document.
+        swapped, replaced = False, previous["content_hash"] if previous else None
+        with get_conn() as conn:
+            while previous is not None and not swapped:
+                swapped = conn.execute(
+                    "UPDATE documents SET filename = ?, chunk_count = ?, content_hash = ?, "
+                    "uploaded_at = CURRENT_TIMESTAMP WHERE doc_id = ? AND session_id = ? AND content_hash IS ?",
+                    (filename, chunk_count, digest, previous["doc_id"], session_id, replaced),
+                ).rowcount == 1
+                if not swapped:
+                    row = conn.execute("SELECT content_hash FROM documents WHERE doc_id = ? AND session_id = ?",
+                                       (previous["doc_id"], session_id)).fetchone()
+                    if row is None:
+                        break
+                    replaced = row["content_hash"]
+            doc_id = previous["doc_id"] if swapped else str(uuid.uuid4())
+            if not swapped:
+                conn.execute(
+                    "INSERT INTO documents (doc_id, session_id, filename, chunk_count, content_hash) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (doc_id, session_id, filename, chunk_count, digest),
+                )
+    answer_cache.invalidate(session_id)
+    _count("reused" if reused else "indexed")
+    if swapped and replaced != digest:
+        _count("versions_replaced")
+        _release(session_id, doc_id, replaced)
+    return {"doc_id": doc_id, "filename": filename, "chunks_indexed": chunk_count, "reused": reused,
+            "pages_reused": pages_reused}
+
+
+def _collect(digest: str):
+    vector_store.drop_namespace(vector_store.document_namespace(digest))
+    with get_conn() as conn:
+        conn.execute("DELETE FROM document_blobs WHERE content_hash = ?", (digest,))
+        conn.execute("DELETE FROM document_pages WHERE content_hash = ?", (digest,))
+    try:
+        os.remove(_file_path(digest))
+    except FileNotFoundError:
+        pass
+    _count("collected")
+    logger.info("Collected document %s: no sessions reference it", digest[:12])
+
+
+def _release(session_id: str, doc_id: str, digest: str | None):
+    """Cleans up after a session stopped referencing ``digest`` through
+    ``doc_id``: a pre-sharing upload's rows and file, or the shared copy
+    once nothing references it."""
+    if digest is None:
+        vector_store.delete_document(session_id, doc_id)
+        legacy_path = os.path.join(config.UPLOAD_DIR, f"{doc_id}.pdf")
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
+        return
+    with _lock(digest):
+        with get_conn() as conn:
+            refs = conn.execute("SELECT COUNT(*) FROM documents WHERE content_hash = ?", (digest,)).fetchone()[0]
+        if refs == 0:
+            _collect(digest)
+
+
+def remove(session_id: str, doc_id: str) -> bool:
+    """Drops the session's reference to ``doc_id`` (collecting the file if
+    it was the last); False if the session has no such document."""
+    with get_conn() as conn:
+        row = conn.execute("SELECT content_hash FROM documents WHERE doc_id = ? AND session_id = ?",
+                           (doc_id, session_id)).fetchone()
+        if row is None:
+            return False
+        conn.execute("DELETE FROM documents WHERE doc_id = ? AND session_id = ?", (doc_id, session_id))
+    answer_cache.invalidate(session_id)
+    _release(session_id, doc_id, row["content_hash"])
+    return True
+
+
+def remove_session(session_id: str):
+    with get_conn() as conn:
+        doc_ids = [r["doc_id"] for r in conn.execute("SELECT doc_id FROM documents WHERE session_id = ?",
+                                                     (session_id,))]
+    for doc_id in doc_ids:
+        remove(session_id, doc_id)
+    vector_store.delete_session_collection(session_id)
+
+
+def stats() -> dict:
+    with get_conn() as conn:
+        blobs = conn.execute("SELECT COUNT(*) FROM document_blobs").fetchone()[0]
+        references = conn.execute("SELECT COUNT(*) FROM documents WHERE content_hash IS NOT NULL").fetchone()[0]
+    with _stats_lock:
+        return {**_stats, "stored_documents": blobs, "references": references}
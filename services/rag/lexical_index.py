@@ -0,0 +1,91 @@
+"""
+BM25 index over document chunks (SQLite FTS5, table chunk_fts), by the
+same namespaces as the vector store (the session_id column).
+
+Dense vectors match meaning but blur exact tokens: a part number, a name
+or "clause 14.2" often isn't in the vector top k. Every chunk stored by
+vector_store.add_chunks is also indexed here, and query_chunks fuses the
+two rankings (reciprocal-rank fusion). When the lexical match alone is
+convincing -- see ``confident`` -- the query embedding call is skipped.
+
+Blocking (SQLite); async callers go through asyncio.to_thread.
+"""
+import re
+
+from services.db import get_conn
+
+_TERM = re.compile(r"\w+(?:[-./]\w+)*")
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "is", "are", "was", "were", "be",
+    "what", "which", "who", "whom", "when", "where", "how", "why", "does", "do", "did", "this", "that",
+    "it", "its", "with", "by", "as", "at", "from", "about", "me", "tell", "say", "says", "can", "you",
+    "i", "my", "there", "any", "document", "pdf", "page",
+}
+
+
+def _terms(text: str) -> list[str]:
+    """Distinct query terms, stopwords dropped; "AB-123" stays one term."""
+    seen = []
+    for term in _TERM.findall(text.lower()):
+        if term not in _STOPWORDS and term not in seen:
+            seen.append(term)
+    return seen
+
+
+def _is_identifier(term: str) -> bool:
+    return any(c.isdigit() for c in term) or bool(re.search(r"[-./]", term))
+
+
+def _match_expression(terms: list[str]) -> str:
+    # Each term is a quoted FTS5 phrase, so "ab-123" matches the adjacent
+    # tokens "ab" "123"; any term may match (BM25 ranks by how many do).
+    return " OR ".join('"' + " ".join(re.findall(r"\w+", t)) + '"' for t in terms)
+
+
+def add(namespace: str, doc_id: str, filename: str, chunks: list[dict]):
+    with get_conn() as conn:
+        conn.executemany(
+            "INSERT INTO chunk_fts (text, session_id, doc_id, filename, page, page_end) VALUES (?, ?, ?, ?, ?, ?)",
+            [(c["text"], namespace, doc_id, filename, c["page"], c.get("page_end", c["page"])) for c in chunks],
+        )
+
+
+def delete_document(namespace: str, doc_id: str):
+    with get_conn() as conn:
+        conn.execute("DELETE FROM chunk_fts WHERE session_id = ? AND doc_id = ?", (namespace, doc_id))
+
+
+def drop_namespace(namespace: str):
+    with get_conn() as conn:
+        conn.execute("DELETE FROM chunk_fts WHERE session_id = ?", (namespace,))
+
+
+def search(namespaces: list[str], question: str, limit: int) -> list[dict]:
+    """Best BM25 matches for ``question`` across ``namespaces``, best
+    first, each with a positive ``score`` (higher is better)."""
+    terms = _terms(question)
+    if not terms or not namespaces:
+        return []
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT text, doc_id, filename, page, page_end, bm25(chunk_fts) AS rank FROM chunk_fts "
+            f"WHERE chunk_fts MATCH ? AND session_id IN ({', '.join('?' * len(namespaces))}) "
+            "ORDER BY rank LIMIT ?",
+            (_match_expression(terms), *namespaces, limit),
+        ).fetchall()
+    return [{"text": r["text"], "doc_id": r["doc_id"], "filename": r["filename"], "page": int(r["page"]),
+             "page_end": int(r["page_end"]), "score": -r["rank"]} for r in rows]
+
+
+def confident(question: str, hits: list[dict], margin: float) -> bool:
+    """Whether the lexical ranking can stand on its own: the question names
+    something exact (a number, code or dotted/hyphenated term), the best hit
+    contains all of those exactly, and it outscores the runner-up by
+    ``margin``x."""
+    exact = [t for t in _terms(question) if _is_identifier(t)]
+    if not hits or not exact:
+        return False
+    best = hits[0]["text"].lower()
+    if not all(re.search(rf"(?<!\w){re.escape(t)}(?!\w)", best) for t in exact):
+        return False
+    return len(hits) == 1 or hits[0]["score"] >= margin * hits[1]["score"]
@@ -1,34 +1,118 @@
 """
 PDF -> text -> chunks.
 
-Chunking is done per-page so every chunk carries an accurate page number for
-citations. Within a page, text is split with overlap so we don't cut a
-sentence in half between chunks.
+Chunks carry the page they start on (and "page_end", the page they end
+on) for citations. By default pages are packed into sentence-aligned
+chunks of about RAG_CHUNK_TOKENS (services/rag/chunker.py);
+RAG_CHUNKER=fixed keeps the original splitter, which cuts each page every
+RAG_CHUNK_SIZE - RAG_CHUNK_OVERLAP characters with overlap so a sentence
+cut in half between chunks is still whole in one of them.
+
+Each page is also fingerprinted from its content streams and resources,
+so a re-uploaded revision only extracts the pages that changed
+(services/rag/documents.py).
 """
+import hashlib
+
 import pdfplumber
+from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+from pdfminer.psparser import LIT
+import config
 from config import RAG_CHUNK_SIZE, RAG_CHUNK_OVERLAP
+from services.rag.chunker import pack
 from utils.logger import logger
 
+_IMAGE = LIT("Image")
 
-def extract_and_chunk(file_path: str, chunk_size: int = RAG_CHUNK_SIZE,
-                       overlap: int = RAG_CHUNK_OVERLAP) -> list[dict]:
-    """Returns a list of {"text": str, "page": int} chunks."""
+
+def chunk_pages(pages: list[str], chunk_size: int = RAG_CHUNK_SIZE,
+                overlap: int = RAG_CHUNK_OVERLAP) -> list[dict]:
+    """Splits page texts (page 1 first) into {"text": str, "page": int} chunks."""
     chunks = []
+    step = max(1, chunk_size - overlap)
+    for page_num, text in enumerate(pages, start=1):
+        text = (text or "").strip()
+        for i in range(0, len(text), step):
+            chunk = text[i:i + chunk_size].strip()
+            if chunk:
+                chunks.append({"text": chunk, "page": page_num})
+    return chunks
+
+
+def _hash_object(digest, obj, seen: set):
+    """Feeds a PDF object into ``digest``, following references (each
+    object once) and decoding streams. Image data is skipped: it draws no
+    text."""
+    if isinstance(obj, PDFObjRef):
+        # Not the object number: a revision may renumber unchanged objects.
+        digest.update(b"R")
+        if obj.objid in seen:
+            return
+        seen.add(obj.objid)
+        obj = obj.resolve()
+    if isinstance(obj, PDFStream):
+        _hash_object(digest, obj.attrs, seen)
+        if obj.get("Subtype") is not _IMAGE:
+            digest.update(obj.get_data())
+    elif isinstance(obj, dict):
+        for key in sorted(obj):
+            digest.update(f"/{key}".encode())
+            _hash_object(digest, obj[key], seen)
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b"[")
+        for item in obj:
+            _hash_object(digest, item, seen)
+        digest.update(b"]")
+    else:
+        digest.update(repr(obj).encode())
+
+
+def page_fingerprint(page) -> str:
+    """Hash of everything a page's text is drawn from -- its content
+    streams and its resources: fonts with their widths, encodings and
+    ToUnicode maps, and Form XObjects with their own resources -- so an
+    unchanged page is recognized without extracting it."""
+    digest = hashlib.sha256()
+    for stream in page.page_obj.contents:
+        digest.update(resolve1(stream).get_data())
+    _hash_object(digest, page.page_obj.resources or {}, set())
+    return digest.hexdigest()
+
+
+def extract_pages_incremental(file_path: str, known: dict[str, str]) -> tuple[list[str], list[str], int]:
+    """Page texts and fingerprints; a page whose fingerprint is in ``known``
+    takes its text from there instead of being extracted. Also returns how
+    many pages were extracted."""
+    texts, fingerprints, extracted = [], [], 0
     try:
         with pdfplumber.open(file_path) as pdf:
-            for page_num, page in enumerate(pdf.pages, start=1):
-                text = page.extract_text() or ""
-                text = text.strip()
-                if not text:
-                    continue
-
-                step = max(1, chunk_size - overlap)
-                for i in range(0, len(text), step):
-                    chunk = text[i:i + chunk_size].strip()
-                    if chunk:
-                        chunks.append({"text": chunk, "page": page_num})
+            for page in pdf.pages:
+                fingerprint = page_fingerprint(page)
+                text = known.get(fingerprint)
+                if text is None:
+                    text = page.extract_text() or ""
+                    extracted += 1
+                texts.append(text)
+                fingerprints.append(fingerprint)
+                page.close()
     except Exception as e:
-        logger.error(f"Failed to extract/chunk PDF {file_path}: {e}")
+        logger.error("Failed to extract PDF %s: %s", file_path, e)
         raise
+    return texts, fingerprints, extracted
 
-    return chunks
+
+def extract_pages(file_path: str) -> list[str]:
+    return extract_pages_incremental(file_path, {})[0]
+
+
+def chunk_text(pages: list[str]) -> list[dict]:
+    """Chunks of extracted page texts, with the configured chunker."""
+    if config.RAG_CHUNKER == "fixed":
+        return chunk_pages(pages)
+    return pack(pages, config.RAG_CHUNK_TOKENS, config.RAG_CHUNK_MIN_TOKENS)
+
+
+def extract_and_chunk(file_path: str) -> list[dict]:
+    """Returns a list of {"text": str, "page": int} chunks ("page_end" too
+    from the packing chunker)."""
+    return chunk_text(extract_pages(file_path))
@@ -1,11 +1,26 @@
 """
 Retrieve relevant chunks for a question, ground a Gemini answer in them,
 and return page-level citations alongside the answer.
+
+Retrieval over-fetches (RAG_CONTEXT_CANDIDATES) and services/rag/context.py
+trims the candidates to deduplicated, merged spans within
+RAG_CONTEXT_TOKEN_BUDGET before they go into the prompt.
+
+``stream_rag_answer`` is the incremental form used by /rag/chat/{id}/stream:
+retrieval finishes before generation starts, so the sources go out first
+and the answer follows token by token.
+
+Both check the session's answer cache (services/rag/answer_cache.py):
+for the exact question before retrieval, and for a similar one with the
+embedding retrieval computed, if it needed one. A generated answer is
+stored.
 """
-from google import genai
 from google.genai import types
 import config
-from services.rag.vector_store import query_chunks
+from services.genai_client import get_client
+from services.rag.answer_cache import cache as answer_cache
+from services.rag.context import assemble, page_label
+from services.rag.vector_store import retrieve
 from utils.logger import logger
 
 _SYSTEM_INSTRUCTION = (
@@ -15,42 +30,113 @@ _SYSTEM_INSTRUCTION = (
     "in the uploaded documents instead of guessing. Be concise. When useful, "
     "mention which page the information came from."
 )
+_NO_RESULTS = ("I couldn't find anything relevant in your uploaded documents. "
+               "Try uploading a PDF first, or rephrase your question.")
+_FAILED = "Something went wrong while generating the answer from your documents."
 
 
-def rag_answer(session_id: str, question: str) -> dict:
-    chunks = query_chunks(session_id, question)
-
-    if not chunks:
-        return {
-            "answer": "I couldn't find anything relevant in your uploaded documents. "
-                      "Try uploading a PDF first, or rephrase your question.",
-            "sources": [],
-        }
-
+def _prompt(question: str, chunks: list[dict]) -> str:
     context = "\n\n".join(
-        f"[{c['filename']} - page {c['page']}]\n{c['text']}" for c in chunks
+        f"[{c['filename']} - {page_label(c)}]\n{c['text']}" for c in chunks
     )
-    prompt = f"Context:\n{context}\n\nQuestion: {question}"
+    return f"Context:\n{context}\n\nQuestion: {question}"
+
+
+def _generation_config() -> types.GenerateContentConfig:
+    return types.GenerateContentConfig(system_instruction=_SYSTEM_INSTRUCTION)
 
-    try:
-        client = genai.Client()
-        response = client.models.generate_content(
-            model=config.CHAT_MODEL,
-            contents=prompt,
-            config=types.GenerateContentConfig(system_instruction=_SYSTEM_INSTRUCTION),
-        )
-        answer_text = response.text
-    except Exception as e:
-        logger.error(f"RAG generation failed: {e}")
-        answer_text = "Something went wrong while generating the answer from your documents."
 
+def _sources(chunks: list[dict]) -> list[dict]:
     sources = []
     seen = set()
     for c in chunks:
         key = (c["doc_id"], c["page"])
         if key not in seen:
             seen.add(key)
-            sources.append({"doc_id": c["doc_id"], "filename": c["filename"], "page": c["page"]})
+            sources.append({"doc_id": c["doc_id"], "filename": c["filename"], "page": c["page"],
+                            "page_end": c.get("page_end") or c["page"]})
     sources.sort(key=lambda s: s["page"])
+    return sources
+
+
+def _retrieve(session_id: str, question: str) -> tuple[dict | None, list[dict], object, object]:
+    """(cached result or None, context chunks, question embedding or
+    None, cache token or None with the cache off)."""
+    token = None
+    if config.RAG_ANSWER_CACHE_ENABLED:
+        cached, token = answer_cache.lookup(session_id, question)
+        if cached:
+            return cached, [], None, token
+    candidates, q_embedding = retrieve(session_id, question, top_k=config.RAG_CONTEXT_CANDIDATES)
+    if token is not None and q_embedding is not None:
+        cached = answer_cache.match(session_id, token, question, q_embedding)
+        if cached:
+            return cached, [], q_embedding, token
+    return None, assemble(candidates), q_embedding, token
+
+
+def rag_answer(session_id: str, question: str) -> dict:
+    cached, chunks, q_embedding, token = _retrieve(session_id, question)
+    if cached:
+        return dict(cached)
+
+    if not chunks:
+        return {"answer": _NO_RESULTS, "sources": []}
+
+    try:
+        client = get_client()
+        response = client.models.generate_content(
+            model=config.CHAT_MODEL,
+            contents=_prompt(question, chunks),
+            config=_generation_config(),
+        )
+        answer_text = response.text
+    except Exception as e:
+        logger.error("RAG generation failed: %s", e)
+        return {"answer": _FAILED, "sources": _sources(chunks)}
+
+    result = {"answer": answer_text, "sources": _sources(chunks)}
+    # An empty reply (a blocked or cut-off generation) is not worth
+    # replaying to the next asker.
+    if token is not None and (answer_text or "").strip():
+        answer_cache.store(session_id, token, question, q_embedding, result)
+    return result
+
+
+def stream_rag_answer(session_id: str, question: str):
+    """Yields (event, data) pairs: ("sources", {"sources": [...]}) once, then
+    ("token", {"text": ...}) pieces of the answer, or ("error", {"message":
+    ...}) if generation fails. Blocking generator -- iterate it on a worker
+    thread. A cached answer comes as a single token."""
+    cached, chunks, q_embedding, token = _retrieve(session_id, question)
+    if cached:
+        yield "sources", {"sources": cached["sources"]}
+        yield "token", {"text": cached["answer"]}
+        return
+
+    sources = _sources(chunks)
+    yield "sources", {"sources": sources}
+
+    if not chunks:
+        yield "token", {"text": _NO_RESULTS}
+        return
+
+    pieces = []
+    try:
+        client = get_client()
+        for chunk in client.models.generate_content_stream(
+            model=config.CHAT_MODEL,
+            contents=_prompt(question, chunks),
+            config=_generation_config(),
+        ):
+            if chunk.text:
+                pieces.append(chunk.text)
+                yield "token", {"text": chunk.text}
+    except Exception as e:
+        logger.error("RAG generation failed: %s", e)
+        yield "error", {"message": _FAILED}
+        return
 
-    return {"answer": answer_text, "sources": sources}
+    answer_text = "".join(pieces)
+    if token is not None and answer_text.strip():
+        answer_cache.store(session_id, token, question, q_embedding, {"answer": answer_text, "sources": sources})
@@ -1,36 +1,42 @@
 """
-ChromaDB wrapper: one collection per chat session, so a user's uploaded
-documents are only ever retrieved within their own session.
+Document chunk storage and retrieval. Chunks live in namespaces: one per
+distinct uploaded document, shared by every session that uploaded it
+(services/rag/documents.py), plus each session's own namespace for
+documents uploaded before that. A session only ever searches its own
+namespace and the documents it references, so a user's documents are
+only retrieved within their own session.
+
+Embedding happens here; storage and search are delegated to the backend
+VECTOR_STORE_BACKEND selects (services/rag/backends: Chroma or the
+embedded numpy index). Chunks are also indexed for BM25
+(services/rag/lexical_index.py), and ``query_chunks`` merges the dense and
+lexical rankings with reciprocal-rank fusion -- or, when the lexical match
+is decisive, returns it without embedding the question at all. If the
+embedding call fails, whatever BM25 found is returned on its own.
 """
-import math
-import chromadb
-from google import genai
+import threading
+import numpy as np
 from google.genai import types
 import config
+from services.db import get_conn
+from services.genai_client import get_client
+from services.rag import lexical_index
+from services.rag.backends import VectorBackend, create
 from utils.logger import logger
 
-_client = None
+_backend = None
+_stats_lock = threading.Lock()
+_stats = {"queries": 0, "lexical_fast_path": 0, "lexical_fallback": 0, "hybrid": 0, "dense_only": 0}
 
 
-def get_chroma_client():
-    global _client
-    if _client is None:
-        _client = chromadb.PersistentClient(path=config.CHROMA_PATH)
-    return _client
+def get_backend() -> VectorBackend:
+    global _backend
+    if _backend is None:
+        _backend = create()
+    return _backend
 
 
-def _collection_name(session_id: str) -> str:
-    # Chroma collection names must be alnum/underscore/hyphen; session ids
-    # are UUIDs so this is already safe, but sanitize defensively.
-    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in session_id)
-    return f"docs_{safe}"
-
-
-def get_collection(session_id: str):
-    return get_chroma_client().get_or_create_collection(_collection_name(session_id))
-
-
-def embed_text(text: str) -> list[float]:
+def embed_texts(texts: list[str]) -> np.ndarray:
     """
     Uses gemini-embedding-001 (text-embedding-004 was deprecated by Google on
     Jan 14, 2026). output_dimensionality=768 keeps vectors smaller/faster for
@@ -38,56 +44,158 @@ def embed_text(text: str) -> list[float]:
     when a non-default output_dimensionality is requested (unlike the newer
     gemini-embedding-2), so we L2-normalize manually for correct similarity
     ranking.
+
+    Texts go RAG_EMBED_BATCH_SIZE to a request, so a document costs a few
+    calls rather than one per chunk.
     """
-    client = genai.Client()
-    result = client.models.embed_content(
-        model=config.EMBEDDING_MODEL,
-        contents=text,
-        config=types.EmbedContentConfig(output_dimensionality=768),
-    )
-    values = result.embeddings[0].values
-    norm = math.sqrt(sum(v * v for v in values)) or 1.0
-    return [v / norm for v in values]
+    client = get_client()
+    vectors = []
+    for start in range(0, len(texts), config.RAG_EMBED_BATCH_SIZE):
+        result = client.models.embed_content(
+            model=config.EMBEDDING_MODEL,
+            contents=texts[start:start + config.RAG_EMBED_BATCH_SIZE],
+            config=types.EmbedContentConfig(output_dimensionality=768),
+        )
+        vectors.extend(e.values for e in result.embeddings)
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def embed_text(text: str) -> list[float]:
+    return embed_texts([text])[0].tolist()
+
+
+def document_namespace(content_hash: str) -> str:
+    """Where a shared document's chunks live (services/rag/documents.py)."""
+    return f"doc-{content_hash[:32]}"
 
 
-def add_chunks(session_id: str, doc_id: str, filename: str, chunks: list[dict]):
+def add_chunks(namespace: str, doc_id: str, filename: str, chunks: list[dict],
+               known: dict[str, np.ndarray] | None = None) -> int:
+    """Embeds and stores ``chunks``; a chunk whose exact text is in ``known``
+    (vectors by chunk text, e.g. the previous version of the document) reuses
+    that vector. Returns how many distinct chunk texts were embedded."""
     if not chunks:
-        return
-    collection = get_collection(session_id)
-    embeddings = [embed_text(c["text"]) for c in chunks]
-    collection.add(
+        return 0
+    known = known or {}
+    missing = list(dict.fromkeys(c["text"] for c in chunks if c["text"] not in known))
+    fresh = dict(zip(missing, embed_texts(missing))) if missing else {}
+    embeddings = np.asarray([known.get(c["text"], fresh.get(c["text"])) for c in chunks], dtype=np.float32)
+    get_backend().add(
+        namespace,
         ids=[f"{doc_id}_{i}" for i in range(len(chunks))],
         embeddings=embeddings,
         documents=[c["text"] for c in chunks],
-        metadatas=[{"doc_id": doc_id, "filename": filename, "page": c["page"]} for c in chunks],
+        metadatas=[{"doc_id": doc_id, "filename": filename, "page": c["page"],
+                    "page_end": c.get("page_end", c["page"])} for c in chunks],
     )
+    lexical_index.add(namespace, doc_id, filename, chunks)
+    return len(missing)
+
+
+def document_embeddings(namespace: str, doc_id: str) -> dict[str, np.ndarray]:
+    return get_backend().embeddings(namespace, doc_id)
+
+
+def _visible(session_id: str) -> tuple[list[str], dict[str, dict]]:
+    """The namespaces a session's questions search -- its own, which holds
+    documents uploaded before they were shared, plus one per shared
+    document it references -- and, by content hash, the session's doc_id
+    and filename for each shared document."""
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT doc_id, filename, content_hash FROM documents "
+            "WHERE session_id = ? AND content_hash IS NOT NULL ORDER BY uploaded_at",
+            (session_id,),
+        ).fetchall()
+    owners = {r["content_hash"]: {"doc_id": r["doc_id"], "filename": r["filename"]} for r in rows}
+    return [session_id] + [document_namespace(h) for h in owners], owners
+
+
+def _chunk(r: dict, owners: dict | None = None) -> dict:
+    # Shared chunks are stored under the content hash; report them as the
+    # asking session's document. Chunks stored before page spans existed
+    # have no page_end.
+    owner = (owners or {}).get(r["doc_id"], r)
+    return {"text": r["text"], "page": r["page"], "page_end": r.get("page_end") or r["page"],
+            "doc_id": owner["doc_id"], "filename": owner["filename"]}
+
+
+def fuse(rankings: list[list[dict]], k: int = 60) -> list[dict]:
+    """Reciprocal-rank fusion: each chunk scores sum(1 / (k + rank)) over
+    the rankings it appears in."""
+    scores, chunks = {}, {}
+    for ranking in rankings:
+        for rank, r in enumerate(ranking, start=1):
+            key = (r["doc_id"], r["page"], r["text"])
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            chunks.setdefault(key, _chunk(r))
+    return [chunks[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+def _count(outcome: str):
+    with _stats_lock:
+        _stats["queries"] += 1
+        _stats[outcome] += 1
+
+
+def retrieve(session_id: str, question: str, top_k: int = None) -> tuple[list[dict], np.ndarray | None]:
+    """The session's top_k chunks for the question, and the question's
+    embedding -- None when it wasn't needed (lexical fast path) or couldn't
+    be computed. If embedding fails and BM25 found anything, the lexical
+    ranking is returned on its own."""
+    top_k = top_k or config.RAG_TOP_K
+    backend = get_backend()
+    namespaces, owners = _visible(session_id)
+    namespaces = [ns for ns in namespaces if backend.count(ns)]
+    if not namespaces:
+        return [], None
+
+    candidates = max(top_k, config.RAG_FUSION_CANDIDATES)
+    lexical = lexical_index.search(namespaces, question, candidates) if config.RAG_HYBRID_ENABLED else []
+    if lexical and lexical_index.confident(question, lexical, config.RAG_LEXICAL_MARGIN):
+        _count("lexical_fast_path")
+        return [_chunk(r, owners) for r in lexical[:top_k]], None
+
+    try:
+        q_embedding = np.asarray(embed_text(question), dtype=np.float32)
+    except Exception as e:
+        if not lexical:
+            raise
+        logger.warning("Question embedding failed, using lexical results only: %s", e)
+        _count("lexical_fallback")
+        return [_chunk(r, owners) for r in lexical[:top_k]], None
+    limit = candidates if lexical else top_k
+    dense = sorted((r for ns in namespaces for r in backend.query(ns, q_embedding, limit)),
+                   key=lambda r: r["score"], reverse=True)[:limit]
+    dense = [_chunk(r, owners) for r in dense]
+    if not lexical:
+        _count("dense_only")
+        return dense[:top_k], q_embedding
+    _count("hybrid")
+    return fuse([dense, [_chunk(r, owners) for r in lexical]], config.RAG_RRF_K)[:top_k], q_embedding
 
 
 def query_chunks(session_id: str, question: str, top_k: int = None) -> list[dict]:
-    top_k = top_k or config.RAG_TOP_K
-    collection = get_collection(session_id)
-    if collection.count() == 0:
-        return []
+    """The session's top_k chunks for the question (see ``retrieve``)."""
+    return retrieve(session_id, question, top_k)[0]
 
-    q_embedding = embed_text(question)
-    results = collection.query(query_embeddings=[q_embedding], n_results=min(top_k, collection.count()))
 
-    chunks = []
-    for doc, meta in zip(results["documents"][0], results["metadatas"][0]):
-        chunks.append({"text": doc, "page": meta["page"], "doc_id": meta["doc_id"], "filename": meta["filename"]})
-    return chunks
+def delete_document(namespace: str, doc_id: str):
+    get_backend().delete_document(namespace, doc_id)
+    lexical_index.delete_document(namespace, doc_id)
 
 
-def delete_document(session_id: str, doc_id: str):
-    collection = get_collection(session_id)
-    try:
-        collection.delete(where={"doc_id": doc_id})
-    except Exception as e:
-        logger.warning(f"Failed to delete doc_id {doc_id} from Chroma: {e}")
+def drop_namespace(namespace: str):
+    get_backend().drop(namespace)
+    lexical_index.drop_namespace(namespace)
 
 
 def delete_session_collection(session_id: str):
-    try:
-        get_chroma_client().delete_collection(_collection_name(session_id))
-    except Exception as e:
-        logger.warning(f"Failed to delete collection for session {session_id}: {e}")
+    drop_namespace(session_id)
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return {**_stats, "backend": get_backend().name}
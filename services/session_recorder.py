@@ -0,0 +1,212 @@
+"""
+Capture of real WebSocket voice sessions for deterministic replay.
+
+When ``SESSION_RECORD_DIR`` is set, every ``/ws/{session_id}`` connection is
+written to two files in that directory:
+
+- ``<name>.frames``: every captured frame, each prefixed with its length as a
+  4-byte big-endian unsigned int. Audio frames are raw PCM; everything else
+  is UTF-8 JSON.
+- ``<name>.json``: the index -- session metadata plus one entry per frame
+  with its kind, time offset (seconds since connect), file offset and length.
+
+Frame kinds:
+
+- ``client_audio``    inbound PCM exactly as the browser sent it
+- ``server_text`` /   outbound frames exactly as the client received them
+  ``server_json``
+- ``stt_turn``        AssemblyAI Turn event, plus how many inbound audio bytes
+                      had been streamed when it arrived
+- ``gemini``          one Gemini call: wire-format response chunks with their
+                      arrival offsets relative to the request
+- ``murf``            one Murf call: the input text and every raw message
+- ``tool``            a function call the model made and what it returned
+                      (kept for diffing; replay re-runs tools against fakes)
+
+The active recorder lives in a ContextVar set by the WebSocket endpoint, so
+the services hooked here (gemini_stream, murf_stream, assembly_stream) only
+pay for a ContextVar lookup when recording is off. Frames arrive from the
+event loop and from the AssemblyAI SDK thread, so writes are serialized by
+a lock. See
+``benchmarks/replay.py`` for the replayer.
+"""
+import json
+import os
+import re
+import struct
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from utils.logger import logger
+
+FORMAT_VERSION = 1
+
+_current: ContextVar["SessionRecorder | None"] = ContextVar("session_recorder", default=None)
+
+
+def _encode(payload) -> bytes:
+    if isinstance(payload, (bytes, bytearray)):
+        return bytes(payload)
+    return json.dumps(payload, separators=(",", ":"), default=str).encode()
+
+
+class SessionRecorder:
+    def __init__(self, directory: str, session_id: str, user_id: str | None = None):
+        os.makedirs(directory, exist_ok=True)
+        safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", session_id)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self.base_path = os.path.join(directory, f"{safe_id}_{stamp}")
+        self.session_id = session_id
+        self.user_id = user_id
+        self.started = time.perf_counter()
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.audio_bytes = 0
+        self._frames = []
+        self._offset = 0
+        self._lock = threading.Lock()
+        self._file = open(f"{self.base_path}.frames", "wb")
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def record(self, kind: str, payload):
+        data = _encode(payload)
+        with self._lock:
+            self._write(kind, data)
+
+    def record_client_audio(self, chunk: bytes):
+        with self._lock:
+            self.audio_bytes += len(chunk)
+            self._write("client_audio", bytes(chunk))
+
+    def record_stt_turn(self, event: dict):
+        """Records a Turn event with the inbound audio streamed so far, both
+        read under the lock so the count matches the frame's position."""
+        with self._lock:
+            self._write("stt_turn", _encode({"audio_bytes": self.audio_bytes, "event": event}))
+
+    def _write(self, kind: str, data: bytes):
+        if self._file.closed:
+            return
+        self._file.write(struct.pack(">I", len(data)))
+        self._file.write(data)
+        self._frames.append({"t": round(self.elapsed(), 6), "kind": kind, "offset": self._offset + 4, "length": len(data)})
+        self._offset += 4 + len(data)
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.close()
+            index = {
+                "version": FORMAT_VERSION,
+                "session_id": self.session_id,
+                "user_id": self.user_id,
+                "started_at": self.started_at,
+                "duration": round(self.elapsed(), 6),
+                "frames": list(self._frames),
+            }
+        with open(f"{self.base_path}.json", "w") as f:
+            json.dump(index, f)
+        logger.info("Recorded session %s to %s.frames (%d frames)", self.session_id, self.base_path, len(self._frames))
+
+
+class RecordingWebSocket:
+    """Wraps a Starlette WebSocket so the frames the endpoint exchanges with
+    the browser are captured; everything else is passed straight through."""
+
+    def __init__(self, websocket, recorder: SessionRecorder):
+        self._websocket = websocket
+        self._recorder = recorder
+
+    async def receive_bytes(self) -> bytes:
+        data = await self._websocket.receive_bytes()
+        self._recorder.record_client_audio(data)
+        return data
+
+    async def send_json(self, data, *args, **kwargs):
+        self._recorder.record("server_json", data)
+        await self._websocket.send_json(data, *args, **kwargs)
+
+    async def send_text(self, data: str):
+        self._recorder.record("server_text", data)
+        await self._websocket.send_text(data)
+
+    def __getattr__(self, name):
+        return getattr(self._websocket, name)
+
+
+class UpstreamCapture:
+    """Collects one upstream call's messages with arrival offsets; recorded as
+    a single frame on ``close()``. Falsy when recording is off, so callers can
+    skip building payloads with ``if capture:``."""
+
+    def __init__(self, recorder: SessionRecorder | None, kind: str, request: dict | None = None):
+        self._recorder = recorder
+        self._kind = kind
+        self._request = request or {}
+        self._started = time.perf_counter()
+        self._messages = []
+
+    def __bool__(self) -> bool:
+        return self._recorder is not None
+
+    def add(self, message):
+        if self._recorder is not None:
+            self._messages.append({"dt": round(time.perf_counter() - self._started, 6), "data": message})
+
+    def close(self):
+        if self._recorder is not None:
+            self._recorder.record(self._kind, {**self._request, "messages": self._messages})
+            self._recorder = None
+
+
+def start(directory: str, session_id: str, user_id: str | None = None) -> SessionRecorder | None:
+    """Starts recording the current session into ``directory`` (typically
+    config.SESSION_RECORD_DIR); recording is off when it's empty."""
+    if not directory:
+        return None
+    try:
+        recorder = SessionRecorder(directory, session_id, user_id)
+    except OSError as e:
+        logger.warning("Session recording disabled for %s: %s", session_id, e)
+        return None
+    _current.set(recorder)
+    return recorder
+
+
+def current() -> SessionRecorder | None:
+    return _current.get()
+
+
+def capture(kind: str, request: dict | None = None) -> UpstreamCapture:
+    return UpstreamCapture(_current.get(), kind, request)
+
+
+def record(kind: str, payload):
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.record(kind, payload)
+
+
+# ---------------------------------------------------------------------------
+# Reading recordings back
+# ---------------------------------------------------------------------------
+def load(path: str) -> tuple[dict, list[dict]]:
+    """Loads a recording given either of its two files (or their common
+    base path). Returns (index, frames); each frame is its index entry plus
+    ``payload`` (bytes for audio, decoded JSON otherwise)."""
+    base = re.sub(r"\.(frames|json)$", "", path)
+    with open(f"{base}.json") as f:
+        index = json.load(f)
+    frames = []
+    with open(f"{base}.frames", "rb") as f:
+        blob = f.read()
+    for entry in index["frames"]:
+        (length,) = struct.unpack_from(">I", blob, entry["offset"] - 4)
+        raw = blob[entry["offset"]:entry["offset"] + length]
+        payload = raw if entry["kind"] == "client_audio" else json.loads(raw)
+        frames.append({**entry, "payload": payload})
+    return index, frames
@@ -12,18 +12,54 @@ Cleaned up from the original skills.py:
   get_financial_controller() so that API keys updated at runtime via the
   sidebar are actually picked up (previously the controller was built once
   at import time and cached stale keys forever).
+
+Quote misses go through windowed batchers (services/quote_batch.py): the
+crypto symbols asked for within a few milliseconds -- by any session, tool
+call or the prefetcher -- share one CoinMarketCap ``quotes/latest``
+request. Finnhub has no multi-symbol quote endpoint, so a stock batch
+shares one HTTP session and fetches its symbols concurrently. Company
+profiles (market cap) change slowly and are cached for
+QUOTE_PROFILE_TTL_S, so a repeat stock lookup costs one request, not two.
 """
 import os
 import json
+import asyncio
 import aiohttp
+from contextvars import ContextVar
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 from google.genai import types
 import config
+from services.quote_batch import batcher
 from utils.logger import logger
 
-WEATHER_BASE_URL = "https://api.openweathermap.org/data/2.5"
+# Shared by every controller (they're created per call), so a quote fetched
+# for one request -- or prefetched from the transcript by
+# services/prefetch.py -- serves the next one within the cache timeout.
+_CACHE: Dict[str, Any] = {}
+_IN_FLIGHT: Dict[str, asyncio.Future] = {}
+
+# Cache keys looked up in the current context, when a caller wants to know
+# (services/prefetch.py tracks what a turn's tool calls used).
+cache_lookups: ContextVar[Optional[set]] = ContextVar("cache_lookups", default=None)
+
+
+def _note_lookup(key: str):
+    keys = cache_lookups.get()
+    if keys is not None:
+        keys.add(key)
+
+
+def _single_flight(key: str, fetch) -> asyncio.Future:
+    """Joins an identical fetch that is already running instead of starting
+    another (e.g. a tool call arriving while its prefetch is in flight)."""
+    task = _IN_FLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch())
+        _IN_FLIGHT[key] = task
+        task.add_done_callback(lambda _: _IN_FLIGHT.pop(key, None))
+    return asyncio.shield(task)
 
 
 @dataclass
@@ -69,18 +105,21 @@ class FinancialMarketsController:
         self.finnhub_key = config.FINNHUB_API_KEY
         self.polygon_key = os.getenv("POLYGON_API_KEY")
         self.coinmarketcap_key = os.getenv("COINMARKETCAP_API_KEY")
-        self.cache: Dict[str, Any] = {}
+        self.cache = _CACHE
         self.cache_timeout = 60  # seconds
 
     async def get_stock_quote(self, symbol: str) -> Optional[StockData]:
         symbol = symbol.upper()
         cache_key = f"stock_{symbol}"
+        _note_lookup(cache_key)
         if self._is_cached(cache_key):
             return self.cache[cache_key]["data"]
+        return await _single_flight(cache_key, lambda: self._fetch_stock_quote(symbol, cache_key))
 
+    async def _fetch_stock_quote(self, symbol: str, cache_key: str) -> Optional[StockData]:
         try:
             if self.finnhub_key:
-                stock_data = await self._get_finnhub_quote(symbol)
+                stock_data = await _STOCK_BATCHER.get(symbol)
                 if stock_data:
                     self._cache_data(cache_key, stock_data)
                     return stock_data
@@ -99,35 +138,53 @@ class FinancialMarketsController:
 
         return None
 
-    async def _get_finnhub_quote(self, symbol: str) -> Optional[StockData]:
+    async def _get_finnhub_quotes(self, symbols: List[str]) -> Dict[str, StockData]:
+        async with aiohttp.ClientSession() as session:
+            quotes = await asyncio.gather(*(self._get_finnhub_quote(session, s) for s in symbols))
+        return {s: q for s, q in zip(symbols, quotes) if q}
+
+    async def _get_finnhub_quote(self, session: aiohttp.ClientSession, symbol: str) -> Optional[StockData]:
         try:
-            async with aiohttp.ClientSession() as session:
-                quote_url = f"https://finnhub.io/api/v1/quote?symbol={symbol}&token={self.finnhub_key}"
-                async with session.get(quote_url) as response:
-                    if response.status != 200:
-                        return None
-                    quote_data = await response.json()
-                    if quote_data.get("c") is None:
-                        return None
+            quote_url = f"{config.FINNHUB_BASE_URL}/quote?symbol={symbol}&token={self.finnhub_key}"
+            profile_key = f"profile_{symbol}"
+            fetch_profile = not self._is_cached(profile_key, config.QUOTE_PROFILE_TTL_S)
 
-                profile_url = f"https://finnhub.io/api/v1/stock/profile2?symbol={symbol}&token={self.finnhub_key}"
-                async with session.get(profile_url) as profile_response:
-                    profile_data = await profile_response.json() if profile_response.status == 200 else {}
-
-                return StockData(
-                    symbol=symbol,
-                    price=quote_data["c"],
-                    change=quote_data.get("d") or 0.0,
-                    change_percent=quote_data.get("dp") or 0.0,
-                    volume=0,
-                    market_cap=profile_data.get("marketCapitalization"),
-                    day_high=quote_data.get("h") or None,
-                    day_low=quote_data.get("l") or None,
-                )
+            async def get_quote():
+                async with session.get(quote_url) as response:
+                    return await response.json() if response.status == 200 else None
+
+            quote_data, profile_data = await asyncio.gather(
+                get_quote(), self._get_finnhub_profile(session, symbol) if fetch_profile else asyncio.sleep(0))
+            if not quote_data or quote_data.get("c") is None:
+                return None
+            if fetch_profile and profile_data is not None:
+                self._cache_data(profile_key, profile_data)
+            profile_data = self.cache[profile_key]["data"] if profile_key in self.cache else {}
+
+            return StockData(
+                symbol=symbol,
+                price=quote_data["c"],
+                change=quote_data.get("d") or 0.0,
+                change_percent=quote_data.get("dp") or 0.0,
+                volume=0,
+                market_cap=profile_data.get("marketCapitalization"),
+                day_high=quote_data.get("h") or None,
+                day_low=quote_data.get("l") or None,
+            )
         except Exception as e:
             logger.error(f"Finnhub API error: {e}")
             return None
 
+    async def _get_finnhub_profile(self, session: aiohttp.ClientSession, symbol: str) -> Optional[dict]:
+        """The slow-moving part of a quote (market cap); None if unavailable."""
+        try:
+            profile_url = f"{config.FINNHUB_BASE_URL}/stock/profile2?symbol={symbol}&token={self.finnhub_key}"
+            async with session.get(profile_url) as response:
+                return await response.json() if response.status == 200 else None
+        except Exception as e:
+            logger.error("Finnhub profile error for %s: %s", symbol, e)
+            return None
+
     async def _get_alphavantage_quote(self, symbol: str) -> Optional[StockData]:
         try:
             url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={self.alpha_vantage_key}"
@@ -182,12 +239,15 @@ class FinancialMarketsController:
     async def get_crypto_quote(self, symbol: str) -> Optional[CryptoData]:
         symbol = symbol.upper()
         cache_key = f"crypto_{symbol}"
+        _note_lookup(cache_key)
         if self._is_cached(cache_key):
             return self.cache[cache_key]["data"]
+        return await _single_flight(cache_key, lambda: self._fetch_crypto_quote(symbol, cache_key))
 
+    async def _fetch_crypto_quote(self, symbol: str, cache_key: str) -> Optional[CryptoData]:
         try:
             if self.coinmarketcap_key:
-                crypto_data = await self._get_coinmarketcap_quote(symbol)
+                crypto_data = await _CRYPTO_BATCHER.get(symbol)
                 if crypto_data:
                     self._cache_data(cache_key, crypto_data)
                     return crypto_data
@@ -196,32 +256,39 @@ class FinancialMarketsController:
 
         return None
 
-    async def _get_coinmarketcap_quote(self, symbol: str) -> Optional[CryptoData]:
+    async def _get_coinmarketcap_quotes(self, symbols: List[str]) -> Dict[str, CryptoData]:
+        """One quotes/latest request for every symbol; skip_invalid keeps an
+        unknown symbol from failing the others."""
         try:
             headers = {"X-CMC_PRO_API_KEY": self.coinmarketcap_key, "Accept": "application/json"}
-            url = f"https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/latest?symbol={symbol}"
+            url = f"{config.COINMARKETCAP_BASE_URL}/cryptocurrency/quotes/latest"
+            params = {"symbol": ",".join(symbols), "skip_invalid": "true"}
             async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
+                async with session.get(url, headers=headers, params=params) as response:
                     if response.status != 200:
-                        return None
-                    data = await response.json()
-                    crypto_info = data.get("data", {}).get(symbol)
-                    if not crypto_info:
-                        return None
-                    quote = crypto_info["quote"]["USD"]
-                    return CryptoData(
-                        symbol=symbol,
-                        name=crypto_info["name"],
-                        price=quote["price"],
-                        change_24h=quote["price"] * (quote["percent_change_24h"] / 100),
-                        change_percent_24h=quote["percent_change_24h"],
-                        market_cap=quote["market_cap"],
-                        volume_24h=quote["volume_24h"],
-                        rank=crypto_info["cmc_rank"],
-                    )
+                        return {}
+                    data = (await response.json()).get("data") or {}
         except Exception as e:
             logger.error(f"CoinMarketCap API error: {e}")
-            return None
+            return {}
+
+        quotes = {}
+        for symbol in symbols:
+            crypto_info = data.get(symbol)
+            if not crypto_info:
+                continue
+            quote = crypto_info["quote"]["USD"]
+            quotes[symbol] = CryptoData(
+                symbol=symbol,
+                name=crypto_info["name"],
+                price=quote["price"],
+                change_24h=quote["price"] * (quote["percent_change_24h"] / 100),
+                change_percent_24h=quote["percent_change_24h"],
+                market_cap=quote["market_cap"],
+                volume_24h=quote["volume_24h"],
+                rank=crypto_info["cmc_rank"],
+            )
+        return quotes
 
     async def get_market_news(self, symbols: Optional[List[str]] = None, limit: int = 5) -> List[NewsItem]:
         cache_key = f"news_{'_'.join(symbols or ['general'])}"
@@ -246,7 +313,7 @@ class FinancialMarketsController:
                 if symbols:
                     from datetime import timedelta
                     for symbol in symbols[:3]:
-                        url = (f"https://finnhub.io/api/v1/company-news?symbol={symbol}"
+                        url = (f"{config.FINNHUB_BASE_URL}/company-news?symbol={symbol}"
                                f"&from={(datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')}"
                                f"&to={datetime.now().strftime('%Y-%m-%d')}&token={self.finnhub_key}")
                         async with session.get(url) as response:
@@ -261,7 +328,7 @@ class FinancialMarketsController:
                                         symbols=[symbol],
                                     ))
                 else:
-                    url = f"https://finnhub.io/api/v1/news?category=general&token={self.finnhub_key}"
+                    url = f"{config.FINNHUB_BASE_URL}/news?category=general&token={self.finnhub_key}"
                     async with session.get(url) as response:
                         if response.status == 200:
                             news_data = await response.json()
@@ -280,31 +347,33 @@ class FinancialMarketsController:
     async def get_portfolio_analysis(self, holdings: Dict[str, float]) -> Dict[str, Any]:
         portfolio_value, total_change, positions = 0, 0, []
 
-        for symbol, quantity in holdings.items():
-            if symbol.upper() in ["BTC", "ETH", "ADA", "DOT"]:
-                quote = await self.get_crypto_quote(symbol)
-                if quote:
-                    position_value = quote.price * quantity
-                    position_change = quote.change_24h * quantity
-                    positions.append({
-                        "symbol": symbol, "type": "crypto", "quantity": quantity,
-                        "price": quote.price, "value": position_value, "change": position_change,
-                        "change_percent": quote.change_percent_24h,
-                    })
-                    portfolio_value += position_value
-                    total_change += position_change
+        # Looked up together so the misses land in the same batches.
+        quotes = await asyncio.gather(*(
+            self.get_crypto_quote(symbol) if symbol.upper() in ["BTC", "ETH", "ADA", "DOT"]
+            else self.get_stock_quote(symbol)
+            for symbol in holdings
+        ))
+        for (symbol, quantity), quote in zip(holdings.items(), quotes):
+            if not quote:
+                continue
+            if isinstance(quote, CryptoData):
+                position_value = quote.price * quantity
+                position_change = quote.change_24h * quantity
+                positions.append({
+                    "symbol": symbol, "type": "crypto", "quantity": quantity,
+                    "price": quote.price, "value": position_value, "change": position_change,
+                    "change_percent": quote.change_percent_24h,
+                })
             else:
-                quote = await self.get_stock_quote(symbol)
-                if quote:
-                    position_value = quote.price * quantity
-                    position_change = quote.change * quantity
-                    positions.append({
-                        "symbol": symbol, "type": "stock", "quantity": quantity,
-                        "price": quote.price, "value": position_value, "change": position_change,
-                        "change_percent": quote.change_percent,
-                    })
-                    portfolio_value += position_value
-                    total_change += position_change
+                position_value = quote.price * quantity
+                position_change = quote.change * quantity
+                positions.append({
+                    "symbol": symbol, "type": "stock", "quantity": quantity,
+                    "price": quote.price, "value": position_value, "change": position_change,
+                    "change_percent": quote.change_percent,
+                })
+            portfolio_value += position_value
+            total_change += position_change
 
         portfolio_change_percent = (
             (total_change / (portfolio_value - total_change)) * 100
@@ -320,10 +389,11 @@ class FinancialMarketsController:
             "worst_performer": min(positions, key=lambda x: x["change_percent"], default=None),
         }
 
-    def _is_cached(self, key: str) -> bool:
+    def _is_cached(self, key: str, ttl: Optional[float] = None) -> bool:
         if key not in self.cache:
             return False
-        return (datetime.now() - self.cache[key]["timestamp"]).seconds < self.cache_timeout
+        age = (datetime.now() - self.cache[key]["timestamp"]).total_seconds()
+        return age < (ttl if ttl is not None else self.cache_timeout)
 
     def _cache_data(self, key: str, data: Any):
         self.cache[key] = {"data": data, "timestamp": datetime.now()}
@@ -334,131 +404,180 @@ def get_financial_controller() -> FinancialMarketsController:
     return FinancialMarketsController()
 
 
+# Finnhub has no multi-symbol quote endpoint: no window, only one shared HTTP
+# session for the symbols a single call asks for together.
+_STOCK_BATCHER = batcher("Finnhub quotes", lambda symbols: get_financial_controller()._get_finnhub_quotes(symbols),
+                         multi_symbol=False)
+_CRYPTO_BATCHER = batcher("CoinMarketCap quotes",
+                          lambda symbols: get_financial_controller()._get_coinmarketcap_quotes(symbols))
+
+
+def quote_stats() -> dict:
+    return {"stocks": _STOCK_BATCHER.stats(), "crypto": _CRYPTO_BATCHER.stats()}
+
+
 # ---------------------------------------------------------------------------
 # Function implementations (what Gemini's function calls actually execute)
+#
+# Results go back to the model as compact dicts rather than the markdown
+# (bold, emoji, multi-line layouts) they used to be: fewer tokens, and
+# nothing for the model to copy into a reply that is going to be spoken.
+# Rounding happens here so the model never sees 12-digit floats.
 # ---------------------------------------------------------------------------
-async def get_stock_price(symbol: str) -> str:
+def _price(value: float) -> float:
+    return round(value, 2) if abs(value) >= 1 else float(f"{value:.4g}")
+
+
+def _compact(result: dict) -> dict:
+    return {k: v for k, v in result.items() if v is not None}
+
+
+def stock_result(stock: StockData, detail: bool = False) -> dict:
+    """Symbol, price and percent move; market cap and the day's range only
+    with ``detail``, since a spoken answer rarely uses them."""
+    result = {
+        "symbol": stock.symbol,
+        "price": _price(stock.price),
+        "change_pct": round(stock.change_percent or 0.0, 2),
+    }
+    if detail:
+        result.update({
+            "market_cap_b": round(stock.market_cap / 1000, 1) if stock.market_cap else None,  # Finnhub: millions
+            "day_low": _price(stock.day_low) if stock.day_low and stock.day_high else None,
+            "day_high": _price(stock.day_high) if stock.day_low and stock.day_high else None,
+        })
+    return _compact(result)
+
+
+def crypto_result(crypto: CryptoData, detail: bool = False) -> dict:
+    result = {
+        "symbol": crypto.symbol,
+        "name": crypto.name,
+        "price": _price(crypto.price),
+        "change_pct_24h": round(crypto.change_percent_24h, 2),
+    }
+    if detail:
+        result.update({
+            "market_cap_b": round(crypto.market_cap / 1e9, 2),
+            "volume_24h_b": round(crypto.volume_24h / 1e9, 2),
+            "rank": crypto.rank,
+        })
+    return result
+
+
+def _age(published: datetime) -> str:
+    age = datetime.now() - published
+    if age.days > 0:
+        return f"{age.days}d"
+    if age.seconds > 3600:
+        return f"{age.seconds // 3600}h"
+    return f"{age.seconds // 60}m"
+
+
+def news_result(news_items: List[NewsItem]) -> dict:
+    # Headlines only: the model reads out one or two of them, and the
+    # summaries were most of the payload.
+    return {"news": [{"title": n.title, "source": n.source, "age": _age(n.published)} for n in news_items]}
+
+
+def portfolio_result(analysis: Dict[str, Any]) -> dict:
+    top = sorted(analysis["positions"], key=lambda x: x["value"], reverse=True)[:5]
+    return _compact({
+        "total_value": round(analysis["total_value"]),
+        "total_change": round(analysis["total_change"], 2),
+        "change_pct": round(analysis["change_percent"], 2),
+        "top_holdings": [{"symbol": p["symbol"], "value": round(p["value"])} for p in top],
+        "best": analysis["best_performer"]["symbol"] if analysis["best_performer"] else None,
+        "worst": analysis["worst_performer"]["symbol"] if analysis["worst_performer"] else None,
+    })
+
+
+def comparison_result(stocks: List[StockData]) -> dict:
+    ranked = sorted(stocks, key=lambda x: x.change_percent or 0.0, reverse=True)
+    return {"ranked_by_change": [
+        {"symbol": s.symbol, "price": _price(s.price), "change_pct": round(s.change_percent or 0.0, 2)}
+        for s in ranked
+    ]}
+
+
+async def get_stock_price(symbol: str, detail: bool = False) -> dict:
     stock_data = await get_financial_controller().get_stock_quote(symbol)
     if not stock_data:
-        return f"Sorry, I couldn't retrieve data for {symbol.upper()}. The market might be closed or the symbol might be invalid."
-
-    change = stock_data.change or 0.0
-    change_percent = stock_data.change_percent or 0.0
-
-    change_direction = "📈" if change >= 0 else "📉"
-    change_text = "up" if change >= 0 else "down"
-
-    response = f"**{symbol.upper()} - ${stock_data.price:.2f}** {change_direction}\n"
-    response += f"Change: ${change:+.2f} ({change_percent:+.2f}%)\n"
-    if stock_data.market_cap:
-        response += f"Market Cap: ${stock_data.market_cap/1000:.1f}B\n"
-    if stock_data.day_high and stock_data.day_low:
-        response += f"Day Range: ${stock_data.day_low:.2f} - ${stock_data.day_high:.2f}\n"
-    response += f"\n{symbol.upper()} is {change_text} {abs(change_percent):.2f}% today."
-    return response
+        return {"error": f"No data for {symbol.upper()}; the market may be closed or the symbol invalid."}
+    return stock_result(stock_data, detail)
 
 
-async def get_crypto_price(symbol: str) -> str:
+async def get_crypto_price(symbol: str, detail: bool = False) -> dict:
     crypto_data = await get_financial_controller().get_crypto_quote(symbol)
     if not crypto_data:
-        return f"Sorry, I couldn't retrieve crypto data for {symbol.upper()}. Please check the symbol."
+        return {"error": f"No crypto data for {symbol.upper()}; check the symbol."}
+    return crypto_result(crypto_data, detail)
 
-    change_direction = "📈" if crypto_data.change_percent_24h >= 0 else "📉"
-    change_text = "up" if crypto_data.change_percent_24h >= 0 else "down"
 
-    response = f"**{crypto_data.name} ({symbol.upper()}) - ${crypto_data.price:.2f}** {change_direction}\n"
-    response += f"24h Change: ${crypto_data.change_24h:+.2f} ({crypto_data.change_percent_24h:+.2f}%)\n"
-    response += f"Market Cap: ${crypto_data.market_cap/1e9:.2f}B\n"
-    response += f"24h Volume: ${crypto_data.volume_24h/1e9:.2f}B\n"
-    response += f"Rank: #{crypto_data.rank}\n"
-    response += f"\n{crypto_data.name} is {change_text} {abs(crypto_data.change_percent_24h):.2f}% in the last 24 hours."
-    return response
-
-
-async def get_market_news_summary(symbols: Optional[str] = None, count: int = 3) -> str:
+async def get_market_news_summary(symbols: Optional[str] = None, count: int = 3) -> dict:
     symbol_list = [s.strip().upper() for s in symbols.split(",")] if symbols else None
     news_items = await get_financial_controller().get_market_news(symbol_list, count)
-
     if not news_items:
-        return "Sorry, I couldn't retrieve market news at the moment."
-
-    response = "**Latest Market News:**\n\n"
-    for i, news in enumerate(news_items, 1):
-        age = datetime.now() - news.published
-        if age.days > 0:
-            time_str = f"{age.days} days ago"
-        elif age.seconds > 3600:
-            time_str = f"{age.seconds // 3600} hours ago"
-        else:
-            time_str = f"{age.seconds // 60} minutes ago"
-        response += f"**{i}. {news.title}**\n_{news.source} • {time_str}_\n{news.summary}\n\n"
-    return response
+        return {"error": "Market news is unavailable right now."}
+    return news_result(news_items)
 
 
-async def analyze_portfolio(holdings_json: str) -> str:
+async def analyze_portfolio(holdings_json: str) -> dict:
     try:
         holdings = json.loads(holdings_json)
     except json.JSONDecodeError:
-        return "I need the portfolio in JSON format like: {\"AAPL\": 100, \"TSLA\": 50, \"BTC\": 1.5}"
+        return {"error": 'Holdings must be JSON like {"AAPL": 100, "TSLA": 50, "BTC": 1.5}.'}
 
     analysis = await get_financial_controller().get_portfolio_analysis(holdings)
     if not analysis["positions"]:
-        return "I couldn't analyze the portfolio. Please check the symbols and try again."
-
-    change_direction = "📈" if analysis["total_change"] >= 0 else "📉"
-    performance_text = "gained" if analysis["total_change"] >= 0 else "lost"
-
-    response = f"**Portfolio Analysis** {change_direction}\n\n"
-    response += f"**Total Value:** ${analysis['total_value']:,.2f}\n"
-    response += f"**Today's Change:** ${analysis['total_change']:+,.2f} ({analysis['change_percent']:+.2f}%)\n\n"
-    response += "**Top Holdings:**\n"
+        return {"error": "Couldn't price any of those holdings; check the symbols."}
+    return portfolio_result(analysis)
 
-    for pos in sorted(analysis["positions"], key=lambda x: x["value"], reverse=True)[:5]:
-        pos_direction = "📈" if pos["change"] >= 0 else "📉"
-        response += f"• **{pos['symbol']}**: ${pos['value']:,.2f} ({pos['change_percent']:+.2f}%) {pos_direction}\n"
 
-    if analysis["best_performer"]:
-        response += f"\n**Best Performer:** {analysis['best_performer']['symbol']} ({analysis['best_performer']['change_percent']:+.2f}%)\n"
-    if analysis["worst_performer"]:
-        response += f"**Worst Performer:** {analysis['worst_performer']['symbol']} ({analysis['worst_performer']['change_percent']:+.2f}%)\n"
-
-    response += f"\nYour portfolio has {performance_text} ${abs(analysis['total_change']):,.2f} today."
-    return response
-
-
-async def compare_stocks(symbols: str) -> str:
+async def compare_stocks(symbols: str) -> dict:
     symbol_list = [s.strip().upper() for s in symbols.split(",")]
     if len(symbol_list) < 2:
-        return "I need at least two symbols to compare. Try: 'AAPL,MSFT,GOOGL'"
+        return {"error": "Need at least two symbols to compare, e.g. AAPL,MSFT,GOOGL."}
 
     controller = get_financial_controller()
-    comparisons = []
-    for symbol in symbol_list[:5]:
-        stock_data = await controller.get_stock_quote(symbol)
-        if stock_data:
-            comparisons.append(stock_data)
+    quotes = await asyncio.gather(*(controller.get_stock_quote(symbol) for symbol in symbol_list[:5]))
+    comparisons = [stock_data for stock_data in quotes if stock_data]
 
     if not comparisons:
-        return "I couldn't retrieve data for any of those symbols."
+        return {"error": "Couldn't retrieve data for any of those symbols."}
+    return comparison_result(comparisons)
+
+
+async def _cached_weather(kind: str, location: str, units: str, fetch) -> dict:
+    """Weather results go through the same shared cache as quotes; only
+    successful lookups are kept."""
+    controller = get_financial_controller()
+    cache_key = f"{kind}_{' '.join((location or '').lower().split())}_{units}"
+    _note_lookup(cache_key)
+    if controller._is_cached(cache_key):
+        return controller.cache[cache_key]["data"]
 
-    comparisons.sort(key=lambda x: x.change_percent or 0.0, reverse=True)
-    response = "**Stock Comparison:**\n\n"
-    for i, stock in enumerate(comparisons, 1):
-        change = stock.change or 0.0
-        change_percent = stock.change_percent or 0.0
-        direction = "📈" if change >= 0 else "📉"
-        response += f"**{i}. {stock.symbol}** - ${stock.price:.2f} {direction}\n"
-        response += f"   Change: ${change:+.2f} ({change_percent:+.2f}%)\n\n"
+    async def fetch_and_cache():
+        result = await fetch(location, units)
+        if result.get("success"):
+            controller._cache_data(cache_key, result)
+        return result
 
-    best, worst = comparisons[0], comparisons[-1]
-    response += f"**{best.symbol}** is leading with {(best.change_percent or 0.0):+.2f}%, while **{worst.symbol}** is trailing at {(worst.change_percent or 0.0):+.2f}%."
-    return response
+    return await _single_flight(cache_key, fetch_and_cache)
 
 
 async def get_weather_info(location: str, units: str = "metric") -> dict:
+    return await _cached_weather("weather", location, units, _fetch_weather_info)
+
+
+async def get_weather_forecast(location: str, units: str = "metric") -> dict:
+    return await _cached_weather("forecast", location, units, _fetch_weather_forecast)
+
+
+async def _fetch_weather_info(location: str, units: str) -> dict:
     try:
         async with aiohttp.ClientSession() as session:
-            url = f"{WEATHER_BASE_URL}/weather"
+            url = f"{config.OPENWEATHER_BASE_URL}/weather"
             params = {"q": location, "appid": config.OPENWEATHER_API_KEY, "units": units}
             async with session.get(url, params=params) as response:
                 if response.status == 200:
@@ -484,10 +603,10 @@ async def get_weather_info(location: str, units: str = "metric") -> dict:
         return {"success": False, "error": f"Failed to fetch weather data: {str(e)}"}
 
 
-async def get_weather_forecast(location: str, units: str = "metric") -> dict:
+async def _fetch_weather_forecast(location: str, units: str) -> dict:
     try:
         async with aiohttp.ClientSession() as session:
-            url = f"{WEATHER_BASE_URL}/forecast"
+            url = f"{config.OPENWEATHER_BASE_URL}/forecast"
             params = {"q": location, "appid": config.OPENWEATHER_API_KEY, "units": units}
             async with session.get(url, params=params) as response:
                 if response.status == 200:
@@ -520,10 +639,14 @@ async def get_weather_forecast(location: str, units: str = "metric") -> dict:
 functions = [
     {"name": "get_stock_price", "description": "Get real-time stock price, change, and market information",
      "parameters": {"type": "object", "properties": {
-         "symbol": {"type": "string", "description": "Stock symbol (e.g., AAPL, TSLA)"}}, "required": ["symbol"]}},
+         "symbol": {"type": "string", "description": "Stock symbol (e.g., AAPL, TSLA)"},
+         "detail": {"type": "boolean", "description": "Also return market cap and the day's range; only when asked"}},
+         "required": ["symbol"]}},
     {"name": "get_crypto_price", "description": "Get real-time cryptocurrency price and market data",
      "parameters": {"type": "object", "properties": {
-         "symbol": {"type": "string", "description": "Cryptocurrency symbol (e.g., BTC, ETH)"}}, "required": ["symbol"]}},
+         "symbol": {"type": "string", "description": "Cryptocurrency symbol (e.g., BTC, ETH)"},
+         "detail": {"type": "boolean", "description": "Also return market cap, 24h volume and rank; only when asked"}},
+         "required": ["symbol"]}},
     {"name": "get_market_news_summary", "description": "Get latest financial market news and updates",
      "parameters": {"type": "object", "properties": {
          "symbols": {"type": "string", "description": "Optional comma-separated stock symbols for targeted news"},
@@ -555,9 +678,9 @@ async def handle_financial_function_call(function_name: str, args: dict):
     """Single dispatcher for every function-call Gemini can make in this app."""
     try:
         if function_name == "get_stock_price":
-            return await get_stock_price(args.get("symbol"))
+            return await get_stock_price(args.get("symbol"), bool(args.get("detail")))
         elif function_name == "get_crypto_price":
-            return await get_crypto_price(args.get("symbol"))
+            return await get_crypto_price(args.get("symbol"), bool(args.get("detail")))
         elif function_name == "get_market_news_summary":
             return await get_market_news_summary(args.get("symbols"), args.get("count", 3))
         elif function_name == "analyze_portfolio":
@@ -569,7 +692,7 @@ async def handle_financial_function_call(function_name: str, args: dict):
         elif function_name == "get_weather_forecast_func":
             return await get_weather_forecast(location=args.get("location"), units=args.get("units", "metric"))
         else:
-            return f"Unknown function: {function_name}"
+            return {"error": f"Unknown function: {function_name}"}
     except Exception as e:
         logger.error(f"Error executing {function_name}: {e}")
-        return f"Error executing {function_name}: {str(e)}"
+        return {"error": f"Error executing {function_name}: {str(e)}"}
@@ -0,0 +1,161 @@
+"""
+Spoken-form rendering of assistant replies, applied right before TTS.
+
+Replies are written for the chat transcript and can still carry markdown,
+emoji, bullet layouts and symbols ("$187.12", "+0.65%", "°C") that Murf
+either reads out literally or stumbles over -- and every character is
+synthesis time. ``to_speech``:
+
+- strips markup (bold/italics/code, headings, links, list markers) and emoji;
+- verbalizes symbols: currency, signed percentages, degrees, "&", "#3";
+- rounds long decimals: to two places from 1 up, to three significant
+  figures below (a $0.00001234 token price must not become "0 dollars");
+- folds multi-line layouts into sentences; and
+- caps the result at TTS_MAX_CHARS, cutting at a sentence boundary.
+
+The transcript the user sees keeps the original text.
+"""
+import math
+import re
+import config
+
+_EMOJI = re.compile("[\U0001F000-\U0001FAFF\u2190-\u21FF\u2300-\u23FF\u2600-\u27BF\u2B00-\u2BFF\uFE0F\u200D]")
+_LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+_CODE = re.compile(r"`+([^`]*)`+")
+_EMPHASIS = re.compile(r"(\*{1,3}|~~)(\S(?:.*?\S)?)\1")
+# Underscores only mark emphasis at word edges: snake_case and
+# first_last@example.com stay as they are.
+_UNDERSCORE_EMPHASIS = re.compile(r"(?<!\w)(_{1,3})(\S(?:.*?\S)?)\1(?!\w)")
+_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+", re.M)
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•·▪]|\d{1,2}[.)])\s+", re.M)
+_STRAY_MARKUP = re.compile(r"[*`~|>]+")
+_PARENS = re.compile(r"\s*\(([^()]*)\)")
+
+_NUMBER = r"\d+(?:,\d{3})*(?:\.\d+)?"
+_SCALES = {"k": "thousand", "m": "million", "b": "billion", "t": "trillion"}
+_SCALE_NAMES = ["", "thousand", "million", "billion", "trillion"]
+_MONEY = re.compile(rf"([+-]?)\$([+-]?)({_NUMBER})(?:\s?(thousand|million|billion|trillion|[KMBT])\b)?", re.I)
+_PERCENT = re.compile(rf"([+\-±]?)({_NUMBER})\s?%")
+_LONG_DECIMAL = re.compile(r"(?<![\d.])\d[\d,]*\.\d{3,}")
+# "down -0.65%": the word already gives the direction, so the sign is dropped.
+_DIRECTION_BEFORE = re.compile(r"\b(?:up|down|rose|fell|gained|lost|dropped|climbed|jumped|slipped|rising|"
+                               r"falling|higher|lower)\s+(?:by\s+)?$", re.I)
+_SYMBOLS = [
+    (re.compile(r"\s?°\s?C\b"), " degrees Celsius"),
+    (re.compile(r"\s?°\s?F\b"), " degrees Fahrenheit"),
+    (re.compile(r"\s?°"), " degrees"),
+    (re.compile(r"±\s?"), "plus or minus "),
+    (re.compile(r"\s&\s"), " and "),
+    (re.compile(r"#(\d+)"), r"number \1"),
+    (re.compile(r"\s*[—–•]\s*"), ", "),
+    (re.compile(r"(\d|dollars|percent)\s+-\s+(?=\d)"), r"\1 to "),
+    (re.compile(r"~\s?(?=\d)"), "about "),
+]
+_SIGN_WORDS = {"+": "up ", "-": "down ", "±": "plus or minus "}
+
+
+def _trim(number: str) -> str:
+    return number.rstrip("0").rstrip(".") if "." in number else number
+
+
+def significant(value: float, digits: int) -> str:
+    """``value`` to ``digits`` significant figures, written out in full
+    (0.00001234 -> "0.0000123" for 3, never "1.23e-05")."""
+    if value == 0:
+        return "0"
+    decimals = max(digits - 1 - math.floor(math.log10(abs(value))), 0)
+    return _trim(f"{value:.{decimals}f}")
+
+
+def format_price(value: float) -> str:
+    """A price as written in a reply: cents from a dollar up, four
+    significant figures below (sub-cent tokens)."""
+    return f"{value:,.2f}" if abs(value) >= 1 else significant(value, 4)
+
+
+def _spoken_number(value: float) -> str:
+    """Rounded the way it would be said: no cents on large amounts, at
+    most two decimals from 1 up, three significant figures below."""
+    if value >= 1000:
+        return f"{value:,.0f}"
+    return _trim(f"{value:.2f}") if value >= 1 else significant(value, 3)
+
+
+def _long_decimal(match: re.Match) -> str:
+    number = match.group(0)
+    value = float(number.replace(",", ""))
+    if value < 1:
+        return significant(value, 3)
+    return f"{value:,.2f}" if "," in number else f"{value:.2f}"
+
+
+def _sign_word(match: re.Match, sign: str) -> str:
+    if _DIRECTION_BEFORE.search(match.string, 0, match.start()):
+        return ""
+    return _SIGN_WORDS.get(sign, "")
+
+
+def _money(match: re.Match) -> str:
+    sign = match.group(1) or match.group(2)
+    value = float(match.group(3).replace(",", ""))
+    scale = _SCALE_NAMES.index(_SCALES.get((match.group(4) or "").lower(), (match.group(4) or "").lower()))
+    while scale and value >= 1000 and scale < len(_SCALE_NAMES) - 1:
+        value, scale = value / 1000, scale + 1
+    words = _spoken_number(value) + (f" {_SCALE_NAMES[scale]}" if scale else "")
+    return f"{_sign_word(match, sign)}{words} dollars"
+
+
+def _percent(match: re.Match) -> str:
+    value = _trim(f"{float(match.group(2).replace(',', '')):.1f}")
+    return f"{_sign_word(match, match.group(1))}{value} percent"
+
+
+def _sentences(text: str) -> str:
+    lines = []
+    for line in text.splitlines():
+        line = line.strip(" \t:")
+        if not line:
+            continue
+        if line[-1] not in ".!?,;":
+            line += "."
+        lines.append(line)
+    return " ".join(lines)
+
+
+def _cap(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    if end >= max_chars // 3:
+        return cut[:end + 1]
+    return cut[:cut.rfind(" ")].rstrip(".,;:") + "."
+
+
+def to_speech(text: str, max_chars: int | None = None) -> str:
+    """``text`` rewritten for TTS (see module docstring)."""
+    max_chars = max_chars or config.TTS_MAX_CHARS
+    text = _LINK.sub(r"\1", text)
+    text = _CODE.sub(r"\1", text)
+    text = _EMPHASIS.sub(r"\2", text)
+    text = _UNDERSCORE_EMPHASIS.sub(r"\2", text)
+    text = _HEADING.sub("", text)
+    text = _LIST_MARKER.sub("", text)
+    text = _EMOJI.sub("", text)
+
+    text = _LONG_DECIMAL.sub(_long_decimal, text)
+    text = _MONEY.sub(_money, text)
+    text = _PERCENT.sub(_percent, text)
+    for pattern, replacement in _SYMBOLS:
+        text = pattern.sub(replacement, text)
+    text = _PARENS.sub(r", \1,", text)
+    text = _STRAY_MARKUP.sub("", text)
+
+    text = _sentences(text)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s+([,.;!?])", r"\1", text)
+    text = re.sub(r",\s*([,.;!?])", r"\1", text)
+    text = text.strip().rstrip(",;")
+    if text and text[-1] not in ".!?":
+        text += "."
+    return _cap(text, max_chars)
@@ -3,11 +3,13 @@ import config
 from utils.logger import logger
 
 
-def transcribe_audio(audio_bytes: bytes) -> str:
+def transcribe_audio(audio_path: str) -> str:
+    """Transcribes an audio file; the SDK streams it to AssemblyAI's upload
+    endpoint from disk."""
     aai.settings.api_key = config.ASSEMBLY_AI_API_KEY
     transcription_config = aai.TranscriptionConfig(speech_model=aai.SpeechModel.best)
     transcriber = aai.Transcriber(config=transcription_config)
-    transcript = transcriber.transcribe(audio_bytes)
+    transcript = transcriber.transcribe(audio_path)
 
     if transcript.status == "error":
         logger.error(f"AssemblyAI transcription error: {transcript.error}")
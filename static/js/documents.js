@@ -1,6 +1,7 @@
 // ============================================================================
 // documents.js — RAG panel: upload PDFs, list/delete indexed docs, and ask
-// questions grounded in them via /rag/chat/{session_id}.
+// questions grounded in them via /rag/chat/{session_id}/stream (answers
+// render as they are generated).
 // ============================================================================
 
 (function () {
@@ -93,17 +94,46 @@
 
     const msg = document.createElement("div");
     msg.className = `chat-msg ${role}`;
-    msg.textContent = text;
-
-    if (sources && sources.length > 0) {
-      const srcEl = document.createElement("div");
-      srcEl.className = "chat-sources";
-      srcEl.textContent = "Sources: " + sources.map((s) => `${s.filename} (p.${s.page})`).join(", ");
-      msg.appendChild(srcEl);
-    }
+    const body = document.createElement("span");
+    body.textContent = text;
+    msg.appendChild(body);
+    setSources(msg, sources);
 
     chatLog.appendChild(msg);
     chatLog.scrollTop = chatLog.scrollHeight;
+    return msg;
+  }
+
+  function setSources(msg, sources) {
+    if (!sources || sources.length === 0) return;
+    const srcEl = document.createElement("div");
+    srcEl.className = "chat-sources";
+    srcEl.textContent = "Sources: " + sources.map((s) => `${s.filename} (p.${s.page})`).join(", ");
+    msg.appendChild(srcEl);
+  }
+
+  // Reads a text/event-stream response, calling onEvent(name, data) per event.
+  async function readEventStream(res, onEvent) {
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        let name = "message";
+        let data = "";
+        block.split("\n").forEach((line) => {
+          if (line.startsWith("event: ")) name = line.slice(7);
+          else if (line.startsWith("data: ")) data += line.slice(6);
+        });
+        onEvent(name, data ? JSON.parse(data) : {});
+      }
+    }
   }
 
   chatForm.addEventListener("submit", async (e) => {
@@ -114,16 +144,30 @@
     appendChatMessage("user", question);
     questionInput.value = "";
 
+    // Streamed: sources arrive first, then the answer token by token.
+    const msg = appendChatMessage("assistant", "…");
+    const body = msg.firstChild;
+    let answer = "";
     try {
-      const res = await fetch(`/rag/chat/${sessionId}`, {
+      const res = await fetch(`/rag/chat/${sessionId}/stream`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ question }),
       });
-      const data = await res.json();
-      appendChatMessage("assistant", data.answer, data.sources);
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      await readEventStream(res, (event, data) => {
+        if (event === "sources") {
+          setSources(msg, data.sources);
+        } else if (event === "token") {
+          answer += data.text;
+          body.textContent = answer;
+        } else if (event === "error") {
+          body.textContent = answer ? `${answer}\n\n${data.message}` : data.message;
+        }
+        chatLog.scrollTop = chatLog.scrollHeight;
+      });
     } catch (err) {
-      appendChatMessage("assistant", "Something went wrong asking that question.");
+      body.textContent = "Something went wrong asking that question.";
       console.error("RAG chat failed:", err);
     }
   });
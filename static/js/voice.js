@@ -12,6 +12,9 @@ let currentAudioSource = null;
 let scheduledTime = 0;
 let audioQueue = [];
 let waveformRAF = null;
+// "Let me check that" clips streamed while tools run; cut when the answer starts.
+let fillerGain = null;
+let fillerSources = [];
 
 const sessionId = window.SIGNAL.sessionId;
 const userId = window.SIGNAL.userId;
@@ -114,14 +117,14 @@ function enableAudioContext() {
   }
 }
 
-function base64ToFloat32Array(base64Audio) {
+function base64ToFloat32Array(base64Audio, rawPcm = false) {
   try {
     const binaryString = atob(base64Audio);
     const bytes = new Uint8Array(binaryString.length);
     for (let i = 0; i < binaryString.length; i++) bytes[i] = binaryString.charCodeAt(i);
 
-    const offset = wavHeaderProcessed ? 0 : 44;
-    wavHeaderProcessed = true;
+    const offset = rawPcm || wavHeaderProcessed ? 0 : 44;
+    if (!rawPcm) wavHeaderProcessed = true;
 
     const audioData = bytes.slice(offset);
     const sampleCount = audioData.length / 2;
@@ -139,12 +142,24 @@ function base64ToFloat32Array(base64Audio) {
   }
 }
 
-function queueAudioChunk(float32Data) {
+function queueAudioChunk(float32Data, filler = false) {
   if (!float32Data || float32Data.length === 0) return;
-  audioQueue.push({ data: float32Data, timestamp: Date.now() });
+  audioQueue.push({ data: float32Data, timestamp: Date.now(), filler });
   if (!isProcessingQueue) processAudioQueue();
 }
 
+// Fades out whatever filler is playing or queued, so the answer starts right away.
+function stopFiller() {
+  audioQueue = audioQueue.filter((chunk) => !chunk.filler);
+  if (!fillerGain) return;
+  const now = audioContext.currentTime;
+  fillerGain.gain.setTargetAtTime(0, now, 0.015);
+  fillerSources.forEach((src) => { try { src.stop(now + 0.06); } catch (e) {} });
+  fillerGain = null;
+  fillerSources = [];
+  scheduledTime = now + 0.07;
+}
+
 function processAudioQueue() {
   if (isProcessingQueue || audioQueue.length === 0) return;
   if (!audioContext) initializeAudioContext();
@@ -154,19 +169,28 @@ function processAudioQueue() {
   const processNextChunk = () => {
     if (audioQueue.length === 0) { isProcessingQueue = false; return; }
     const chunk = audioQueue.shift();
-    playAudioChunk(chunk.data, processNextChunk);
+    playAudioChunk(chunk.data, processNextChunk, chunk.filler);
   };
   processNextChunk();
 }
 
-function playAudioChunk(float32Data, onComplete) {
+function playAudioChunk(float32Data, onComplete, filler = false) {
   try {
     const buffer = audioContext.createBuffer(1, float32Data.length, 44100);
     buffer.copyToChannel(float32Data, 0);
 
     const src = audioContext.createBufferSource();
     src.buffer = buffer;
-    src.connect(audioContext.destination);
+    if (filler) {
+      if (!fillerGain) {
+        fillerGain = audioContext.createGain();
+        fillerGain.connect(audioContext.destination);
+      }
+      src.connect(fillerGain);
+      fillerSources.push(src);
+    } else {
+      src.connect(audioContext.destination);
+    }
 
     const currentTime = audioContext.currentTime;
     const scheduleTime = Math.max(scheduledTime, currentTime + 0.01);
@@ -184,6 +208,7 @@ function playAudioChunk(float32Data, onComplete) {
 }
 
 function resetAudioState() {
+  if (audioContext) stopFiller();
   audioQueue = [];
   isProcessingQueue = false;
   wavHeaderProcessed = false;
@@ -280,7 +305,12 @@ async function startStreaming() {
     try {
       const data = JSON.parse(evt.data);
 
+      if (data.filler_chunk) {
+        queueAudioChunk(base64ToFloat32Array(data.filler_chunk, true), true);
+      }
+      if (data.status === "filler_stop") stopFiller();
       if (data.audio_chunk) {
+        if (data.first_chunk) stopFiller();
         receivedAudioChunks.push(data.audio_chunk);
         const float32Data = base64ToFloat32Array(data.audio_chunk);
         if (float32Data && float32Data.length > 0) {
@@ -1,8 +1,220 @@
+"""
+App-wide logging setup.
+
+Every record (ours and third-party: httpx, google_genai, assemblyai, ...)
+goes through a ``QueueHandler`` on the root logger, so the calling thread --
+usually the event loop -- only does a non-blocking queue put. A
+``QueueListener`` thread does the formatting and the actual write.
+
+- Lazy formatting: the hot paths log with %-style args
+  (``logger.info("Transcript: %s", text)``), and the listener thread is the
+  one that renders them, so disabled levels and dropped records cost nothing.
+- ``LOG_FORMAT=json`` writes one JSON object per line (ts, level, logger,
+  msg, session_id, turn_id, exc); ``text`` keeps the classic line format.
+- ``session_id`` / ``turn_id`` come from ContextVars (``bind_session`` /
+  ``bind_turn``), so anything logged while handling a session is tagged
+  without threading ids through every call.
+- Throttling for high-frequency events, configured per logger name:
+  ``LOG_RATE_LIMITS="httpx=2/s,ai-voice-agent.turns=5/s"`` caps records per
+  second per (logger, message template); ``LOG_SAMPLE_RATES="httpx=0.1"``
+  keeps a random fraction. Only records below WARNING are ever throttled,
+  and the next record that gets through reports how many were suppressed.
+"""
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+import config
+
+session_id_var: ContextVar[str | None] = ContextVar("log_session_id", default=None)
+turn_id_var: ContextVar[str | None] = ContextVar("log_turn_id", default=None)
+
+_TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+def bind_session(session_id: str | None):
+    session_id_var.set(session_id)
+
+
+def bind_turn(turn_id: str | None = None) -> str:
+    """Tags everything logged from here on in the current context (i.e. the
+    rest of this task) with a turn id; generates one if none is given."""
+    turn_id = turn_id or uuid.uuid4().hex[:8]
+    turn_id_var.set(turn_id)
+    return turn_id
+
+
+class ContextFilter(logging.Filter):
+    """Stamps session/turn ids onto the record in the *calling* thread, where
+    the ContextVars are visible. Values passed via ``extra=`` win."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "session_id", None) is None:
+            record.session_id = session_id_var.get()
+        if getattr(record, "turn_id", None) is None:
+            record.turn_id = turn_id_var.get()
+        return True
+
+
+def _parse_rules(spec: str, parse_value) -> dict:
+    rules = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        try:
+            rules[name.strip()] = parse_value(value.strip())
+        except ValueError:
+            print(f"Ignoring malformed log throttle rule: {item!r}", file=sys.stderr)
+    return rules
+
+
+def _lookup(rules: dict, logger_name: str):
+    """Most specific rule wins: "a.b.c" falls back to "a.b", then "a"."""
+    name = logger_name
+    while name:
+        if name in rules:
+            return rules[name]
+        name = name.rpartition(".")[0]
+    return None
+
+
+class ThrottleFilter(logging.Filter):
+    def __init__(self, rate_limits: dict[str, float], sample_rates: dict[str, float]):
+        super().__init__()
+        self.rate_limits = rate_limits
+        self.sample_rates = sample_rates
+        self._buckets: dict[tuple, tuple[float, float]] = {}
+        self._suppressed: dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg))
+
+        sample = _lookup(self.sample_rates, record.name)
+        if sample is not None and random.random() >= sample:
+            self._count_suppressed(key)
+            return False
+
+        rate = _lookup(self.rate_limits, record.name)
+        if rate is not None and not self._take_token(key, rate):
+            self._count_suppressed(key)
+            return False
+
+        with self._lock:
+            suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def _take_token(self, key: tuple, rate: float) -> bool:
+        now = time.monotonic()
+        burst = max(1.0, rate)
+        with self._lock:
+            tokens, last = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+        return allowed
+
+    def _count_suppressed(self, key: tuple):
+        with self._lock:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in ("session_id", "turn_id", "suppressed"):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        context = " ".join(
+            f"{field}={getattr(record, field)}" for field in ("session_id", "turn_id", "suppressed")
+            if getattr(record, field, None) is not None
+        )
+        return f"{line} [{context}]" if context else line
+
+
+_exc_formatter = logging.Formatter()
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: if the writer thread falls behind and the
+    queue is full, the record is dropped and counted instead."""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike the stdlib version, don't render the message here -- that's
+        # the listener thread's job. Only the traceback has to be captured
+        # now, while the frames still exist.
+        record = logging.makeLogRecord(record.__dict__)
+        if record.exc_info:
+            record.exc_text = record.exc_text or _exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+
+def _setup() -> tuple[logging.Logger, logging.handlers.QueueListener]:
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter() if config.LOG_FORMAT == "json" else TextFormatter(_TEXT_FORMAT))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+    queue_handler = _DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(ThrottleFilter(
+        _parse_rules(config.LOG_RATE_LIMITS, lambda v: float(v.removesuffix("/s"))),
+        _parse_rules(config.LOG_SAMPLE_RATES, float),
+    ))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(config.LOG_LEVEL)
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return logging.getLogger("ai-voice-agent"), listener
+
+
+logger, _listener = _setup()
+
+
+def log_stats() -> dict:
+    return {"queued": _listener.queue.qsize(), "dropped": _DroppingQueueHandler.dropped}
 
-logging.basicConfig(
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    level=logging.INFO
-)
 
-logger = logging.getLogger("ai-voice-agent")
+# Per-turn content (full transcripts, model replies): its own logger so it
+# can be rate-limited or sampled independently of operational logs.
+turn_logger = logger.getChild("turns")
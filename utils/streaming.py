@@ -0,0 +1,74 @@
+"""
+Helpers for the Server-Sent Events routes (/rag/chat/{id}/stream,
+/agent/chat/{id}/stream).
+
+The Gemini SDK used here is synchronous, so a token stream has to be drained
+on a worker thread. ``iterate_in_thread`` hands each item to the event loop
+as soon as it is produced, instead of ``asyncio.to_thread`` returning only
+once the whole answer is in.
+"""
+import asyncio
+import json
+import threading
+
+_END = object()
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+async def iterate_in_thread(make_iterator):
+    """Async iterator over ``make_iterator()``, which runs on a worker
+    thread. Exceptions are re-raised here; if the consumer stops early the
+    worker stops at its next item."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def put(item, error=None):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+        except RuntimeError:
+            cancelled.set()  # loop already closed
+
+    def drain():
+        try:
+            for item in make_iterator():
+                if cancelled.is_set():
+                    return
+                put(item)
+        except Exception as e:
+            put(_END, e)
+        else:
+            put(_END)
+
+    worker = asyncio.ensure_future(asyncio.to_thread(drain))
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _END:
+                if error:
+                    raise error
+                return
+            yield item
+    finally:
+        cancelled.set()
+        if not worker.done():
+            # Let the thread finish on its own; just don't leave its result unobserved.
+            worker.add_done_callback(lambda f: f.exception())
+
+
+class QueueSink:
+    """Stands in for a WebSocket where code expects one (``send_json``):
+    every message becomes an (event, data) pair on ``queue``."""
+
+    def __init__(self, queue: asyncio.Queue, event: str):
+        self.queue = queue
+        self.event = event
+
+    async def send_json(self, data: dict):
+        await self.queue.put((self.event, data))
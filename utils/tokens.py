@@ -0,0 +1,14 @@
+"""
+Cheap token estimates for prompt budgeting.
+
+Gemini's count_tokens is a network round trip, which is far too slow to
+call per fact / per message while assembling a prompt. ~4 characters per
+token is the usual rule of thumb for English text and is close enough for
+keeping a prompt section inside a budget.
+"""
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
@@ -0,0 +1,97 @@
+"""
+Request uploads streamed to disk.
+
+``await file.read()`` put a whole upload in memory -- a 200 MB PDF cost
+200 MB per concurrent upload -- and the routes then wrote it out with a
+blocking ``open().write()`` on the event loop. ``save_upload`` copies the
+upload to a staging file UPLOAD_CHUNK_BYTES at a time on a worker thread,
+hashing it on the way: memory stays at one chunk whatever the size, the
+event loop is never blocked by the copy, and the content hash
+(services/rag/documents.py) needs no second pass over the file.
+
+An upload is rejected with 413 as soon as it is known to be over its limit:
+before any copying when the multipart parser has already counted it (the
+usual case), otherwise at the chunk that crosses the limit. It is rejected
+with 415 unless its first bytes are those of a format we accept -- the
+filename and Content-Type are only what the client claims.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+
+from fastapi import UploadFile
+
+import config
+
+
+class UploadRejected(ValueError):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+
+
+@dataclass
+class SavedUpload:
+    path: str
+    sha256: str
+    size: int
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def is_pdf(head: bytes) -> bool:
+    # PDF readers accept the header anywhere in the first 1024 bytes.
+    return b"%PDF-" in head[:1024]
+
+
+def is_audio(head: bytes) -> bool:
+    return (
+        (head[:4] == b"RIFF" and head[8:12] == b"WAVE")
+        or (head[:4] == b"FORM" and head[8:12] in (b"AIFF", b"AIFC"))
+        or head[:3] == b"ID3"                                # MP3 with ID3 tag
+        or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0)  # MP3 / ADTS AAC frame
+        or head[:4] in (b"OggS", b"fLaC", b"\x1aE\xdf\xa3")  # Ogg, FLAC, WebM/Matroska
+        or head[4:8] == b"ftyp"                              # MP4 / M4A / MOV
+        or head[:5] == b"#!AMR"
+    )
+
+
+def _too_large(max_bytes: int) -> UploadRejected:
+    return UploadRejected(413, f"File is larger than the {max_bytes // (1024 * 1024)} MB limit")
+
+
+async def save_upload(file: UploadFile, max_bytes: int, accept, directory: str | None = None) -> SavedUpload:
+    """Copies ``file`` to a new file in ``directory`` (the system temp
+    directory by default). ``accept(head)`` checks the first bytes. Raises
+    UploadRejected; the caller owns the returned file."""
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".part")
+
+    def copy() -> SavedUpload:
+        digest, size = hashlib.sha256(), 0
+        with os.fdopen(fd, "wb") as out:
+            while chunk := file.file.read(config.UPLOAD_CHUNK_BYTES):
+                if size == 0 and not accept(chunk[:1024]):
+                    raise UploadRejected(415, "Unsupported file type")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _too_large(max_bytes)
+                digest.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise UploadRejected(400, "The file is empty")
+        return SavedUpload(path, digest.hexdigest(), size)
+
+    try:
+        return await asyncio.to_thread(copy)
+    except BaseException:
+        os.remove(path)
+        raise